@@ -1508,6 +1508,21 @@ function updatePreviewCanvas() {
     ctx.restore();
 }
 
+// 啟動時先顯示快取狀態，背景重新驗證後由後端推送更新
+async function loadCachedSxmStatus() {
+    try {
+        const status = await pywebview.api.get_cached_status();
+        if (status && Object.keys(status).length > 0) {
+            updateSxmState(status);
+            const statusElement = document.getElementById('localCitsStatus');
+            statusElement.textContent = `Cached status from ${status.timestamp}`;
+        }
+    } catch (error) {
+        console.error('Failed to load cached SXM status:', error);
+    }
+}
+
 // 綁定事件監聽器
 document.getElementById('getSxmStatus').addEventListener('click', getSxmStatus);
+window.addEventListener('pywebviewready', loadCachedSxmStatus);
 >>>>>>> 76fd0ef7466dde9925d7d45caa148461b3536486
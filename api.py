@@ -7,6 +7,7 @@ Version: 1.0.0
 Date: 2024-11-26
 """
 
+import json
 import threading
 import time
 import logging
@@ -16,7 +17,9 @@ from dataclasses import dataclass
 from enum import Enum
 
 from utils.KB2902BSMU import KeysightB2902B, Channel, OutputMode
-from utils.SXMPyCalc import LocalCITSParams
+from utils.SXMPyCalc import LocalCITSParams, ScanGeometry
+from utils.SXMPyStateCache import StateCache
+from utils.SXMPyJournal import EventJournal
 from modules.SXMPySpectro import SXMSpectroControl
 from modules.SXMPycontroller import SXMController
 
@@ -41,6 +44,13 @@ class SMUControlAPI:
         self._reading_active = {1: False, 2: False}
         self._reading_threads: Dict[int, threading.Thread] = {}
         self._compliance = {1: 0.01, 2: 0.01}  # 預設compliance值（分通道）
+        # 暖啟動狀態快取，啟動時先以上次的值填入
+        self.state_cache = StateCache()
+        self._compliance.update(self.state_cache.get_compliance())
+        self._revalidation = None  # 背景重新驗證執行緒，同時只執行一個
+        self._revalidation_lock = threading.Lock()
+        # 本次執行的事件紀錄
+        self.journal = EventJournal()
         # 註冊清理處理器
         self._cleanup_handler = None
         self._cleanup_event = threading.Event()
@@ -187,6 +197,8 @@ class SMUControlAPI:
 
             self._compliance[channel] = value
             self.smu.smu.write(f":SENS{channel}:CURR:PROT {value}")
+            self.state_cache.set_compliance(self._compliance)
+            self.state_cache.save()
             self.beep()
             return True
 
@@ -238,6 +250,8 @@ class SMUControlAPI:
 
             self._compliance[channel] = value
             self.smu.smu.write(f":SENS{channel}:CURR:PROT {value}")
+            self.state_cache.set_compliance(self._compliance)
+            self.state_cache.save()
             self.beep()
             return True
 
@@ -325,6 +339,8 @@ class SMUControlAPI:
                 print("Creating new STM controller...")
                 self.stm = SXMController(debug_mode=True)
                 print("STM controller created")
+                self.stm.load_warm_state(self.state_cache)
+                self.stm.attach_journal(self.journal)
                 self.stm.initialize_smu_controller(self.smu)
 
                 # 使用簡單的變數賦值來測試連接
@@ -433,6 +449,8 @@ class SMUControlAPI:
                 raise Exception("STS Controller未初始化")
 
             scripts = self.stm.get_all_scripts()
+            self.state_cache.set_script_index(list(scripts))
+            self.state_cache.save()
             return {
                 name: script.to_dict()
                 for name, script in scripts.items()
@@ -754,19 +772,62 @@ class SMUControlAPI:
             if not self.ensure_controller():
                 raise Exception("STM 控制器未初始化")
 
-            status = {
-                'center_x': self.stm.GetScanPara('X'),
-                'center_y': self.stm.GetScanPara('Y'),
-                'range': self.stm.GetScanPara('Range'),
-                'angle': self.stm.GetScanPara('Angle'),
-                'total_lines': self.stm.GetScanPara('Pixel'),
-                'timestamp': time.strftime("%Y-%m-%d %H:%M:%S")
-            }
-
-            return status
+            # 一次批次讀取並更新快取
+            geometry = self.stm.refresh_warm_state()
+            return self._status_from_geometry(geometry, time.time(), cached=False)
 
         except Exception as e:
             raise Exception(f"獲取 SXM 狀態失敗: {str(e)}")
+
+    def get_cached_status(self) -> dict:
+        """
+        立即回傳快取的 SXM 狀態，並於背景重新驗證
+
+        重新驗證完成後以 updateSxmState 推送最新狀態到前端；
+        前一次重新驗證尚未完成時不再啟動新的讀取。
+
+        Returns
+        -------
+        dict
+            快取的狀態，沒有快取時回傳空字典
+        """
+        with self._revalidation_lock:
+            if self._revalidation is None or not self._revalidation.is_alive():
+                self._revalidation = threading.Thread(target=self._revalidate_status, daemon=True)
+                self._revalidation.start()
+
+        geometry = self.state_cache.get_geometry()
+        if geometry is None:
+            return {}
+        status = self._status_from_geometry(
+            geometry, self.state_cache.timestamp, cached=True)
+        status['script_index'] = self.state_cache.get_script_index()
+        return status
+
+    def _revalidate_status(self):
+        """背景重新讀取 SXM 狀態並推送到前端"""
+        try:
+            status = self.get_sxm_status()
+            if webview.windows:
+                window = webview.windows[0]
+                window.evaluate_js(f"updateSxmState({json.dumps(status)})")
+        except Exception as e:
+            print(f"Status revalidation error: {str(e)}")
+
+    @staticmethod
+    def _status_from_geometry(geometry: ScanGeometry, timestamp: Optional[float],
+                              cached: bool) -> dict:
+        """將掃描幾何轉為前端使用的狀態字典"""
+        return {
+            'center_x': geometry.center_x,
+            'center_y': geometry.center_y,
+            'range': geometry.scan_range,
+            'angle': geometry.angle,
+            'total_lines': geometry.pixels,
+            'timestamp': time.strftime(
+                "%Y-%m-%d %H:%M:%S", time.localtime(timestamp)) if timestamp else None,
+            'cached': cached
+        }
     # ========== Local CITS functions END ========== #
 
     # ========== CITS functions END ========== #
@@ -777,5 +838,6 @@ class SMUControlAPI:
             self.disconnect_smu()
             if self.stm:
                 self.stm.safe_shutdown()
+            self.journal.close()
         except Exception as e:
             self.logger.error(f"Cleanup error: {str(e)}")
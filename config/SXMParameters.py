@@ -46,4 +46,36 @@ class SXMParameters:
         'Slope': int,       # 平面校正模式
         'SlopeX': float,    # X斜率校正
         'SlopeY': float     # Y斜率校正
-    }
\ No newline at end of file
+    }
+
+    # 光譜參數定義（SpectPara 的編號或名稱）
+    # SXM 沒有對應的讀取指令，其值在寫入時由控制器記錄
+    SPECT_PARAMS = {
+        0: int,             # 光譜類型
+        1: float,           # 探針X位置
+        2: float,           # 探針Y位置
+        3: float,           # 延遲時間1 (ms)
+        4: float,           # 延遲時間2 (ms)
+        5: float,           # dz1 (nm)
+        6: float,           # dz2 (nm)
+        7: float,           # 起始偏壓 (V)
+        8: float,           # 結束偏壓 (V)
+        'Points': int,      # 量測點數
+        'AUTOSAVE': int,    # 自動儲存
+        'Repeat': int       # 自動重複
+    }
+
+    # 掃描器 X/Y DAC 的 GetChannel 編號（RemoteSXM/Channel.py：GetChannel(-2) 為 DAC3 x-direction）
+    # 讀值為 DAC 輸出的命令值，跟隨 SXM 的斜坡移動，但看不到壓電本身的蠕變
+    SCANNER_DAC_CHANNELS = (-2, -3)
+
+    # 快照還原時略過的掃描參數
+    # Scan/LineNr 是狀態值；Pixel 在SXM中以下拉選單的索引設定，直接寫回讀值會選到錯誤的項目；
+    # X/Y/Range/Angle 由使用者或移動序列決定，DriftX/DriftY 由 update_drift 持續更新，
+    # AutoSave 是使用者設定，量測程序不改變這些值，寫回只會覆蓋期間其他來源的更新
+    SNAPSHOT_SKIP_RESTORE = ('Scan', 'LineNr', 'Pixel', 'X', 'Y', 'Range', 'Angle',
+                             'DriftX', 'DriftY', 'AutoSave')
+
+    # 快照還原時略過的回饋參數
+    # ZOffset/ZOffsetSlew 寫入後無法驗證（見 SetFeedPara），不自動寫回
+    SNAPSHOT_SKIP_RESTORE_FEEDBACK = ('ZOffset', 'ZOffsetSlew')
@@ -1,16 +1,93 @@
 from . import SXMRemote
 import time
+from functools import wraps
+from dataclasses import dataclass, field
 from config.SXMParameters import SXMParameters
-from typing import Optional
+from utils.SXMPyCalc import ScanGeometry, ScanTimingModel
+from utils.SXMPyDryRun import DryRunClient, DryRunReport
+from utils.SXMPyJournal import EventJournal, JournalEvent
+from typing import Optional, Dict, List, Tuple, Any
+
+
+@dataclass(frozen=True)
+class InstrumentSnapshot:
+    """
+    儀器狀態快照
+    以一次批次讀取取得的掃描、回饋與光譜參數
+    """
+    scan: Dict[str, float] = field(default_factory=dict)
+    feedback: Dict[str, float] = field(default_factory=dict)
+    spect: Dict[Any, float] = field(default_factory=dict)
+    timestamp: float = 0.0
+
+    def diff(self, current: 'InstrumentSnapshot',
+             tolerance: float = 1e-6) -> List[Tuple[str, Any, float]]:
+        """
+        計算由目前狀態回到此快照所需的參數變更
+
+        Parameters
+        ----------
+        current : InstrumentSnapshot
+            目前的儀器狀態
+        tolerance : float
+            視為相同的誤差範圍
+
+        Returns
+        -------
+        List[Tuple[str, Any, float]]
+            (類別, 參數, 目標值) 列表，類別為 'scan'、'feedback' 或 'spect'
+        """
+        changes = []
+        for kind in ('scan', 'feedback', 'spect'):
+            target = getattr(self, kind)
+            now = getattr(current, kind)
+            for param, value in target.items():
+                if value is None:
+                    continue
+                if kind == 'scan' and param in SXMParameters.SNAPSHOT_SKIP_RESTORE:
+                    continue
+                if kind == 'feedback' and param in SXMParameters.SNAPSHOT_SKIP_RESTORE_FEEDBACK:
+                    continue
+                current_value = now.get(param)
+                if current_value is None or abs(float(current_value) - float(value)) > tolerance:
+                    changes.append((kind, param, value))
+
+        # 回饋開關最後切換，確保其他回饋參數已就位
+        changes.sort(key=lambda c: c[0] == 'feedback' and c[1] == 'Enable')
+        return changes
+
+def supports_dry_run(method):
+    """
+    讓高階程序接受 dry_run 參數
+
+    dry_run=True 時不操作儀器，改為回傳 SXMBase.run_dry_run 的統計結果；
+    dry_run_state 為起始的 InstrumentSnapshot，未提供時使用狀態快取
+    """
+    @wraps(method)
+    def wrapper(self, *args, dry_run=False, dry_run_state=None, **kwargs):
+        if dry_run and self._dry_run is None:
+            return self.run_dry_run(method, *args, initial_state=dry_run_state, **kwargs)
+        return method(self, *args, **kwargs)
+    return wrapper
+
 
 class SXMBase:
     """
     SXM控制器的基礎類別
     提供基本的DDE通訊和參數存取功能
     """
+
+    # dry run 結束後還原的屬性，子類別可加入自己的狀態
+    _DRY_RUN_STATE = ('current_state', 'spect_state', 'last_update')
+
+    @staticmethod
+    def client_factory():
+        """建立DDE客戶端，離線測試的子類別可改為回傳 DryRunClient 等替身"""
+        return SXMRemote.DDEClient("SXM", "Remote")
+
     def __init__(self, debug_mode=False):
         # DDE客戶端
-        self.MySXM = SXMRemote.DDEClient("SXM", "Remote")
+        self.MySXM = self.client_factory()
         self.debug_mode = debug_mode
         
         # 參數定義
@@ -28,9 +105,145 @@ class SXMBase:
             'aspect_ratio': 1.0 # Image format (預設1.0)
         }
         
+        # 光譜參數（SXM無讀取指令，於寫入時記錄）
+        self.spect_state = {}
+
         # 時間戳記
         self.last_update = None
 
+        # 事件紀錄（選用）
+        self.journal = None
+
+        # dry run 統計，None表示實際操作儀器
+        self._dry_run = None
+
+        # 暖啟動狀態快取，dry run 以此作為起始狀態
+        self.state_cache = None
+
+    def attach_journal(self, journal: Optional[EventJournal]):
+        """
+        設定事件紀錄器，None表示停止紀錄
+
+        Parameters
+        ----------
+        journal : EventJournal or None
+            事件紀錄器
+        """
+        self.journal = journal
+
+    @property
+    def dry_running(self) -> bool:
+        """是否正在 dry run"""
+        return self._dry_run is not None
+
+    def _sleep(self, seconds: float):
+        """固定等待，dry run 時只累加等待時間"""
+        if self._dry_run is not None:
+            self._dry_run.sleep_time += max(seconds, 0.0)
+            return
+        time.sleep(seconds)
+
+    def _cached_snapshot(self) -> InstrumentSnapshot:
+        """
+        以狀態快取組成儀器快照，不存取硬體
+
+        Returns
+        -------
+        InstrumentSnapshot
+            快取的掃描幾何、回饋開關與光譜參數
+
+        Raises
+        ------
+        ValueError
+            沒有快取的掃描幾何時
+        """
+        geometry = None if self.state_cache is None else self.state_cache.get_geometry()
+        if geometry is None:
+            raise ValueError("沒有快取的掃描幾何，請提供 dry_run_state")
+
+        scan = {param: getattr(geometry, name)
+                for param, name in ScanGeometry.SCAN_PARAM_FIELDS.items()
+                if getattr(geometry, name) is not None}
+        feedback = {}
+        if self.state_cache.get_feedback_state() is not None:
+            feedback['Enable'] = self.state_cache.get_feedback_state()
+        spect = self.state_cache.get_spect_state()
+        spect.update(self.spect_state)
+        return InstrumentSnapshot(scan=scan, feedback=feedback, spect=spect,
+                                  timestamp=self.state_cache.timestamp or 0.0)
+
+    def run_dry_run(self, procedure, *args, command_time: float = 0.05,
+                    initial_state: Optional[InstrumentSnapshot] = None, **kwargs) -> dict:
+        """
+        不操作儀器執行程序，統計命令數並預估時間
+
+        起始狀態取自 initial_state 或狀態快取，所有命令都由 DryRunClient 回應，
+        不會對儀器送出任何讀寫；事件等待立即返回，固定等待只累加時間。
+        結束後還原控制器狀態。
+
+        Parameters
+        ----------
+        procedure : callable
+            未綁定的程序，以 procedure(self, *args, **kwargs) 呼叫
+        command_time : float
+            每個DDE程式的預估往返時間（秒）
+        initial_state : InstrumentSnapshot, optional
+            起始的儀器狀態，未提供時以 state_cache 組成
+
+        Returns
+        -------
+        dict
+            DryRunReport.as_dict() 的結果
+
+        Raises
+        ------
+        ValueError
+            未提供 initial_state 且沒有快取的掃描幾何時
+        """
+        initial = initial_state if initial_state is not None else self._cached_snapshot()
+
+        saved = {}
+        for name in self._DRY_RUN_STATE:
+            if hasattr(self, name):
+                value = getattr(self, name)
+                saved[name] = value.copy() if isinstance(value, dict) else value
+
+        report = DryRunReport(command_time=command_time)
+        client, journal = self.MySXM, self.journal
+        self.MySXM = DryRunClient(initial.scan, initial.feedback,
+                                  getattr(self, 'timing_model', None) or ScanTimingModel(),
+                                  report)
+        self.journal = None
+        self._dry_run = report
+        try:
+            for param, value in initial.scan.items():
+                if value is not None:
+                    self._update_state(param.lower(), value)
+            self.spect_state.update(initial.spect)
+            report.success = bool(procedure(self, *args, **kwargs))
+        finally:
+            self._dry_run = None
+            self.MySXM, self.journal = client, journal
+            for name, value in saved.items():
+                setattr(self, name, value)
+
+        if self.debug_mode:
+            print(f"Dry run {getattr(procedure, '__name__', procedure)}: "
+                  f"{report.programs} DDE programs, {report.scan_lines} scan lines, "
+                  f"{report.frames} frames, {report.sts_points} STS points, {report.moves} moves, "
+                  f"predicted {report.predicted_duration / 60:.1f} min")
+        return report.as_dict()
+
+    def _journal(self, kind: JournalEvent, value: float = float('nan'), text: Optional[str] = None):
+        """寫入事件紀錄，紀錄失敗不影響控制流程"""
+        if self.journal is None:
+            return
+        try:
+            self.journal.record(kind, value, text)
+        except Exception as e:
+            if self.debug_mode:
+                print(f"Journal error: {str(e)}")
+
     def _send_command(self, command: str) -> tuple[bool, Optional[str]]:
         """
         發送DDE命令到SXM
@@ -45,6 +258,7 @@ class SXMBase:
         Tuple[bool, Optional[str]]
             (成功與否, 回應內容)
         """
+        start_time = time.monotonic()
         try:
             if self.debug_mode:
                 print(f"Sending command: {command}")
@@ -52,6 +266,7 @@ class SXMBase:
             # 使用SendWait而不是execute
             self.MySXM.SendWait(command)
             response = self.MySXM.LastAnswer
+            self._journal(JournalEvent.COMMAND, time.monotonic() - start_time, command)
                 
             if self.debug_mode:
                 print(f"Response: {response}")
@@ -59,6 +274,7 @@ class SXMBase:
             return True, response
             
         except Exception as e:
+            self._journal(JournalEvent.COMMAND_ERROR, time.monotonic() - start_time, command)
             if self.debug_mode:
                 print(f"Command error: {str(e)}")
             return False, None
@@ -74,28 +290,129 @@ class SXMBase:
             
         Returns
         -------
-        Any
-            解析後的值
+        float or None
+            回應中的第一個數值，與 _parse_values 使用相同的解析規則
+        """
+        values = self._parse_values(response)
+        return values[0] if values else None
+
+    def _parse_values(self, response) -> List[float]:
+        """
+        解析含有多行輸出的DDE回應
+
+        Parameters
+        ----------
+        response : bytes or str
+            DDE回應
+
+        Returns
+        -------
+        List[float]
+            依輸出順序排列的數值
         """
+        values = []
         try:
             if isinstance(response, bytes):
-                response_str = response.decode('utf-8').strip()
-                lines = response_str.split('\r\n')
-                
-                # 跳過DDE命令行
-                for line in lines:
-                    if not line.startswith('DDE Cmd'):
-                        try:
-                            return float(line.strip())
-                        except ValueError:
-                            continue
-                            
-            return None
-            
+                response = response.decode('utf-8')
+            if not isinstance(response, str):
+                return values
+
+            for line in response.strip().split('\r\n'):
+                if line.startswith('DDE Cmd'):
+                    continue
+                try:
+                    values.append(float(line.strip()))
+                except ValueError:
+                    continue
+
         except Exception as e:
             if self.debug_mode:
                 print(f"Parse error: {str(e)}")
+
+        return values
+
+    def _batch_read(self, items: List[Tuple[str, str]]) -> Dict[Tuple[str, str], Optional[float]]:
+        """
+        以單一DDE程式讀取多個參數
+
+        Parameters
+        ----------
+        items : List[Tuple[str, str]]
+            (讀取函式, 參數名稱) 列表，讀取函式為 'GetScanPara' 或 'GetFeedPara'
+
+        Returns
+        -------
+        Dict[Tuple[str, str], Optional[float]]
+            (讀取函式, 參數名稱) 對應的數值，讀取失敗者為None
+        """
+        if not items:
+            return {}
+
+        result = self._write_and_read([], items)
+        if result is not None:
+            return result
+
+        # 回應行數不符時，改為逐一讀取
+        if self.debug_mode:
+            print(f"Batch read of {len(items)} values failed, falling back to single reads")
+        result = {}
+        for getter, param in items:
+            if getter == 'GetScanPara':
+                result[(getter, param)] = self.GetScanPara(param)
+            else:
+                result[(getter, param)] = self.GetFeedbackPara(param)
+        return result
+
+    @staticmethod
+    def _read_lines(items: List[Tuple[str, str]]) -> List[str]:
+        """產生讀取並輸出參數的DDE程式行"""
+        lines = ["a := 0.0;"]
+        for getter, param in items:
+            lines.append(f"a := {getter}('{param}');")
+            lines.append("Writeln(a);")
+        return lines
+
+    def _write_and_read(self, commands: List[str],
+                        items: List[Tuple[str, str]]) -> Optional[Dict[Tuple[str, str], float]]:
+        """
+        以單一DDE程式先送出設定指令再讀回參數
+
+        Parameters
+        ----------
+        commands : List[str]
+            設定指令，例如 "ScanPara('X', 10);"
+        items : List[Tuple[str, str]]
+            (讀取函式, 參數名稱) 列表
+
+        Returns
+        -------
+        Dict[Tuple[str, str], float] or None
+            讀回的數值，發送失敗或回應行數不符時為None
+        """
+        success, response = self._send_command("\n".join(list(commands) + self._read_lines(items)))
+        values = self._parse_values(response) if success else []
+        if len(values) != len(items):
             return None
+        return dict(zip(items, values))
+
+    def _batch_write(self, commands: List[str]) -> bool:
+        """
+        以單一DDE程式送出多個設定指令
+
+        Parameters
+        ----------
+        commands : List[str]
+            DDE指令列表，例如 "ScanPara('X', 10);"
+
+        Returns
+        -------
+        bool
+            發送是否成功
+        """
+        if not commands:
+            return True
+        success, _ = self._send_command("\n".join(commands))
+        return success
 
     def GetScanPara(self, param):
         """
@@ -169,6 +486,115 @@ class SXMBase:
                 print(f"GetFeedbackPara error: {str(e)}")
             return None
 
+    def GetChannels(self, channels) -> Optional[List[float]]:
+        """
+        以單一DDE程式讀取多個通道
+
+        Parameters
+        ----------
+        channels : Iterable[int]
+            SXM 通道編號
+
+        Returns
+        -------
+        List[float] or None
+            依順序排列的通道數值，讀取失敗或回應行數不符時為None
+        """
+        try:
+            channels = [int(channel) for channel in channels]
+            lines = ["a := 0.0;"]
+            for channel in channels:
+                lines.append(f"a := GetChannel({channel});")
+                lines.append("Writeln(a);")
+            success, response = self._send_command("\n".join(lines))
+
+            values = self._parse_values(response) if success else []
+            return values if len(values) == len(channels) else None
+
+        except Exception as e:
+            if self.debug_mode:
+                print(f"GetChannels error: {str(e)}")
+            return None
+
+    def GetChannel(self, channel):
+        """
+        讀取通道目前的數值
+
+        Parameters
+        ----------
+        channel : int
+            SXM 通道編號
+
+        Returns
+        -------
+        float or None
+            通道數值
+        """
+        try:
+            command = (
+                "a := 0.0;\n"
+                f"a := GetChannel({int(channel)});\n"
+                "Writeln(a);"
+            )
+            success, response = self._send_command(command)
+
+            if success:
+                return self._parse_response(response)
+            return None
+
+        except Exception as e:
+            if self.debug_mode:
+                print(f"GetChannel error: {str(e)}")
+            return None
+
+    def GetScanParas(self, params) -> Dict[str, Optional[float]]:
+        """
+        以一次批次讀取獲取多個掃描參數
+
+        Parameters
+        ----------
+        params : Iterable[str]
+            參數名稱
+
+        Returns
+        -------
+        Dict[str, Optional[float]]
+            參數名稱對應的數值
+        """
+        params = list(params)
+        for param in params:
+            if param not in self.parameters.SCAN_PARAMS:
+                raise ValueError(f"Unknown scan parameter: {param}")
+
+        values = self._batch_read([('GetScanPara', p) for p in params])
+        result = {p: values.get(('GetScanPara', p)) for p in params}
+        for param, value in result.items():
+            if value is not None:
+                self._update_state(param.lower(), value)
+        return result
+
+    def GetFeedbackParas(self, params) -> Dict[str, Optional[float]]:
+        """
+        以一次批次讀取獲取多個回饋參數
+
+        Parameters
+        ----------
+        params : Iterable[str]
+            參數名稱
+
+        Returns
+        -------
+        Dict[str, Optional[float]]
+            參數名稱對應的數值
+        """
+        params = list(params)
+        for param in params:
+            if param not in self.parameters.FEEDBACK_PARAMS:
+                raise ValueError(f"Unknown feedback parameter: {param}")
+
+        values = self._batch_read([('GetFeedPara', p) for p in params])
+        return {p: values.get(('GetFeedPara', p)) for p in params}
+
     def SetScanPara(self, param, value):
         """
         設定掃描參數
@@ -256,4 +682,132 @@ class SXMBase:
         """
         if key in self.current_state:
             self.current_state[key] = value
-            self.last_update = time.time()
\ No newline at end of file
+            self.last_update = time.time()
+
+    def SetSpectPara(self, param, value) -> bool:
+        """
+        設定光譜參數並記錄其值
+
+        Parameters
+        ----------
+        param : int or str
+            參數編號或名稱（參考SXMParameters.SPECT_PARAMS）
+        value : Any
+            參數值
+
+        Returns
+        -------
+        bool
+            發送是否成功
+        """
+        success, _ = self._send_command(self._spect_command(param, value))
+        if success:
+            self.spect_state[param] = value
+        return success
+
+    @staticmethod
+    def _spect_command(param, value) -> str:
+        """組成SpectPara指令"""
+        if isinstance(param, str):
+            return f"SpectPara('{param}', {value});"
+        return f"SpectPara({param}, {value});"
+
+    # ========== 狀態快照 ========== #
+    def snapshot(self, scan_params=None, feedback_params=None) -> InstrumentSnapshot:
+        """
+        以一次批次讀取擷取目前的儀器狀態
+
+        Parameters
+        ----------
+        scan_params, feedback_params : Iterable[str], optional
+            要讀取的掃描與回饋參數，預設為全部
+
+        Returns
+        -------
+        InstrumentSnapshot
+            掃描、回饋與光譜參數的快照
+        """
+        scan_params = list(self.parameters.SCAN_PARAMS if scan_params is None else scan_params)
+        feedback_params = list(self.parameters.FEEDBACK_PARAMS
+                               if feedback_params is None else feedback_params)
+        values = self._batch_read(
+            [('GetScanPara', p) for p in scan_params] +
+            [('GetFeedPara', p) for p in feedback_params]
+        )
+
+        scan = {p: values.get(('GetScanPara', p)) for p in scan_params}
+        for param, value in scan.items():
+            if value is not None:
+                self._update_state(param.lower(), value)
+
+        return InstrumentSnapshot(
+            scan=scan,
+            feedback={p: values.get(('GetFeedPara', p)) for p in feedback_params},
+            spect=dict(self.spect_state),
+            timestamp=time.time()
+        )
+
+    def restore(self, snapshot: InstrumentSnapshot, tolerance: float = 1e-6) -> bool:
+        """
+        將儀器還原至快照狀態，只以一次批次寫入送出有差異的參數
+
+        只讀取與寫回可還原的參數，SNAPSHOT_SKIP_RESTORE 中的掃描框位置、
+        漂移補償與 AutoSave 等保持目前的值。
+
+        Parameters
+        ----------
+        snapshot : InstrumentSnapshot
+            要還原的狀態
+        tolerance : float
+            視為相同的誤差範圍
+
+        Returns
+        -------
+        bool
+            還原指令是否發送成功
+        """
+        try:
+            scan_params = [p for p in snapshot.scan
+                           if p not in SXMParameters.SNAPSHOT_SKIP_RESTORE]
+            feedback_params = [p for p in snapshot.feedback
+                               if p not in SXMParameters.SNAPSHOT_SKIP_RESTORE_FEEDBACK]
+            if scan_params or feedback_params:
+                current = self.snapshot(scan_params, feedback_params)
+            else:
+                current = InstrumentSnapshot(spect=dict(self.spect_state))
+
+            changes = snapshot.diff(current, tolerance)
+            if not changes:
+                return True
+
+            commands = []
+            for kind, param, value in changes:
+                if kind == 'scan':
+                    if self.parameters.SCAN_PARAMS[param] in (bool, int):
+                        value = int(value)
+                    commands.append(f"ScanPara('{param}', {value});")
+                elif kind == 'feedback':
+                    if self.parameters.FEEDBACK_PARAMS[param] in (bool, int):
+                        value = int(value)
+                    commands.append(f"FeedPara('{param}', {value});")
+                else:
+                    commands.append(self._spect_command(param, value))
+
+            if self.debug_mode:
+                print(f"Restoring {len(changes)} parameters: "
+                      f"{[(kind, param) for kind, param, _ in changes]}")
+
+            if not self._batch_write(commands):
+                return False
+
+            for kind, param, value in changes:
+                if kind == 'scan':
+                    self._update_state(param.lower(), value)
+                elif kind == 'spect':
+                    self.spect_state[param] = value
+            return True
+
+        except Exception as e:
+            if self.debug_mode:
+                print(f"Restore error: {str(e)}")
+            return False
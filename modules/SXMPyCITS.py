@@ -1,10 +1,16 @@
 # modules/SXMPyCITS.py
 
+import os
 import time
 import math
+from .SXMPyBase import supports_dry_run
 from .SXMPySpectro import SXMSpectroControl
-from utils.SXMPyCalc import CITSCalculator, LocalCITSCalculator, LocalCITSParams
-from typing import List
+import numpy as np
+from utils.SXMPyCalc import (CITSCalculator, CITSCube, LocalCITSCalculator, LocalCITSParams,
+                             PlanValidator, ScanGeometry)
+from typing import List, Optional, Tuple
+from config.SXMParameters import SXMParameters
+from utils.SXMPyTransform import FrameTransform
 
 
 class SXMCITSControl(SXMSpectroControl):
@@ -13,10 +19,243 @@ class SXMCITSControl(SXMSpectroControl):
     繼承光譜測量控制以獲得掃描、位置和光譜測量功能
     """
 
+    _DRY_RUN_STATE = SXMSpectroControl._DRY_RUN_STATE + (
+        'last_decimation_report', 'last_line_sync_report', 'last_cits_cube', 'cits_cubes')
+    # STS 線期間允許的 Line Sync 計數增加（觸發時正在開始的一行）
+    LINE_SYNC_ROW_TOLERANCE = 1
+
     def __init__(self, debug_mode=False):
         super().__init__(debug_mode)
+        self.last_decimation_report = None
+        self.last_line_sync_report = None
+        self.last_cits_cube = None
+        self.cits_cubes = {}    # auto_move_ssts_CITS 雙向量測的結果，以 (位置索引, 重複次數) 為鍵
+
+    def predict_cits_duration(self, scanlines: List[int], num_sts_points: int,
+                              sts_point_time: float = 1.0) -> Optional[float]:
+        """
+        預測 CITS 量測所需時間
+
+        Parameters
+        ----------
+        scanlines : List[int]
+            各段的 ScanLine 參數
+        num_sts_points : int
+            STS 量測點總數
+        sts_point_time : float
+            每個 STS 點的時間（秒），含移動與等待
+
+        Returns
+        -------
+        float or None
+            預測時間（秒），無法取得掃描速度時為None
+        """
+        speed = self._scan_speed()
+        if not speed:
+            return None
+        scan_time = sum(self.predict_scan_time(n, speed) for n in scanlines if n > 0)
+        return scan_time + num_sts_points * sts_point_time
+
+    def plan_decimated_segment(self, scan_count: int, speed: float, fast_speed: float,
+                               tracking_lines: int = 2) -> Optional[Tuple[int, int]]:
+        """
+        將一段掃描拆成高速段與原速的追蹤段
+
+        拆分後兩段的行數總和與原本相同。
+
+        Parameters
+        ----------
+        scan_count : int
+            原本的 ScanLine 參數
+        speed : float
+            原本的掃描速度 (lines/s)
+        fast_speed : float
+            高速段的掃描速度 (lines/s)
+        tracking_lines : int
+            STS 線之前以原速掃描的行數，讓回饋與漂移穩定
+
+        Returns
+        -------
+        Tuple[int, int] or None
+            (高速段, 追蹤段) 的 ScanLine 參數，追蹤段為0表示不需追蹤；
+            預測無法節省時間時為None
+        """
+        if not speed or not fast_speed or fast_speed <= speed:
+            return None
+
+        tracking_count = max(tracking_lines, 0)
+        fast_count = scan_count - tracking_count
+        if fast_count < 1:
+            return None
+
+        normal = self.predict_scan_time(scan_count, speed)
+        decimated = self.predict_scan_time(fast_count, fast_speed)
+        if tracking_count:
+            decimated += self.predict_scan_time(tracking_count, speed)
+        if decimated >= normal:
+            return None
+        return fast_count, tracking_count
+
+    def _set_scan_speed(self, speed: float) -> bool:
+        """設定掃描速度並更新已知狀態"""
+        if not self._batch_write([f"ScanPara('Speed', {speed});"]):
+            return False
+        self.current_state['speed'] = speed
+        return True
+
+    def _scan_cits_segment(self, scan_count: int, speed: float,
+                           fast_speed: Optional[float] = None,
+                           tracking_lines: int = 2) -> Tuple[float, float]:
+        """
+        掃描 STS 線之間的一段，提供 fast_speed 時以高速掃描中間部分
 
-    def standard_cits(self, num_points_x: int, num_points_y: int, scan_direction: int = 1) -> bool:
+        Returns
+        -------
+        Tuple[float, float]
+            (原速預測時間, 實際時間)，單位秒
+        """
+        expected = self.predict_scan_time(scan_count, speed) or 0.0
+        start = time.monotonic()
+
+        split = (self.plan_decimated_segment(scan_count, speed, fast_speed, tracking_lines)
+                 if fast_speed else None)
+        if split is None:
+            if not self.scan_lines_for_sts(scan_count):
+                raise RuntimeError(f"掃描 {scan_count} 條線失敗")
+            return expected, time.monotonic() - start
+
+        fast_count, tracking_count = split
+        if not self._set_scan_speed(fast_speed):
+            raise RuntimeError(f"設定掃描速度 {fast_speed} 失敗")
+        scanned = self.scan_lines_for_sts(fast_count)
+        # STS 線前必定回到原本的速度
+        if not self._set_scan_speed(speed):
+            raise RuntimeError(f"還原掃描速度 {speed} 失敗")
+        if not scanned:
+            raise RuntimeError(f"高速掃描 {fast_count} 條線失敗")
+
+        if tracking_count and not self.scan_lines_for_sts(tracking_count):
+            raise RuntimeError(f"追蹤掃描 {tracking_count} 條線失敗")
+        return expected, time.monotonic() - start
+
+    def _run_sts_row(self, sts_line, row_index: int, num_rows: int):
+        """依序量測一條 STS 線上的所有點，單點失敗時繼續下一點"""
+        if self.debug_mode:
+            print(f"\n>>> 執行第 {row_index+1}/{num_rows} 條 STS 線")
+
+        for j, (x, y) in enumerate(sts_line):
+            try:
+                if self.debug_mode:
+                    print(
+                        f"  STS點 ({j+1}/{len(sts_line)}): ({x:.3f}, {y:.3f})")
+
+                if not self.simple_spectroscopy(x, y):
+                    raise RuntimeError(f"STS測量失敗: ({x}, {y})")
+
+                # 等待STS測量完成
+                self._sleep(1.0)  # 暫時使用固定等待時間
+                if self.sts_log is not None:
+                    self.wait_for_spectrum()
+
+            except Exception as e:
+                print(f"STS點測量失敗 ({x}, {y}): {str(e)}")
+                continue
+
+        if self.debug_mode:
+            print(f"<<< 完成第 {row_index+1}/{num_rows} 條 STS 線")
+
+    def plan_line_sync_targets(self, scanlines: List[int]) -> List[int]:
+        """
+        將掃描線分配轉換為連續掃描中觸發各條 STS 線的 Line Sync 計數
+
+        分配的行數與 ScanLine 分段掃描相同；
+        完成 k 行後第 k+1 行開始，Line Sync 計數達到 k+1 即為 STS 線的位置。
+
+        Parameters
+        ----------
+        scanlines : List[int]
+            CITSCalculator.plan_cits 的掃描線分配
+
+        Returns
+        -------
+        List[int]
+            每條 STS 線的目標計數，超過影像行數者在影像結束時觸發
+        """
+        return [int(total) + 1 for total in np.cumsum(scanlines[:-1])]
+
+    def _run_cits_line_sync(self, coordinates, scanlines: List[int], geometry: ScanGeometry,
+                            speed: float, collect_freq: Optional[float] = None):
+        """
+        連續掃描一張影像，以 Line Sync 計數在行邊界觸發 STS 線
+
+        STS 期間由 SXM 暫停掃描、結束後繼續，整張影像只有一次掃描開始與結束。
+        每條 STS 線前後比較 Line Sync 計數，掃描在 STS 期間前進超過
+        LINE_SYNC_ROW_TOLERANCE 行表示沒有暫停，立即中止量測。
+        觸發時實際計數與目標的差、每條 STS 線期間前進的行數記錄於 last_line_sync_report。
+        """
+        targets = self.plan_line_sync_targets(scanlines)
+        total_lines = geometry.total_lines
+        num_rows = len(targets)
+        triggered = []
+        row_advance = []
+        counter = self.start_line_sync(collect_freq)
+        try:
+            off_count = self.scan_status.scan_off_count
+            if not self.scan_on():
+                raise RuntimeError("開始掃描失敗")
+
+            def timeout_for(lines):
+                lines = max(lines, 1)
+                return self.timing_model.timeout(lines, speed) if speed else lines * 10
+
+            frame_done = False
+            for i, (sts_line, target) in enumerate(zip(coordinates, targets)):
+                if target > total_lines:
+                    # 位於影像最後一行之後的 STS 線在掃描結束時執行
+                    if not frame_done and not self.wait_for_scan_complete(
+                            timeout_for(total_lines + 1 - counter.count), since_count=off_count):
+                        raise RuntimeError("等待影像掃描結束超時")
+                    frame_done = True
+                elif not self.wait_for_line(target, timeout_for(target - counter.count)):
+                    raise RuntimeError(f"等待第 {target} 行的 Line Sync 超時")
+
+                triggered.append(target if self.dry_running else
+                                 max(counter.count, min(target, total_lines + 1)))
+                if self.debug_mode:
+                    print(f"\n=== Line Sync {triggered[-1]}（目標 {target}）===")
+                before = counter.count
+                self._run_sts_row(sts_line, i, num_rows)
+                row_advance.append(counter.count - before)
+                if row_advance[-1] > self.LINE_SYNC_ROW_TOLERANCE:
+                    raise RuntimeError(f"第 {i+1} 條 STS 線期間掃描前進了 {row_advance[-1]} 行，"
+                                       f"SXM 沒有在 STS 期間暫停掃描")
+
+            # 等待影像的最後一段掃描結束
+            if not frame_done and not self.wait_for_scan_complete(
+                    timeout_for(total_lines + 1 - counter.count), since_count=off_count):
+                raise RuntimeError("等待影像掃描結束超時")
+
+        finally:
+            if self.scan_status.is_scanning:
+                self.scan_off()
+            self.stop_line_sync()
+            lags = [t - target for t, target in zip(triggered, targets)]
+            self.last_line_sync_report = {
+                'targets': targets,
+                'triggered': triggered,
+                'max_lag': max(lags) if lags else 0,
+                'row_advance': row_advance,
+                'raster_paused': all(n <= self.LINE_SYNC_ROW_TOLERANCE for n in row_advance)
+            }
+            if self.debug_mode and lags:
+                print(f"Line Sync 觸發最大延遲 {max(lags)} 行")
+
+    @supports_dry_run
+    def standard_cits(self, num_points_x: int, num_points_y: int, scan_direction: int = 1,
+                      geometry: Optional[ScanGeometry] = None,
+                      fast_speed: Optional[float] = None,
+                      tracking_lines: int = 2, line_sync: bool = False,
+                      collect_freq: Optional[float] = None) -> bool:
         """
         執行標準 CITS 量測
 
@@ -28,38 +267,85 @@ class SXMCITSControl(SXMSpectroControl):
             Y方向量測點數
         scan_direction : int
             掃描方向 (1: 由下到上, -1: 由上到下)
+        geometry : ScanGeometry, optional
+            掃描幾何快照，未提供時以一次批次讀取獲取
+        fast_speed : float, optional
+            STS 線之間的掃描速度 (lines/s)，只需要光譜時用來縮短中間的形貌掃描；
+            未提供時全部以原速掃描
+        tracking_lines : int, optional
+            每條 STS 線之前以原速掃描的行數
+        line_sync : bool, optional
+            以連續掃描一張影像並由 Collect 的 Line Sync 通道觸發 STS 線，
+            取代每段 ScanLine 的開始與停止；不能與 fast_speed 同時使用
+        collect_freq : float, optional
+            line_sync 時的 Collect 取樣頻率（Hz）
+        dry_run : bool, optional
+            不操作儀器，只統計命令並預估時間
 
         Returns
         -------
-        bool
-            量測是否成功完成
+        bool or dict
+            量測是否成功完成；dry_run 時為 run_dry_run 的統計結果
         """
+        initial_state = None
         try:
-            # 獲取掃描參數
-            center_x = self.GetScanPara('X')
-            center_y = self.GetScanPara('Y')
-            scan_range = self.GetScanPara('Range')
-            scan_angle = self.GetScanPara('Angle')
-            # total_lines = self.GetScanPara('Pixel')
-            (total_lines, line_spacing) = self.calculate_scan_lines()
-            aspect_ratio = self.get_aspect_ratio()
+            # 記錄量測前的儀器狀態
+            initial_state = self.snapshot()
 
-            if any(v is None for v in [center_x, center_y, scan_range, scan_angle, total_lines]):
-                raise ValueError("無法獲取掃描參數")
+            # 獲取掃描參數
+            if geometry is None:
+                geometry = self.get_scan_geometry()
+
+            speed = self._scan_speed()
+            if fast_speed is not None:
+                if fast_speed <= 0:
+                    raise ValueError(f"Invalid fast scan speed: {fast_speed}")
+                fast_speed = min(fast_speed, SXMParameters.PARAM_RANGES['Speed'][1])
+            if tracking_lines < 0:
+                raise ValueError(f"tracking_lines must be non-negative: {tracking_lines}")
+            if line_sync and fast_speed is not None:
+                raise ValueError("line_sync cannot be combined with fast_speed")
 
             # 計算CITS座標和掃描線分配
-            coordinates, _, _, scanlines = CITSCalculator.calculate_cits_coordinates(
-                center_x, center_y, scan_range, scan_angle,
-                num_points_x, num_points_y, total_lines, scan_direction, aspect_ratio
+            coordinates, _, _, scanlines = CITSCalculator.plan_cits(
+                geometry, num_points_x, num_points_y, scan_direction
             )
 
             # check coordinates
             print(f"coordinates: {coordinates}")
 
+            # 在任何硬體動作之前檢查整個量測計畫
+            PlanValidator.validate_geometry_points(
+                coordinates, geometry).raise_if_invalid()
+
             if self.debug_mode:
                 print(f"開始CITS量測:")
                 print(f"掃描線分配: {scanlines}")
                 print(f"總掃描線數: {sum(scanlines)}")
+                eta = self.predict_cits_duration(scanlines, num_points_x * num_points_y)
+                if eta is not None:
+                    print(f"預計時間: {eta / 60:.1f} 分鐘")
+
+            predicted_saving = 0.0
+            expected_total = 0.0
+            measured_total = 0.0
+            if fast_speed:
+                for i, scan_count in enumerate(scanlines):
+                    tracking = tracking_lines if i < len(scanlines) - 1 else 0
+                    split = self.plan_decimated_segment(scan_count, speed, fast_speed, tracking)
+                    if split:
+                        decimated = sum(self.predict_scan_time(n, s) for n, s in
+                                        zip(split, (fast_speed, speed)) if n > 0)
+                        predicted_saving += self.predict_scan_time(scan_count, speed) - decimated
+                if self.debug_mode:
+                    print(f"STS線之間以 {fast_speed} lines/s 掃描，預計節省 {predicted_saving:.1f} 秒")
+
+            if line_sync:
+                self._run_cits_line_sync(coordinates, scanlines, geometry, speed,
+                                         collect_freq)
+                if self.debug_mode:
+                    print("\nCITS量測完成")
+                return True
 
             # 執行量測循環
             for i, (sts_line, scan_count) in enumerate(zip(coordinates, scanlines[:-1])):
@@ -68,40 +354,43 @@ class SXMCITSControl(SXMSpectroControl):
                     if self.debug_mode:
                         print(f"\n=== 掃描第 {i+1} 段 {scan_count} 條線 ===")
 
-                    # 使用新的scan_lines_for_sts函數
-                    if not self.scan_lines_for_sts(scan_count):
-                        raise RuntimeError(f"掃描第 {i+1} 段失敗")
-
-                # 執行STS線電性
-                if self.debug_mode:
-                    print(f"\n>>> 執行第 {i+1}/{num_points_y} 條 STS 線")
-
-                for j, (x, y) in enumerate(sts_line):
                     try:
-                        if self.debug_mode:
-                            print(
-                                f"  STS點 ({j+1}/{len(sts_line)}): ({x:.3f}, {y:.3f})")
+                        expected, measured = self._scan_cits_segment(
+                            scan_count, speed, fast_speed, tracking_lines)
+                    except RuntimeError as e:
+                        raise RuntimeError(f"掃描第 {i+1} 段失敗: {str(e)}")
+                    expected_total += expected
+                    measured_total += measured
 
-                        if not self.simple_spectroscopy(x, y):
-                            raise RuntimeError(f"STS測量失敗: ({x}, {y})")
-
-                        # 等待STS測量完成
-                        time.sleep(1.0)  # 暫時使用固定等待時間
-
-                    except Exception as e:
-                        print(f"STS點測量失敗 ({x}, {y}): {str(e)}")
-                        continue
-
-                if self.debug_mode:
-                    print(f"<<< 完成第 {i+1}/{num_points_y} 條 STS 線")
+                # 執行STS線電性
+                self._run_sts_row(sts_line, i, num_points_y)
 
-            # 執行最後一段掃描（如果有的話）
+            # 執行最後一段掃描（如果有的話），之後沒有 STS 線，不需追蹤
             if scanlines[-1] > 0:
                 if self.debug_mode:
                     print(f"\n=== 執行最後 {scanlines[-1]} 條掃描線 ===")
-                if not self.scan_lines_for_sts(scanlines[-1]):
+                try:
+                    expected, measured = self._scan_cits_segment(
+                        scanlines[-1], speed, fast_speed, 0)
+                    expected_total += expected
+                    measured_total += measured
+                except RuntimeError:
                     print("警告: 最後一段掃描失敗")
 
+            if fast_speed:
+                self.last_decimation_report = {
+                    'speed': speed,
+                    'fast_speed': fast_speed,
+                    'tracking_lines': tracking_lines,
+                    'predicted_saving': predicted_saving,
+                    'measured_saving': expected_total - measured_total,
+                    'scan_time': measured_total
+                }
+                if self.debug_mode:
+                    print(f"形貌掃描時間 {measured_total:.1f} 秒，"
+                          f"節省 預測 {predicted_saving:.1f} 秒 / 實際 "
+                          f"{expected_total - measured_total:.1f} 秒")
+
             if self.debug_mode:
                 print("\nCITS量測完成")
             return True
@@ -112,12 +401,57 @@ class SXMCITSControl(SXMSpectroControl):
             return False
 
         finally:
-            # 確保回到正確狀態
+            # 確保回到正確狀態：先開啟回饋，再還原其餘參數
             self.feedback_on()
+            if initial_state is not None:
+                self.restore(initial_state)
             if self.debug_mode:
-                print("feedback on")
+                print("instrument state restored")
+
+    def apply_slow_axis_window(self, geometry: ScanGeometry,
+                               coordinates: np.ndarray) -> ScanGeometry:
+        """
+        將掃描視窗暫時縮小到包含所有量測點的慢軸區帶
+
+        以一次批次寫入設定 X、Y 與 AspectRatio，並讀回實際幾何。
+        呼叫者負責在量測後以 restore 還原原本的視窗。
+
+        Parameters
+        ----------
+        geometry : ScanGeometry
+            完整的掃描幾何
+        coordinates : np.ndarray
+            (N, 2) 量測點座標 (nm)
 
-    def standard_local_cits(self, local_areas: List[LocalCITSParams], scan_direction: int = 1) -> bool:
+        Returns
+        -------
+        ScanGeometry
+            實際使用的掃描幾何，無法縮小時回傳原幾何
+        """
+        window = LocalCITSCalculator.plan_slow_axis_window(geometry, coordinates)
+        if window is None:
+            if self.debug_mode:
+                print("量測點分布於整個慢軸，使用完整掃描視窗")
+            return geometry
+
+        if not self._batch_write([
+            f"ScanPara('X', {window.center_x});",
+            f"ScanPara('Y', {window.center_y});",
+            f"ScanPara('AspectRatio', {window.aspect_ratio});"
+        ]):
+            raise RuntimeError("設定局部掃描視窗失敗")
+
+        actual = self.get_scan_geometry()
+        if self.debug_mode:
+            print(f"局部掃描視窗: 中心 ({actual.center_x:.3f}, {actual.center_y:.3f}) nm, "
+                  f"慢軸 {actual.slow_axis_range:.3f} nm, "
+                  f"掃描線 {geometry.total_lines} -> {actual.total_lines}")
+        return actual
+
+    @supports_dry_run
+    def standard_local_cits(self, local_areas: List[LocalCITSParams], scan_direction: int = 1,
+                            geometry: Optional[ScanGeometry] = None,
+                            windowed: bool = False) -> bool:
         """
         執行局部區域 CITS 量測
 
@@ -134,50 +468,60 @@ class SXMCITSControl(SXMSpectroControl):
             - 起始點方向 (startpoint_direction)
         scan_direction : int, optional
             掃描方向，1 表示由下到上，-1 表示由上到下
+        geometry : ScanGeometry, optional
+            掃描幾何快照，未提供時以一次批次讀取獲取
+        windowed : bool, optional
+            是否只掃描包含所有量測點的慢軸區帶，量測後還原原本的視窗
+        dry_run : bool, optional
+            不操作儀器，只統計命令並預估時間
 
         Returns
         -------
-        bool
-            量測是否成功完成
+        bool or dict
+            量測是否成功完成；dry_run 時為 run_dry_run 的統計結果
         """
+        initial_state = None
         try:
-            # 獲取掃描參數
-            center_x = self.GetScanPara('X')
-            center_y = self.GetScanPara('Y')
-
-            # scan_range here is the slow axis range
-            (_, scan_range) = self.calculate_actual_scan_dimensions()
-            # scan_range = self.GetScanPara('Range')
-            scan_angle = self.GetScanPara('Angle')
-            # total_lines = self.GetScanPara('Pixel')
-            (total_lines, line_spacing) = self.calculate_scan_lines()
+            # 記錄量測前的儀器狀態
+            initial_state = self.snapshot()
 
-            if any(v is None for v in [center_x, center_y, scan_range, scan_angle, total_lines]):
-                raise ValueError("無法獲取掃描參數")
+            # 獲取掃描參數
+            if geometry is None:
+                geometry = self.get_scan_geometry()
 
             if self.debug_mode:
                 print(f"\n開始局部 CITS 量測:")
-                print(f"中心位置: ({center_x}, {center_y}) nm")
-                print(f"掃描範圍: {scan_range} nm")
-                print(f"掃描角度: {scan_angle}°")
-
-            # 計算所有區域的座標點
-            coordinates, _, _, (slow_axis, fast_axis) = LocalCITSCalculator.combi_local_cits_coordinates(
-                center_x, center_y, scan_range, scan_angle,
-                total_lines, scan_direction, local_areas
-            )
-
-            # 計算掃描線分配和座標群組
-            scanline_distribution, coordinate_distribution = LocalCITSCalculator.calculate_local_scanline_distribution(
-                coordinates, center_x, center_y, scan_angle,
-                scan_range, scan_direction, total_lines
-            )
+                print(f"中心位置: ({geometry.center_x}, {geometry.center_y}) nm")
+                print(f"掃描範圍: {geometry.slow_axis_range} nm")
+                print(f"掃描角度: {geometry.angle}°")
+
+            # 計算所有區域的座標點、掃描線分配和座標群組
+            coordinates, scanline_distribution, coordinate_distribution = \
+                LocalCITSCalculator.plan_local_cits(geometry, local_areas, scan_direction)
+
+            # 在任何硬體動作之前檢查整個量測計畫
+            PlanValidator.validate_geometry_points(
+                coordinates, geometry).raise_if_invalid()
+
+            # 縮小到量測點所在的慢軸區帶，並在新視窗中重新分配掃描線
+            if windowed:
+                window = self.apply_slow_axis_window(geometry, coordinates)
+                if window is not geometry:
+                    geometry = window
+                    coordinates, scanline_distribution, coordinate_distribution = \
+                        LocalCITSCalculator.plan_local_cits(geometry, local_areas, scan_direction)
+                    PlanValidator.validate_geometry_points(
+                        coordinates, geometry).raise_if_invalid()
 
             if self.debug_mode:
                 print(f"掃描線分配: {scanline_distribution}")
                 print(f"座標群組數: {len(coordinate_distribution)}")
                 print(
                     f"總量測點數: {sum(len(coords) for coords in coordinate_distribution)}")
+                eta = self.predict_cits_duration(
+                    scanline_distribution, sum(len(coords) for coords in coordinate_distribution))
+                if eta is not None:
+                    print(f"預計時間: {eta / 60:.1f} 分鐘")
 
             # 執行量測循環
             for i, (coords_group, scan_count) in enumerate(zip(coordinate_distribution, scanline_distribution[:-1])):
@@ -206,7 +550,9 @@ class SXMCITSControl(SXMSpectroControl):
                             continue
 
                         # 等待 STS 完成
-                        time.sleep(1.0)
+                        self._sleep(1.0)
+                        if self.sts_log is not None:
+                            self.wait_for_spectrum()
 
                     except Exception as e:
                         print(f"STS點量測失敗 ({x}, {y}): {str(e)}")
@@ -235,17 +581,128 @@ class SXMCITSControl(SXMSpectroControl):
             # 確保回到安全狀態
             try:
                 self.feedback_on()
+                if initial_state is not None:
+                    self.restore(initial_state)
                 if self.debug_mode:
                     print("系統回到安全狀態")
             except Exception as e:
                 print(f"回復安全狀態時發生錯誤: {str(e)}")
 
     # Auto-move CITS, the combination of auto-move and CITS
+    @supports_dry_run
+    def dual_direction_cits(self, num_points_x: int, num_points_y: int,
+                            geometry: Optional[ScanGeometry] = None,
+                            save_dir: Optional[str] = None,
+                            cube_name: Optional[str] = None) -> bool:
+        """
+        以兩張 CITS 影像量測兩組交錯的網格（兩次掃描）
+
+        第一張上掃影像量測 num_points_x x num_points_y 的一般網格，
+        第二張下掃影像量測位於每一格中心的 (num_points_x-1) x (num_points_y-1) 網格。
+        兩張影像是分開的兩次 CITS，總時間約為兩次 CITS。兩組資料依實際量測位置合併為
+        last_cits_cube，格點間距為半格，direction 記錄每一點來自上掃 (1) 或下掃 (-1)。
+        每一點的光譜檔由 sts_log 記錄的存檔事件對應，無法確定者為None。
+        合併結果以 CITSCube.save 存於 save_dir，未指定時存於光譜檔所在的目錄，
+        兩者都沒有時不存檔。
+
+        Parameters
+        ----------
+        num_points_x : int
+            上掃網格 X 方向點數（2-512）
+        num_points_y : int
+            上掃網格 Y 方向點數（2-512）
+        geometry : ScanGeometry, optional
+            掃描幾何快照，未提供時以一次批次讀取獲取
+        save_dir : str, optional
+            合併結果的存檔目錄
+        cube_name : str, optional
+            合併結果的檔名，未指定時以時間命名
+        dry_run : bool, optional
+            不操作儀器，只統計命令並預估時間
+
+        Returns
+        -------
+        bool or dict
+            兩張影像是否都成功完成；dry_run 時為 run_dry_run 的統計結果
+        """
+        try:
+            if not (2 <= num_points_x <= 512 and 2 <= num_points_y <= 512):
+                raise ValueError("雙向 CITS 點數必須在 2 到 512 之間")
+
+            if geometry is None:
+                geometry = self.get_scan_geometry()
+
+            up_plan, down_area, (dx, dy) = CITSCalculator.plan_dual_cits(
+                geometry, num_points_x, num_points_y)
+
+            # 在任何硬體動作之前檢查兩組網格
+            down_points = LocalCITSCalculator.calculate_local_cits_coordinates(
+                down_area, geometry.center_x, geometry.center_y, geometry.angle)
+            for points in (up_plan[0], down_points):
+                PlanValidator.validate_geometry_points(
+                    np.reshape(points, (-1, 2)), geometry).raise_if_invalid()
+
+            origin = FrameTransform.to_scan_frame(
+                up_plan[0][0, 0], geometry.center_x, geometry.center_y, geometry.angle)[0]
+            cube = CITSCube(geometry, tuple(origin), (dx / 2, dy / 2),
+                            (2 * num_points_y - 1, 2 * num_points_x - 1))
+
+            success = True
+            for direction in (1, -1):
+                if self.debug_mode:
+                    print(f"\n=== 雙向 CITS：{'上掃' if direction == 1 else '下掃'}影像 ===")
+
+                self.start_sts_log()
+                if direction == 1:
+                    done = self.standard_cits(num_points_x, num_points_y, 1, geometry=geometry)
+                else:
+                    done = self.standard_local_cits([down_area], -1, geometry=geometry)
+                if not done:
+                    print(f"Warning: {'Up' if direction == 1 else 'Down'} frame CITS failed")
+                    success = False
+                self.wait_until_idle()
+
+                measured = self.sts_log
+                files = [f for _, _, f in measured]
+                missing = files.count(None)
+                if missing and not self.dry_running:
+                    print(f"Warning: {missing} of {len(measured)} spectrum files "
+                          f"could not be matched to their STS points")
+                cube.add([(x, y) for x, y, _ in measured], direction, files)
+
+            self.last_cits_cube = cube
+            if self.debug_mode:
+                print(f"\n雙向 CITS 完成：{cube.num_points} 點，格點 {cube.shape}")
+
+            # 與光譜檔放在一起，之後的量測不會覆蓋
+            known = [f for f in cube.files.ravel() if f]
+            directory = save_dir or (os.path.dirname(known[0]) if known else '')
+            if directory and not self.dry_running:
+                name = cube_name or f"cits_cube_{time.strftime('%Y%m%d_%H%M%S')}"
+                path = cube.save(os.path.join(directory, name))
+                if self.debug_mode:
+                    print(f"CITS cube saved: {path}")
+            return success
+
+        except Exception as e:
+            if self.debug_mode:
+                print(f"Dual-direction CITS error: {str(e)}")
+            return False
+
+        finally:
+            self.sts_log = None
+
+    @supports_dry_run
     def auto_move_ssts_CITS(self, movement_script: str, distance: float,
                             num_points_x: int, num_points_y: int,
                             initial_direction: int = 1,
                             wait_time: float = 1.0,
-                            repeat_count: int = 1) -> bool:
+                            repeat_count: int = 1,
+                            optimize_route: bool = False,
+                            route_precedence=(),
+                            adaptive_settle: bool = False,
+                            dual_direction: bool = False,
+                            cube_dir: Optional[str] = None) -> bool:
         """
         執行自動移動和 CITS 量測序列，在每個移動位置進行 CITS 量測
 
@@ -253,7 +710,8 @@ class SXMCITSControl(SXMSpectroControl):
         ----------
         movement_script : str
             移動指令序列，如 "RULLDDRR"
-            R: 右, L: 左, U: 上, D: 下
+            R: 右, L: 左, U: 上, D: 下；可使用次數、群組與蛇形，
+            如 "(10R U 10L U)x10"、"S20x20"，語法見 MoveScript
         distance : float
             每次移動的距離（nm）
         num_points_x : int
@@ -266,11 +724,25 @@ class SXMCITSControl(SXMSpectroControl):
             每次移動後的等待時間（秒）
         repeat_count : int, optional
             每個位置的CITS重複次數
+        optimize_route : bool, optional
+            是否重新排列移動位置以縮短總移動距離
+        route_precedence : List[Tuple[int, int]], optional
+            (a, b) 表示第 a 個位置必須在第 b 個位置之前走訪（以 auto_move 的順序編號）
+        adaptive_settle : bool, optional
+            是否依移動距離與蠕變模型決定等待時間，取代固定的 wait_time
+        dual_direction : bool, optional
+            每次重複以 dual_direction_cits 在上掃與下掃影像量測兩組交錯網格，
+            此時不使用 initial_direction；每次的結果存於 cits_cubes[(位置索引, 重複次數)]，
+            並以 cits_cube_p<位置>_r<重複> 為檔名存檔
+        cube_dir : str, optional
+            dual_direction 結果的存檔目錄，未指定時存於光譜檔所在的目錄
+        dry_run : bool, optional
+            不操作儀器，只統計命令並預估時間
 
         Returns
         -------
-        bool
-            序列是否成功完成
+        bool or dict
+            序列是否成功完成；dry_run 時為 run_dry_run 的統計結果
         """
         try:
             # 驗證 CITS 參數
@@ -284,12 +756,8 @@ class SXMCITSControl(SXMSpectroControl):
                 raise ValueError("重複次數必須大於 0")
 
             # 獲取當前掃描參數
-            center_x = self.GetScanPara('X')
-            center_y = self.GetScanPara('Y')
-            angle = self.GetScanPara('Angle')
-
-            if any(v is None for v in [center_x, center_y, angle]):
-                raise ValueError("無法獲取掃描參數")
+            geometry = self.get_scan_geometry()
+            center_x, center_y, angle = geometry.center_x, geometry.center_y, geometry.angle
 
             if self.debug_mode:
                 print(f"\nStarting auto move CITS sequence:")
@@ -307,9 +775,16 @@ class SXMCITSControl(SXMSpectroControl):
                     center_y=center_y,
                     angle=angle
                 )
+                positions = self.plan_route(positions, optimize_route, route_precedence)
+
+                # 在任何移動之前檢查整個序列
+                PlanValidator.validate_scan_centers(
+                    positions, geometry.scan_range, angle, geometry.aspect_ratio
+                ).raise_if_invalid()
 
                 # 追蹤當前掃描方向
                 current_direction = initial_direction
+                self.cits_cubes = {}
 
                 # 在每個位置執行 CITS（包含初始位置）
                 for i, (x, y) in enumerate(positions):
@@ -326,7 +801,8 @@ class SXMCITSControl(SXMSpectroControl):
                             continue
 
                         # 等待系統穩定
-                        time.sleep(wait_time)
+                        self._wait_after_move(
+                            math.dist(positions[i - 1], (x, y)), wait_time, adaptive_settle)
 
                     position_type = "initial position" if i == 0 else f"position {i}"
 
@@ -338,25 +814,41 @@ class SXMCITSControl(SXMSpectroControl):
                                   f"direction: {'up' if current_direction == 1 else 'down'}")
 
                         # 執行 CITS 量測
-                        if not self.standard_cits(
-                            num_points_x=num_points_x,
-                            num_points_y=num_points_y,
-                            scan_direction=current_direction
-                        ):
+                        save_count = self.scan_status.save_count
+                        if dual_direction:
+                            self.last_cits_cube = None
+                            done = self.dual_direction_cits(
+                                num_points_x, num_points_y,
+                                geometry=geometry.with_center(x, y),
+                                save_dir=cube_dir,
+                                cube_name=f"cits_cube_p{i:03d}_r{repeat:02d}")
+                            # 部分失敗時仍保留已量測的點
+                            if self.last_cits_cube is not None:
+                                self.cits_cubes[(i, repeat)] = self.last_cits_cube
+                        else:
+                            done = self.standard_cits(
+                                num_points_x=num_points_x,
+                                num_points_y=num_points_y,
+                                scan_direction=current_direction,
+                                geometry=geometry.with_center(x, y)
+                            )
+                        if not done:
                             print(f"Warning: CITS failed at {position_type}, "
                                   f"repeat {repeat + 1}")
                             continue
 
                         # 等待CITS完成
-                        while self.is_scanning():
-                            time.sleep(1)
+                        self.wait_until_idle()
+
+                        if self.drift_estimator is not None:
+                            self.update_drift(save_since=save_count)
 
                         # 反轉掃描方向
                         current_direction *= -1
 
                         # 如果不是最後一次重複，則等待系統穩定
                         if repeat < repeat_count - 1:
-                            time.sleep(wait_time)
+                            self._sleep(wait_time)
 
             except Exception as e:
                 if self.debug_mode:
@@ -372,11 +864,16 @@ class SXMCITSControl(SXMSpectroControl):
                 print(f"Auto move CITS error: {str(e)}")
             return False
 
+    @supports_dry_run
     def auto_move_local_ssts_CITS(self, movement_script: str, distance: float,
                                   local_areas_params: List[dict],
                                   initial_direction: int = 1,
                                   wait_time: float = 1.0,
-                                  repeat_count: int = 1) -> bool:
+                                  repeat_count: int = 1,
+                                  optimize_route: bool = False,
+                                  route_precedence=(),
+                                  adaptive_settle: bool = False,
+                                  windowed: bool = False) -> bool:
         """
         執行自動移動和 Local CITS 量測序列，在每個移動位置的多個相對偏移區域進行 Local CITS 量測
 
@@ -384,7 +881,8 @@ class SXMCITSControl(SXMSpectroControl):
         ----------
         movement_script : str
             移動指令序列，如 "RULLDDRR"
-            R: 右, L: 左, U: 上, D: 下
+            R: 右, L: 左, U: 上, D: 下；可使用次數、群組與蛇形，
+            如 "(10R U 10L U)x10"、"S20x20"，語法見 MoveScript
         distance : float
             每次移動的距離（nm）
         local_areas_params : List[dict]
@@ -404,11 +902,21 @@ class SXMCITSControl(SXMSpectroControl):
             每次移動後的等待時間（秒）
         repeat_count : int, optional
             每個位置的CITS重複次數
+        optimize_route : bool, optional
+            是否重新排列移動位置以縮短總移動距離
+        route_precedence : List[Tuple[int, int]], optional
+            (a, b) 表示第 a 個位置必須在第 b 個位置之前走訪（以 auto_move 的順序編號）
+        adaptive_settle : bool, optional
+            是否依移動距離與蠕變模型決定等待時間，取代固定的 wait_time
+        windowed : bool, optional
+            是否只掃描包含所有小區的慢軸區帶
+        dry_run : bool, optional
+            不操作儀器，只統計命令並預估時間
 
         Returns
         -------
-        bool
-            序列是否成功完成
+        bool or dict
+            序列是否成功完成；dry_run 時為 run_dry_run 的統計結果
         """
         try:
             # 參數驗證
@@ -433,12 +941,8 @@ class SXMCITSControl(SXMSpectroControl):
                 raise ValueError("重複次數必須大於 0")
 
             # 獲取當前掃描參數
-            center_x = self.GetScanPara('X')
-            center_y = self.GetScanPara('Y')
-            angle = self.GetScanPara('Angle')
-
-            if any(v is None for v in [center_x, center_y, angle]):
-                raise ValueError("無法獲取掃描參數")
+            geometry = self.get_scan_geometry()
+            center_x, center_y, angle = geometry.center_x, geometry.center_y, geometry.angle
 
             if self.debug_mode:
                 print(f"\nStarting auto move Local CITS sequence:")
@@ -455,6 +959,30 @@ class SXMCITSControl(SXMSpectroControl):
                 center_y=center_y,
                 angle=angle
             )
+            positions = self.plan_route(positions, optimize_route, route_precedence)
+
+            # 在任何移動之前檢查整個計畫：掃描視窗與所有位置的所有小區量測點
+            PlanValidator.validate_scan_centers(
+                positions, geometry.scan_range, angle, geometry.aspect_ratio
+            ).raise_if_invalid()
+
+            relative_points = np.concatenate([
+                LocalCITSCalculator.calculate_local_cits_coordinates(
+                    LocalCITSParams(
+                        start_x=area['x_dev'], start_y=area['y_dev'],
+                        dx=area['dx'], dy=area['dy'],
+                        nx=area['nx'], ny=area['ny'],
+                        startpoint_direction=area['startpoint_direction']
+                    ), 0.0, 0.0, angle)
+                for area in local_areas_params
+            ])
+            PlanValidator.validate_points(
+                np.asarray(positions)[:, None, :] + relative_points[None, :, :],
+                limits=self.parameters.PARAM_RANGES
+            ).raise_if_invalid()
+            PlanValidator.validate_points(
+                relative_points, 0.0, 0.0, geometry.scan_range, angle, geometry.aspect_ratio
+            ).raise_if_invalid()
 
             # 追蹤當前掃描方向
             current_direction = initial_direction
@@ -474,7 +1002,8 @@ class SXMCITSControl(SXMSpectroControl):
                         continue
 
                     # 等待系統穩定
-                    time.sleep(wait_time)
+                    self._wait_after_move(
+                        math.dist(positions[i - 1], (center_x, center_y)), wait_time, adaptive_settle)
 
                 position_type = "initial position" if i == 0 else f"position {i}"
 
@@ -504,24 +1033,29 @@ class SXMCITSControl(SXMSpectroControl):
                         ))
 
                     # 執行所有小區的 Local CITS 量測
+                    save_count = self.scan_status.save_count
                     if not self.standard_local_cits(
                         local_areas=local_areas,
-                        scan_direction=current_direction
+                        scan_direction=current_direction,
+                        geometry=geometry.with_center(center_x, center_y),
+                        windowed=windowed
                     ):
                         print(f"Warning: Local CITS failed at {position_type}, "
                               f"repeat {repeat + 1}")
                         continue
 
                     # 等待CITS完成
-                    while self.is_scanning():
-                        time.sleep(1)
+                    self.wait_until_idle()
+
+                    if self.drift_estimator is not None:
+                        self.update_drift(save_since=save_count)
 
                     # 反轉掃描方向
                     current_direction *= -1
 
                     # 如果不是最後一次重複，則等待系統穩定
                     if repeat < repeat_count - 1:
-                        time.sleep(wait_time)
+                        self._sleep(wait_time)
 
             if self.debug_mode:
                 print("\nAuto move Local CITS sequence completed successfully")
@@ -531,3 +1065,97 @@ class SXMCITSControl(SXMSpectroControl):
             if self.debug_mode:
                 print(f"Auto move Local CITS error: {str(e)}")
             return False
+
+    @supports_dry_run
+    def tiled_cits(self, width: float, height: float, num_points_x: int, num_points_y: int,
+                   wait_time: float, overlap: float = 0.1, scan_direction: int = 1,
+                   center_x: Optional[float] = None, center_y: Optional[float] = None,
+                   adaptive_settle: bool = False, windowed: bool = False) -> bool:
+        """
+        在大於單一掃描視窗的區域執行 CITS
+
+        全域網格涵蓋整個區域，每個點只分配給最近的視窗，
+        各視窗以 Local CITS 量測自己負責的點，全域索引見 last_tile_plan 的 Tile.rows / columns。
+
+        Parameters
+        ----------
+        width, height : float
+            區域沿快軸與慢軸的大小 (nm)
+        num_points_x, num_points_y : int
+            全域網格沿快軸與慢軸的點數
+        wait_time : float
+            每次移動後的等待時間（秒）
+        overlap : float, optional
+            相鄰視窗重疊的比例
+        scan_direction : int, optional
+            掃描方向 (1: 由下到上, -1: 由上到下)
+        center_x, center_y : float, optional
+            區域中心 (nm)，預設為目前的掃描中心
+        adaptive_settle : bool, optional
+            是否依移動距離與蠕變模型決定等待時間，取代固定的 wait_time
+        windowed : bool, optional
+            是否只掃描包含該視窗量測點的慢軸區帶
+        dry_run : bool, optional
+            不操作儀器，只統計命令並預估時間
+
+        Returns
+        -------
+        bool or dict
+            所有視窗是否成功完成；dry_run 時為 run_dry_run 的統計結果
+        """
+        try:
+            if scan_direction not in (1, -1):
+                raise ValueError("掃描方向必須是 1 (向上) 或 -1 (向下)")
+
+            geometry = self.get_scan_geometry()
+            plan = self.plan_tiles(width, height, overlap, center_x, center_y,
+                                   num_points_x, num_points_y, geometry=geometry)
+
+            for tile in plan.tiles:
+                area = tile.cits_area
+                if area is not None and not (area.nx <= 512 and area.ny <= 512):
+                    raise ValueError(f"視窗 {tile.index} 的點數 {area.nx}x{area.ny} 超過 512，"
+                                     f"請增加點距或縮小重疊")
+
+            success = True
+            previous = (geometry.center_x, geometry.center_y)
+            for i, tile in enumerate(plan.tiles):
+                if tile.cits_area is None:
+                    continue
+
+                if self.debug_mode:
+                    print(f"\nTile {i+1}/{len(plan.tiles)} {tile.index}: "
+                          f"rows {tile.rows.start}-{tile.rows.stop - 1}, "
+                          f"columns {tile.columns.start}-{tile.columns.stop - 1}")
+
+                if not self.set_position(*tile.center):
+                    print(f"Warning: Failed to move to tile {tile.index}")
+                    success = False
+                    continue
+                self._wait_after_move(math.dist(previous, tile.center), wait_time, adaptive_settle)
+                previous = tile.center
+
+                save_count = self.scan_status.save_count
+                if not self.standard_local_cits(
+                    local_areas=[tile.cits_area],
+                    scan_direction=scan_direction,
+                    geometry=geometry.with_center(*tile.center),
+                    windowed=windowed
+                ):
+                    print(f"Warning: Local CITS failed at tile {tile.index}")
+                    success = False
+                    continue
+
+                self.wait_until_idle()
+
+                if self.drift_estimator is not None:
+                    self.update_drift(save_since=save_count)
+
+            if self.debug_mode:
+                print("\nTiled CITS completed")
+            return success
+
+        except Exception as e:
+            if self.debug_mode:
+                print(f"Tiled CITS error: {str(e)}")
+            return False
@@ -1,7 +1,135 @@
 import threading
 import queue
 import datetime
+import time
+from collections import deque
+from . import SXMRemote
 from .SXMPyBase import SXMBase
+from utils.SXMPyJournal import JournalEvent
+
+
+class EventQueue:
+    """
+    依主題分開的有界事件佇列
+
+    coalesce 主題只保留最新一筆（如掃描行號），新事件取代尚未處理的舊事件；
+    lossless 主題依序保留所有事件，超過上限時才丟棄最舊的一筆並記錄。
+    取出時依到達順序，確保跨主題的事件先後不變。
+    """
+    COALESCE = 'coalesce'
+    LOSSLESS = 'lossless'
+
+    def __init__(self, policies=None, maxsize=1000, on_drop=None):
+        """
+        Parameters
+        ----------
+        policies : dict, optional
+            主題對應的策略，未列出的主題視為 lossless
+        maxsize : int
+            每個 lossless 主題的最大長度
+        on_drop : callable, optional
+            事件被丟棄時呼叫，參數為被丟棄的事件
+        """
+        self.policies = dict(policies or {})
+        self.maxsize = maxsize
+        self.on_drop = on_drop
+        self._pending = {}
+        self._metrics = {}
+        self._seq = 0
+        self._condition = threading.Condition()
+
+    def _topic_metrics(self, topic):
+        if topic not in self._metrics:
+            self._metrics[topic] = {
+                'received': 0, 'delivered': 0, 'coalesced': 0, 'dropped': 0
+            }
+        return self._metrics[topic]
+
+    def put(self, event: dict) -> bool:
+        """
+        放入事件
+
+        Parameters
+        ----------
+        event : dict
+            含 'type' 的事件
+
+        Returns
+        -------
+        bool
+            False表示有事件被丟棄
+        """
+        topic = event.get('type')
+        dropped = None
+        with self._condition:
+            metrics = self._topic_metrics(topic)
+            metrics['received'] += 1
+            self._seq += 1
+            pending = self._pending.setdefault(topic, deque())
+
+            if self.policies.get(topic) == self.COALESCE:
+                if pending:
+                    pending.clear()
+                    metrics['coalesced'] += 1
+            elif len(pending) >= self.maxsize:
+                dropped = pending.popleft()[1]
+                metrics['dropped'] += 1
+
+            pending.append((self._seq, event))
+            self._condition.notify()
+
+        if dropped is not None and self.on_drop:
+            self.on_drop(dropped)
+        return dropped is None
+
+    def get(self, timeout=None) -> dict:
+        """
+        依到達順序取出事件
+
+        Parameters
+        ----------
+        timeout : float, optional
+            等待超時時間（秒）
+
+        Raises
+        ------
+        queue.Empty
+            超時仍沒有事件
+        """
+        with self._condition:
+            if not self._condition.wait_for(self._has_pending, timeout):
+                raise queue.Empty
+
+            topic = min(
+                (t for t, pending in self._pending.items() if pending),
+                key=lambda t: self._pending[t][0][0]
+            )
+            self._metrics[topic]['delivered'] += 1
+            return self._pending[topic].popleft()[1]
+
+    def _has_pending(self):
+        return any(self._pending.values())
+
+    def qsize(self) -> int:
+        """目前等待處理的事件數"""
+        with self._condition:
+            return sum(len(pending) for pending in self._pending.values())
+
+    def metrics(self) -> dict:
+        """
+        取得各主題的事件統計
+
+        Returns
+        -------
+        dict
+            {topic: {'received', 'delivered', 'coalesced', 'dropped', 'pending'}}
+        """
+        with self._condition:
+            return {
+                topic: dict(values, pending=len(self._pending.get(topic, ())))
+                for topic, values in self._metrics.items()
+            }
+
 
 class ScanStatus:
     """掃描狀態的數據類別"""
@@ -11,16 +139,76 @@ class ScanStatus:
         self.line_number = 0
         self.total_lines = 0
         self.last_saved_file = None
+        self.last_spect_file = None
         self.scan_finished_time = None
-        self.missed_callbacks = []
+        # 最近一次 Scan on/off 的單調時間，用於校正掃描時間模型
+        self.scan_on_time = None
+        self.scan_off_time = None
+        self.missed_callbacks = deque(maxlen=100)
+        # 事件計數，等待時比較計數可避免錯過已發生的事件
+        self.scan_on_count = 0
+        self.scan_off_count = 0
+        self.line_count = 0
+        self.save_count = 0
+        self.spect_save_count = 0
         self._lock = threading.Lock()
+        self._condition = threading.Condition(self._lock)
 
     def update(self, **kwargs):
-        """線程安全的狀態更新"""
-        with self._lock:
+        """線程安全的狀態更新，並喚醒所有等待中的執行緒"""
+        with self._condition:
             for key, value in kwargs.items():
                 if hasattr(self, key):
                     setattr(self, key, value)
+            self._condition.notify_all()
+
+    def increment(self, counter: str, **kwargs):
+        """
+        增加事件計數並更新狀態
+
+        Parameters
+        ----------
+        counter : str
+            計數屬性名稱，如 'scan_off_count'
+        **kwargs
+            同時更新的狀態屬性
+        """
+        with self._condition:
+            setattr(self, counter, getattr(self, counter) + 1)
+            for key, value in kwargs.items():
+                if hasattr(self, key):
+                    setattr(self, key, value)
+            self._condition.notify_all()
+
+    def wait_for(self, predicate, timeout=None) -> bool:
+        """
+        等待狀態滿足條件
+
+        Parameters
+        ----------
+        predicate : callable
+            以 ScanStatus 為參數的判斷函數，在鎖內呼叫
+        timeout : float, optional
+            等待超時時間（秒），None表示無限等待
+
+        Returns
+        -------
+        bool
+            True表示條件成立，False表示超時
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: predicate(self), timeout)
+
+    def counters(self) -> dict:
+        """取得目前的事件計數"""
+        with self._lock:
+            return {
+                'scan_on': self.scan_on_count,
+                'scan_off': self.scan_off_count,
+                'line': self.line_count,
+                'save': self.save_count,
+                'spect_save': self.spect_save_count
+            }
 
     def __str__(self):
         with self._lock:
@@ -34,14 +222,111 @@ class ScanStatus:
                 details.append(f"Finished at: {self.scan_finished_time}")
             return f"{status} " + " - ".join(details) if details else status
 
+class ScanProgress:
+    """
+    由 ScanLine 事件計算掃描進度
+    以行號變化計算完成行數，事件被合併時仍能得到正確數量
+    """
+    def __init__(self, total_lines, callback=None):
+        """
+        Parameters
+        ----------
+        total_lines : int
+            預計掃描的行數
+        callback : callable, optional
+            進度更新時以 snapshot() 的結果呼叫
+        """
+        self.total_lines = max(int(total_lines), 1)
+        self.callback = callback
+        self.lines_done = 0
+        self.direction = None
+        self.finished = False
+        self._first_line = None
+        self._first_time = None
+        self._last_time = None
+        self._lock = threading.Lock()
+
+    def on_scan_line(self, data):
+        """ScanLine 事件"""
+        line_number = data.get('line_number')
+        if line_number is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if self._first_line is None:
+                self._first_line = line_number
+                self._first_time = now
+            self.lines_done = min(abs(line_number - self._first_line), self.total_lines)
+            self.direction = data.get('direction')
+            self._last_time = now
+        self._publish()
+
+    def on_scan_off(self, data=None):
+        """Scan off 事件"""
+        with self._lock:
+            self.lines_done = self.total_lines
+            self.finished = True
+            self._last_time = time.monotonic()
+        self._publish()
+
+    def _publish(self):
+        if self.callback is not None:
+            self.callback(self.snapshot())
+
+    def snapshot(self) -> dict:
+        """
+        目前進度
+
+        Returns
+        -------
+        dict
+            lines_done, total_lines, lines_per_second, eta（秒）, elapsed（秒）, direction, finished
+        """
+        with self._lock:
+            elapsed = 0.0
+            rate = None
+            if self._first_time is not None:
+                elapsed = self._last_time - self._first_time
+                if elapsed > 0 and self.lines_done > 0:
+                    rate = self.lines_done / elapsed
+
+            eta = 0.0 if self.finished else None
+            if rate and not self.finished:
+                eta = (self.total_lines - self.lines_done) / rate
+
+            return {
+                'lines_done': self.lines_done,
+                'total_lines': self.total_lines,
+                'lines_per_second': rate,
+                'eta': eta,
+                'elapsed': elapsed,
+                'direction': self.direction,
+                'finished': self.finished
+            }
+
+
 class SXMEventHandler(SXMBase):
     """事件處理器類別"""
+    # ScanLine 回傳值首字母對應的方向
+    LINE_DIRECTIONS = {'u': 'up', 'd': 'down', 'f': 'forward', 'b': 'backward'}
+    # 事件主題策略：狀態類事件只保留最新值，存檔事件不可遺失
+    EVENT_POLICIES = {
+        'scan_line': EventQueue.COALESCE,
+        'scan_on': EventQueue.LOSSLESS,
+        'scan_off': EventQueue.LOSSLESS,
+        'save_done': EventQueue.LOSSLESS,
+        'spect_save': EventQueue.LOSSLESS
+    }
+
     def __init__(self, debug_mode=False):
         super().__init__(debug_mode)
         self.scan_status = ScanStatus()
-        self.event_queue = queue.Queue()
+        self.event_queue = EventQueue(self.EVENT_POLICIES, on_drop=self._record_dropped_event)
         self._stop_event = threading.Event()
         self._event_listener = None
+        self._listeners = {}
+        self._lossless_listeners = {}
+        self._listeners_lock = threading.Lock()
         self._initialize_callbacks()
         self._start_event_listener()
 
@@ -50,6 +335,9 @@ class SXMEventHandler(SXMBase):
         self.MySXM.ScanOffCallBack = self._handle_scan_off
         self.MySXM.SaveIsDone = self._handle_save_done
         self.MySXM.ScanOnCallBack = self._handle_scan_on
+        self.MySXM.Scan = self._handle_scan_line
+        self.MySXM.SpectSave = self._handle_spect_save
+        self.MySXM.MicState = self._handle_mic_state
 
     def _start_event_listener(self):
         """啟動事件監聽器"""
@@ -82,63 +370,293 @@ class SXMEventHandler(SXMBase):
             self._process_save_done(event_data)
         elif event_type == 'scan_on':
             self._process_scan_on(event_data)
+        elif event_type == 'scan_line':
+            self._process_scan_line(event_data)
+        elif event_type == 'spect_save':
+            self._process_spect_save(event_data)
+
+        self._notify_listeners(event_type, event_data)
+
+    def add_event_listener(self, event_type, callback, lossless=False):
+        """
+        註冊事件監聽函數，於事件處理完成後在監聽執行緒中呼叫
+
+        Parameters
+        ----------
+        event_type : str
+            事件類型，如 'scan_line'、'scan_off'
+        callback : callable
+            以事件資料 dict 為參數的函數
+        lossless : bool
+            True 時在事件進入佇列前於回調執行緒中直接呼叫，不受 coalesce 影響，
+            每一個事件都會送達；函數必須很快返回，以免延遲 DDE 回調
+        """
+        listeners = self._lossless_listeners if lossless else self._listeners
+        with self._listeners_lock:
+            listeners.setdefault(event_type, []).append(callback)
+
+    def remove_event_listener(self, event_type, callback):
+        """移除事件監聽函數"""
+        with self._listeners_lock:
+            for listeners in (self._listeners, self._lossless_listeners):
+                if callback in listeners.get(event_type, []):
+                    listeners[event_type].remove(callback)
+
+    def _notify_listeners(self, event_type, event_data, lossless=False):
+        """呼叫已註冊的監聽函數"""
+        listeners = self._lossless_listeners if lossless else self._listeners
+        with self._listeners_lock:
+            callbacks = list(listeners.get(event_type, []))
+        for callback in callbacks:
+            try:
+                callback(event_data)
+            except Exception as e:
+                if self.debug_mode:
+                    print(f"Event listener callback error: {str(e)}")
+
+    def _record_dropped_event(self, event):
+        """記錄因佇列滿而被丟棄的事件"""
+        with self.scan_status._lock:
+            self.scan_status.missed_callbacks.append({
+                'type': event.get('type'),
+                'data': event.get('data'),
+                'dropped_at': datetime.datetime.now()
+            })
+        if self.debug_mode:
+            print(f"Event dropped: {event.get('type')}")
+
+    def _post(self, event):
+        """通知 lossless 監聽函數後將事件放入佇列"""
+        self._notify_listeners(event['type'], dict(event['data']), lossless=True)
+        self.event_queue.put(event)
 
     def _handle_scan_off(self):
         """掃描結束回調"""
-        self.event_queue.put({
+        self._journal(JournalEvent.SCAN_OFF)
+        self._post({
             'type': 'scan_off',
-            'data': {'time': datetime.datetime.now()}
+            'data': {'time': datetime.datetime.now(), 'mono': time.monotonic()}
         })
 
     def _handle_save_done(self, filename):
         """檔案儲存回調"""
-        self.event_queue.put({
+        self._journal(JournalEvent.SAVE_DONE, text=filename)
+        self._post({
             'type': 'save_done',
             'data': {'filename': filename}
         })
 
     def _handle_scan_on(self):
         """掃描開始回調"""
-        self.event_queue.put({
+        self._journal(JournalEvent.SCAN_ON)
+        self._post({
             'type': 'scan_on',
-            'data': {'time': datetime.datetime.now()}
+            'data': {'time': datetime.datetime.now(), 'mono': time.monotonic()}
+        })
+
+    def _handle_scan_line(self, value):
+        """掃描行回調，首字母為u/d/f/b，其後為行號"""
+        value = str(value).strip()
+        direction = self.LINE_DIRECTIONS.get(value[:1])
+        try:
+            line_number = int(value[1:])
+        except ValueError:
+            line_number = None
+
+        self._post({
+            'type': 'scan_line',
+            'data': {'value': value, 'time': datetime.datetime.now(),
+                     'direction': direction, 'line_number': line_number}
+        })
+
+    def _handle_spect_save(self, value):
+        """光譜存檔回調"""
+        if isinstance(value, bytes):
+            value = str(value, 'utf-8')
+        filename = str(value).strip('\r\n')
+        self._journal(JournalEvent.SPECT_SAVE, text=filename)
+        self._post({
+            'type': 'spect_save',
+            'data': {'filename': filename, 'time': datetime.datetime.now()}
         })
 
+    def _handle_mic_state(self, value):
+        """顯微鏡狀態回調，只寫入事件紀錄"""
+        if isinstance(value, bytes):
+            value = str(value, 'utf-8')
+        value = str(value).strip('\r\n')
+        try:
+            state = float(value)
+        except ValueError:
+            state = float('nan')
+        self._journal(JournalEvent.MIC_STATE, state, value)
+        if self.debug_mode:
+            print(f"MicState {value}")
+
     def _process_scan_off(self, data):
         """處理掃描結束事件"""
-        self.scan_status.update(
+        self.scan_status.increment(
+            'scan_off_count',
             is_scanning=False,
             direction=None,
             line_number=0,
-            scan_finished_time=data['time']
+            scan_finished_time=data['time'],
+            scan_off_time=data['mono']
         )
         if self.debug_mode:
             print(f"Scan finished at {data['time']}")
 
     def _process_save_done(self, data):
         """處理檔案儲存事件"""
-        self.scan_status.update(last_saved_file=data['filename'])
+        self.scan_status.increment('save_count', last_saved_file=data['filename'])
         if self.debug_mode:
             print(f"File saved: {data['filename']}")
 
     def _process_scan_on(self, data):
         """處理掃描開始事件"""
-        self.scan_status.update(
+        self.scan_status.increment(
+            'scan_on_count',
             is_scanning=True,
-            scan_finished_time=None
+            scan_finished_time=None,
+            scan_on_time=data['mono']
         )
         if self.debug_mode:
             print(f"Scan started at {data['time']}")
 
+    def _process_spect_save(self, data):
+        """處理光譜存檔事件"""
+        self.scan_status.increment('spect_save_count', last_spect_file=data['filename'])
+        if self.debug_mode:
+            print(f"Spectrum saved: {data['filename']}")
+
+    def _process_scan_line(self, data):
+        """處理掃描行事件"""
+        direction, line_number = data['direction'], data['line_number']
+        if line_number is None:
+            if self.debug_mode:
+                print(f"Unknown scan line value: {data['value']}")
+            return
+
+        self.scan_status.increment(
+            'line_count',
+            is_scanning=True,
+            direction=direction,
+            line_number=line_number
+        )
+
+    def wait_for_status(self, predicate, timeout=None, poll_interval=0.05) -> bool:
+        """
+        處理Windows消息並等待掃描狀態滿足條件
+
+        DDE回調只在消息被處理時送達，因此等待時分段處理消息，
+        事件一到達即被喚醒。
+
+        Parameters
+        ----------
+        predicate : callable
+            以 ScanStatus 為參數的判斷函數
+        timeout : float, optional
+            等待超時時間（秒），None表示無限等待
+        poll_interval : float
+            每次處理消息之間的最長等待時間（秒）
+
+        Returns
+        -------
+        bool
+            True表示條件成立，False表示超時
+        """
+        # dry run 沒有事件，視為條件已成立
+        if self._dry_run is not None:
+            return True
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            SXMRemote.pump()
+
+            wait_time = poll_interval
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return self.scan_status.wait_for(predicate, 0)
+                wait_time = min(poll_interval, remaining)
+
+            if self.scan_status.wait_for(predicate, wait_time):
+                return True
+
+    def wait_until_idle(self, timeout=None, verify_interval=2.0) -> bool:
+        """
+        等待掃描停止
+
+        以事件狀態為主，並每隔 verify_interval 秒讀取一次 Scan 參數，
+        避免遺失的 Scan off 回調造成永久等待。
+
+        Parameters
+        ----------
+        timeout : float, optional
+            等待超時時間（秒），None表示無限等待
+        verify_interval : float
+            以硬體讀值確認狀態的間隔（秒）
+
+        Returns
+        -------
+        bool
+            True表示掃描已停止，False表示超時
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait_time = verify_interval
+            if deadline is not None:
+                wait_time = min(wait_time, max(deadline - time.monotonic(), 0))
+
+            if self.wait_for_status(lambda s: not s.is_scanning, wait_time):
+                return True
+
+            scan_value = self.GetScanPara('Scan')
+            if scan_value is not None and not scan_value:
+                self.scan_status.update(is_scanning=False)
+                return True
+
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+
+    def wait_for_save(self, since_count, timeout=30.0) -> bool:
+        """
+        等待影像存檔完成（SaveFileName 事件）
+
+        Parameters
+        ----------
+        since_count : int
+            掃描開始前的 save_count，之後的存檔事件即為該張影像
+        timeout : float, optional
+            等待超時時間（秒），None表示無限等待
+
+        Returns
+        -------
+        bool
+            True表示已存檔，False表示超時
+        """
+        return self.wait_for_status(lambda s: s.save_count > since_count, timeout)
+
     def get_scan_history(self):
         """獲取掃描歷史記錄"""
         with self.scan_status._lock:
             return {
                 'last_scan_finished': self.scan_status.scan_finished_time,
                 'last_saved_file': self.scan_status.last_saved_file,
-                'missed_callbacks': self.scan_status.missed_callbacks.copy()
+                'missed_callbacks': list(self.scan_status.missed_callbacks)
             }
 
+    def get_event_metrics(self):
+        """
+        獲取事件佇列統計
+
+        Returns
+        -------
+        dict
+            各主題的接收、處理、合併與丟棄數量
+        """
+        return self.event_queue.metrics()
+
     def stop_monitoring(self):
         """停止事件監聽"""
         self._stop_event.set()
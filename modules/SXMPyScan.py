@@ -1,7 +1,15 @@
 import time
 import math
 from . import SXMRemote
-from .SXMPyEvent import SXMEventHandler
+from .SXMPyBase import supports_dry_run
+from .SXMPyEvent import SXMEventHandler, ScanProgress
+from utils.SXMPyCalc import (CreepModel, PlanValidator, RouteOptimizer, ScanGeometry,
+                             ScanTimingModel, TilePlan, TilePlanner)
+from utils.SXMPyCollect import (CollectReader, LineSyncCounter, COLLECT_LINE_SYNC,
+                                COLLECT_Z_FAST)
+from utils.SXMPyDrift import DriftEstimator
+from utils.SXMPyTransform import FrameTransform
+from utils.SXMPyLiveImage import LiveImageBuilder, load_saved_image
 from utils.logger import get_logger, track_function
 
 
@@ -11,9 +19,31 @@ class SXMScanControl(SXMEventHandler):
     繼承事件處理器以獲得事件處理和狀態管理功能
     """
 
+    _DRY_RUN_STATE = SXMEventHandler._DRY_RUN_STATE + (
+        'current_angle', '_move_retry_delay', '_pending_save_count', 'last_route_plan',
+        'last_tile_plan', '_last_move')
+
     def __init__(self, debug_mode=False):
         super().__init__(debug_mode)
         self.current_angle = 0
+        self.live_image = None
+        self._collect_reader = None
+        self.collect_reader_factory = CollectReader  # 以 (callback, channels=...) 建立 Collect 讀取執行緒
+        self.line_sync = None
+        self.scan_progress = None
+        self.timing_model = ScanTimingModel()
+        self._move_retry_delay = 0.05  # 移動確認失敗時的重試間隔，依過去結果調整
+        self.last_route_plan = None
+        self.last_tile_plan = None
+        self.creep_model = CreepModel()
+        self._last_move = None  # 最近一次移動的 (距離 nm, 等待開始的單調時間)，用於校正蠕變模型
+        self.settle_readback = self.read_scanner_dac  # 回傳 X/Y DAC 讀值，用於等待斜坡移動結束
+        self._pending_save_count = None  # 尚未確認存檔的影像在掃描開始前的 save_count
+        self._scan_off_floor = 0  # 輪詢判定完成後，尚未到達的 Scan off 事件會使 scan_off_count 達到的值
+        self.save_timeout = 30.0  # 等待影像存檔的超時時間（秒）
+        self.drift_estimator = None
+        self.drift_gain = 0.5  # 每次更新採用的殘餘漂移比例
+        self._drift_file = None  # 上一次用於漂移估計的存檔影像
 
     # ========== 位置控制功能 ========== #
     @track_function
@@ -26,9 +56,68 @@ class SXMScanControl(SXMEventHandler):
         tuple
             (X座標, Y座標)，若讀取失敗則返回(None, None)
         """
-        x = self.GetScanPara('X')
-        y = self.GetScanPara('Y')
-        return (x, y)
+        values = self.GetScanParas(['X', 'Y'])
+        return (values['X'], values['Y'])
+
+    @track_function
+    def move_to(self, x, y, tolerance=1e-2, max_retries=3, max_delay=1.0):
+        """
+        以單一DDE程式設定X、Y並讀回確認
+
+        每次嘗試只需一次往返；確認失敗時以指數退避重試，
+        初始間隔依先前移動的結果自動調整。
+
+        Parameters
+        ----------
+        x, y : float
+            目標座標（nm）
+        tolerance : float
+            允許的誤差範圍（nm）
+        max_retries : int
+            最大嘗試次數
+        max_delay : float
+            最長重試間隔（秒）
+
+        Returns
+        -------
+        bool
+            是否到達目標位置
+        """
+        commands = [f"ScanPara('X', {x});", f"ScanPara('Y', {y});"]
+        items = [('GetScanPara', 'X'), ('GetScanPara', 'Y')]
+        delay = self._move_retry_delay
+
+        for attempt in range(max_retries):
+            try:
+                values = self._write_and_read(commands, items)
+                if values is not None:
+                    current_x = values[('GetScanPara', 'X')]
+                    current_y = values[('GetScanPara', 'Y')]
+                    if abs(current_x - x) < tolerance and abs(current_y - y) < tolerance:
+                        self.current_state.update(x=current_x, y=current_y)
+                        # 第一次即成功時縮短之後的重試間隔，否則加長
+                        if attempt == 0:
+                            self._move_retry_delay = max(self._move_retry_delay * 0.5, 0.01)
+                        else:
+                            self._move_retry_delay = min(delay, max_delay)
+                        return True
+
+                    if self.debug_mode:
+                        print(f"Move attempt {attempt + 1}: at ({current_x}, {current_y}), "
+                              f"target ({x}, {y})")
+                elif self.debug_mode:
+                    print(f"Move attempt {attempt + 1}: no readback")
+
+            except Exception as e:
+                if self.debug_mode:
+                    print(f"Error in move_to attempt {attempt + 1}: {str(e)}")
+
+            if attempt < max_retries - 1:
+                self._sleep(delay)
+                delay = min(delay * 2, max_delay)
+
+        self._move_retry_delay = min(delay, max_delay)
+        return False
 
     @track_function
     def set_position(self, x, y, verify=True, max_retries=3, retry_delay=1.0):
@@ -44,49 +133,108 @@ class SXMScanControl(SXMEventHandler):
         max_retries : int
             最大重試次數
         retry_delay : float
-            重試間隔時間（秒）
+            最長重試間隔時間（秒）
 
         Returns
         -------
         bool
             設定是否成功
         """
-        for attempt in range(max_retries):
-            try:
-                # 發送位置設定命令
-                success = (self.SetScanPara('X', x) and
-                           self.SetScanPara('Y', y))
+        if not verify:
+            return self._batch_write([f"ScanPara('X', {x});", f"ScanPara('Y', {y});"])
 
-                if not success:
-                    if self.debug_mode:
-                        print(f"Position set failed on attempt {attempt + 1}")
-                    time.sleep(retry_delay)
-                    continue
-                if success:
-                    return True
+        if self.move_to(x, y, max_retries=max_retries, max_delay=retry_delay):
+            if self.debug_mode:
+                print(f"Position verified at ({x}, {y})")
+            return True
 
-                # 驗證位置
-                if verify:
-                    verification_success = self.verify_position(x, y)
-                    if verification_success:
-                        if self.debug_mode:
-                            print(f"Position verified at ({x}, {y})")
-                        return True
+        if self.debug_mode:
+            print(f"Position verification failed at ({x}, {y})")
+        return False
 
-                    if self.debug_mode:
-                        print(
-                            f"Position verification failed on attempt {attempt + 1}")
-                else:
-                    return True
+    def read_scanner_dac(self):
+        """
+        以一次DDE程式讀取掃描器 X/Y DAC 的輸出
 
-            except Exception as e:
-                if self.debug_mode:
-                    print(
-                        f"Error in set_position attempt {attempt + 1}: {str(e)}")
+        Returns
+        -------
+        tuple or None
+            (X, Y) DAC 讀值，單位依 SXM 的 DAC 刻度設定；讀取失敗時為None
+        """
+        values = self.GetChannels(self.parameters.SCANNER_DAC_CHANNELS)
+        return tuple(values) if values is not None else None
 
-            time.sleep(retry_delay)
+    def wait_for_ramp(self, readback, timeout, poll_interval=0.2, tolerance=1e-6):
+        """
+        等待 X/Y DAC 的斜坡輸出停止變化
 
-        return False
+        SXM 依移動速率逐步改變 DAC，移動命令返回時掃描器可能仍在移動。
+
+        Parameters
+        ----------
+        readback : callable
+            回傳 (x, y) 讀值的函數，讀取失敗時回傳None
+        timeout : float
+            最長等待時間（秒）
+        poll_interval : float
+            讀取間隔（秒）
+        tolerance : float
+            兩次讀值的差小於此值即視為停止
+
+        Returns
+        -------
+        float
+            實際等待時間（秒）
+        """
+        start = time.monotonic()
+        last = readback()
+        while time.monotonic() - start < timeout:
+            time.sleep(poll_interval)
+            current = readback()
+            if current is not None and last is not None and math.dist(current, last) < tolerance:
+                break
+            last = current
+        return time.monotonic() - start
+
+    def settle_after_move(self, distance, readback=None, poll_interval=0.2):
+        """
+        依移動距離與蠕變模型等待系統穩定
+
+        提供 readback 時先以 wait_for_ramp 等待斜坡移動結束，再等待蠕變模型的時間。
+        DAC 讀值是命令值，看不到壓電的蠕變，因此蠕變等待時間由模型決定；
+        模型的 gamma 由 update_drift 量到的影像間漂移校正。
+
+        Parameters
+        ----------
+        distance : float
+            移動距離（nm）
+        readback : callable, optional
+            回傳目前 X/Y DAC 讀值的函數，如 read_scanner_dac
+        poll_interval : float
+            讀取讀值的間隔（秒）
+
+        Returns
+        -------
+        float
+            實際等待時間（秒）
+        """
+        wait = self.creep_model.settle_time(distance)
+        ramp = 0.0
+        if readback is not None and self._dry_run is None:
+            ramp = self.wait_for_ramp(readback, self.creep_model.max_wait, poll_interval)
+
+        if self.debug_mode:
+            print(f"Settling {wait:.2f} s after {distance:.1f} nm move (ramp {ramp:.2f} s)")
+        self._sleep(wait)
+        return ramp + wait
+
+    def _wait_after_move(self, distance, wait_time, adaptive_settle=False):
+        """移動後等待：固定時間或依蠕變模型"""
+        self._last_move = (abs(distance), time.monotonic())
+        if adaptive_settle:
+            return self.settle_after_move(distance, self.settle_readback)
+        self._sleep(wait_time)
+        return wait_time
 
     @track_function
     def verify_position(self, x, y, tolerance=1e-3, max_retries=3):
@@ -107,16 +255,18 @@ class SXMScanControl(SXMEventHandler):
         bool
             驗證是否通過
         """
-        for _ in range(max_retries):
+        delay = self._move_retry_delay
+        for attempt in range(max_retries):
             current_x, current_y = self.get_position()
-            print(f"Current position: ({current_x}, {current_y})")
             if (current_x is not None and current_y is not None and
                 abs(current_x - x) < tolerance and
                     abs(current_y - y) < tolerance):
                 return True
-            print(f"abs(current_x - x): {abs(current_x - x)}")
-            print(f"abs(current_y - y): {abs(current_y - y)}")
-            time.sleep(0.5)
+            if self.debug_mode:
+                print(f"Current position: ({current_x}, {current_y}), target ({x}, {y})")
+            if attempt < max_retries - 1:
+                self._sleep(delay)
+                delay = min(delay * 2, 1.0)
         return False
 
     # ========== 掃描控制功能 ========== #
@@ -182,21 +332,41 @@ class SXMScanControl(SXMEventHandler):
                 print(f"Setup scan area error: {str(e)}")
             return False
 
-    def scan_lines(self, num_lines):
+    def scan_lines(self, num_lines, timeout=None, on_progress=None):
         """
-        掃描指定行數
+        掃描指定行數，進度與完成皆由 ScanLine / Scan off 事件取得，不輪詢 LineNr
+
+        ScanLine(Nr) 掃描 Nr 行：test/logs/print_20241128_134427.log 中
+        ScanLine(50) 的行號由 497 走到 448、下一段由 447 開始，ScanLine(49) 由 397 走到 349。
 
         Parameters
         ----------
         num_lines : int
             要掃描的行數
+        timeout : float, optional
+            等待超時時間（秒）
+        on_progress : callable, optional
+            進度更新時呼叫，參數為 ScanProgress.snapshot() 的結果
 
         Returns
         -------
         bool
             掃描是否成功完成
         """
+        def report(p):
+            if self.debug_mode:
+                print(f"Scanning line {p['lines_done']}/{p['total_lines']}")
+            if on_progress is not None:
+                on_progress(p)
+
+        progress = ScanProgress(num_lines, report)
+        self.scan_progress = progress
+        self.add_event_listener('scan_line', progress.on_scan_line)
+        self.add_event_listener('scan_off', progress.on_scan_off)
         try:
+            speed = self._scan_speed(refresh=True)
+            off_count = self.scan_status.scan_off_count
+            send_time = time.monotonic()
             command = f"ScanLine({num_lines});"
             success, _ = self._send_command(command)
 
@@ -204,24 +374,33 @@ class SXMScanControl(SXMEventHandler):
                 return False
 
             # 等待掃描完成
-            current_line = 0
-            while True:
-                if not self.is_scanning():
-                    return True
-
-                new_line = self.GetScanPara('LineNr')
-                if new_line != current_line:
-                    current_line = new_line
-                    if self.debug_mode:
-                        print(f"Scanning line {current_line}")
+            if not self.wait_for_scan_complete(timeout, since_count=off_count,
+                                               expected_duration=self.predict_scan_time(num_lines, speed)):
+                return False
 
-                time.sleep(0.1)
+            self._observe_scan_timing(num_lines, speed, send_time)
+            return True
 
         except Exception as e:
             if self.debug_mode:
                 print(f"Error during line scan: {str(e)}")
             return False
 
+        finally:
+            self.remove_event_listener('scan_line', progress.on_scan_line)
+            self.remove_event_listener('scan_off', progress.on_scan_off)
+
+    def get_scan_progress(self):
+        """
+        獲取最近一次 scan_lines 的進度
+
+        Returns
+        -------
+        dict or None
+            ScanProgress.snapshot() 的結果
+        """
+        return self.scan_progress.snapshot() if self.scan_progress else None
+
     def scan_lines_for_sts(self, num_lines: int, timeout: float = None) -> bool:
         """
         執行指定行數的掃描並等待完成，專門為STS測量設計
@@ -242,11 +421,16 @@ class SXMScanControl(SXMEventHandler):
             if self.debug_mode:
                 print(f"開始掃描 {num_lines} 條線")
 
-            # 設定合理的超時時間
+            # 由掃描時間模型設定超時時間
+            speed = self._scan_speed(refresh=True)
+            expected = self.predict_scan_time(num_lines, speed)
             if timeout is None:
-                timeout = num_lines * 10  # 每行給10秒
+                timeout = (self.timing_model.timeout(num_lines, speed)
+                           if expected is not None else num_lines * 10)
 
-            # 發送掃描命令
+            # 發送掃描命令前記錄 Scan off 次數，之後的 Scan off 即為本次掃描結束
+            off_count = self.scan_status.scan_off_count
+            send_time = time.monotonic()
             command = f"ScanLine({num_lines});"
             success, _ = self._send_command(command)
 
@@ -255,17 +439,14 @@ class SXMScanControl(SXMEventHandler):
                     print("發送掃描命令失敗")
                 return False
 
-            # 等待掃描開始（短暫延遲）
-            # time.sleep(0.5)
-
             # 使用wait_for_scan_complete等待掃描完成
-            if not self.wait_for_scan_complete(timeout):
+            if not self.wait_for_scan_complete(timeout, since_count=off_count,
+                                               expected_duration=expected):
                 if self.debug_mode:
                     print("掃描等待超時")
                 return False
 
-            # 額外等待系統穩定
-            time.sleep(0.5)
+            self._observe_scan_timing(num_lines, speed, send_time)
 
             if self.debug_mode:
                 print("掃描完成")
@@ -276,44 +457,130 @@ class SXMScanControl(SXMEventHandler):
                 print(f"掃描過程發生錯誤: {str(e)}")
             return False
 
+    def _scan_speed(self, refresh=False):
+        """
+        取得掃描速度 (lines/s)，優先使用已知狀態
+
+        已知狀態可能來自暖啟動快取，或在 SXM 介面中被修改過；
+        以速度決定超時時間的掃描須以 refresh=True 重新讀取
+        """
+        speed = None if refresh else self.current_state.get('speed')
+        if not speed:
+            speed = self.GetScanPara('Speed')
+            if speed:
+                self.current_state['speed'] = speed
+        return speed
+
+    def predict_scan_time(self, num_lines, speed=None):
+        """
+        預測 ScanLine(num_lines) 的時間
+
+        Parameters
+        ----------
+        num_lines : int
+            ScanLine 的參數
+        speed : float, optional
+            掃描速度 (lines/s)，預設使用目前設定
+
+        Returns
+        -------
+        float or None
+            預測時間（秒），無法取得速度時為None
+        """
+        speed = speed or self._scan_speed()
+        if not speed:
+            return None
+        return self.timing_model.predict(num_lines, speed)
+
+    def _observe_scan_timing(self, num_lines, speed, send_time):
+        """以 Scan on/off 事件時間校正掃描時間模型"""
+        if not speed or self._dry_run is not None:
+            return
+        on_time = self.scan_status.scan_on_time
+        off_time = self.scan_status.scan_off_time
+        start = on_time if on_time is not None and on_time >= send_time else send_time
+        end = off_time if off_time is not None and off_time >= start else time.monotonic()
+        self.timing_model.observe(num_lines, speed, end - start)
+
+        if self.debug_mode:
+            print(f"Scan timing: {end - start:.2f} s for {num_lines} lines, "
+                  f"model {self.timing_model.line_factor:.3f}/speed + {self.timing_model.overhead:.2f} s")
+
     @track_function
-    def wait_for_scan_complete(self, timeout=None):
+    def wait_for_scan_complete(self, timeout=None, since_count=None, poll_interval=5.0,
+                               expected_duration=None):
         """
         等待掃描完成
 
+        以 Scan off 事件為主，事件一到達即返回；
+        每隔 poll_interval 秒才讀取一次 Scan 參數，作為遺失事件時的備援。
+        以備援讀取判定完成時，對應的 Scan off 事件可能仍在佇列中，
+        之後的等待會略過這個遲到的事件，避免下一段掃描立即返回。
+        提供 expected_duration 時，預計結束前不進行備援讀取。
+
         Parameters
         ----------
         timeout : float, optional
             等待超時時間（秒）
+        since_count : int, optional
+            發送掃描命令前的 scan_status.scan_off_count，
+            之後任何一次 Scan off 都視為完成。未指定時等待目前的掃描結束
+        poll_interval : float
+            備援讀取 Scan 參數的間隔（秒）
+        expected_duration : float, optional
+            預計掃描時間（秒），第一次備援讀取延後到預計結束之後
 
         Returns
         -------
         bool
             True表示掃描完成，False表示超時或被中斷
         """
-        start_time = time.time()
+        start_time = time.monotonic()
+        first_poll = poll_interval
+        if expected_duration is not None:
+            first_poll = max(expected_duration * 1.05 + 0.5, poll_interval)
         try:
-            while True:
-                # 檢查掃描狀態
-                current_status = self.check_scan()
+            if since_count is None:
+                since_count = self.scan_status.scan_off_count
+                if not self.scan_status.is_scanning and self.check_scan() is False:
+                    if self.debug_mode:
+                        print("Scan completed")
+                    return True
+
+            # 略過上一次輪詢完成後才到達的 Scan off
+            requested_count = since_count
+            since_count = max(since_count, self._scan_off_floor)
 
-                # 如果掃描已結束
-                if current_status is False:
+            def scan_finished(status):
+                return status.scan_off_count > since_count
+
+            while True:
+                wait_time = first_poll
+                first_poll = poll_interval
+                if timeout:
+                    remaining = timeout - (time.monotonic() - start_time)
+                    wait_time = min(wait_time, max(remaining, 0))
+
+                # 等待 Scan off 事件
+                if self.wait_for_status(scan_finished, wait_time):
                     if self.debug_mode:
                         print("Scan completed")
                     return True
 
                 # 檢查超時
-                if timeout and (time.time() - start_time > timeout):
+                if timeout and (time.monotonic() - start_time >= timeout):
                     if self.debug_mode:
                         print("Scan monitoring timeout")
                     return False
 
-                # Windows消息處理
-                SXMRemote.loop()
-
-                # 短暫休息以減少CPU使用
-                time.sleep(1)
+                # 備援：直接讀取掃描狀態
+                if self.check_scan() is False:
+                    # 本次的 Scan off 事件尚未處理，記錄它到達後的計數
+                    if self.scan_status.scan_off_count <= requested_count:
+                        self._scan_off_floor = requested_count + 1
+                    if self.debug_mode:
+                        print("Scan completed (polled)")
+                    return True
 
         except KeyboardInterrupt:
             if self.debug_mode:
@@ -338,7 +605,7 @@ class SXMScanControl(SXMEventHandler):
             # 處理直接的數值回應
             if isinstance(scan_value, (int, float)):
                 is_scanning = bool(scan_value)
-                self.scan_status.is_scanning = is_scanning
+                self.scan_status.update(is_scanning=is_scanning)
                 if self.debug_mode:
                     print(
                         f"Scan status from direct value: {'On' if is_scanning else 'Off'}")
@@ -354,9 +621,11 @@ class SXMScanControl(SXMEventHandler):
                     try:
                         direction = 'forward' if response_str[0] == 'f' else 'backward'
                         line_number = int(response_str[1:])
-                        self.scan_status.is_scanning = True
-                        self.scan_status.direction = direction
-                        self.scan_status.line_number = line_number
+                        self.scan_status.update(
+                            is_scanning=True,
+                            direction=direction,
+                            line_number=line_number
+                        )
                         if self.debug_mode:
                             print(f"Scanning: {direction} line {line_number}")
                         return True
@@ -370,6 +639,300 @@ class SXMScanControl(SXMEventHandler):
                 print(f"Error in check_scan: {str(e)}")
             return None
 
+    # ========== 即時影像 ========== #
+    def set_collect(self, channels, freq=None, on=True) -> bool:
+        """
+        設定 Collect 資料串流
+
+        Parameters
+        ----------
+        channels : Iterable[int]
+            要輸出的通道編號
+        freq : float, optional
+            取樣頻率（Hz）
+        on : bool
+            是否開啟串流
+
+        Returns
+        -------
+        bool
+            設定是否成功
+        """
+        commands = []
+        if freq is not None:
+            commands.append(f"Collect('Freq', {freq});")
+        commands.append(f"Collect('ChList', {', '.join(str(ch) for ch in channels)});")
+        commands.append(f"Collect('On', {1 if on else 0});")
+        return self._batch_write(commands)
+
+    def start_live_image(self, geometry: ScanGeometry = None, channel=COLLECT_Z_FAST,
+                         freq=None, on_row=None) -> LiveImageBuilder:
+        """
+        開始以 Collect 串流與 ScanLine 事件逐行組合影像
+
+        Parameters
+        ----------
+        geometry : ScanGeometry, optional
+            掃描幾何，預設讀取目前設定
+        channel : int
+            形貌資料的 Collect 通道
+        freq : float, optional
+            Collect 取樣頻率（Hz）
+        on_row : callable, optional
+            列更新時呼叫，參數為 (row_index, row, direction)
+
+        Returns
+        -------
+        LiveImageBuilder
+            影像組合器，frame 屬性為目前影像
+        """
+        self.stop_live_image()
+        if geometry is None:
+            geometry = self.get_scan_geometry()
+
+        builder = LiveImageBuilder(geometry, channel=channel)
+        if on_row is not None:
+            builder.subscribe(on_row)
+
+        if not self.set_collect([channel], freq):
+            raise RuntimeError("Failed to enable Collect stream")
+
+        builder.attach(self)
+        self._collect_reader = self.collect_reader_factory(builder.feed, channels=[channel])
+        self._collect_reader.start()
+        self.live_image = builder
+
+        if self.debug_mode:
+            print(f"Live image started: {builder.lines} lines x {builder.pixels} pixels")
+        return builder
+
+    def stop_live_image(self):
+        """停止即時影像組合並關閉 Collect 串流"""
+        if self._collect_reader is not None:
+            self._collect_reader.stop()
+            self._collect_reader = None
+            self._batch_write(["Collect('On', 0);"])
+        if self.live_image is not None:
+            self.live_image.detach(self)
+
+    # ========== Line Sync ========== #
+    def start_line_sync(self, freq=None) -> LineSyncCounter:
+        """
+        開始以 Collect 的 Frame/Line Sync 通道計算掃描行數
+
+        與即時影像共用同一個 Collect 串流，兩者不能同時使用。
+
+        Parameters
+        ----------
+        freq : float, optional
+            Collect 取樣頻率（Hz）
+
+        Returns
+        -------
+        LineSyncCounter
+            行數計數器，count 為已開始的掃描行數
+        """
+        if self._collect_reader is not None:
+            raise RuntimeError("Collect stream is already in use")
+
+        counter = LineSyncCounter(COLLECT_LINE_SYNC)
+        if not self.set_collect([COLLECT_LINE_SYNC], freq):
+            raise RuntimeError("Failed to enable Collect stream")
+
+        # dry run 沒有資料串流，wait_for_line 直接返回
+        if self._dry_run is None:
+            self._collect_reader = self.collect_reader_factory(
+                counter.feed, channels=[COLLECT_LINE_SYNC])
+            self._collect_reader.start()
+        self.line_sync = counter
+
+        if self.debug_mode:
+            print("Line sync started")
+        return counter
+
+    def stop_line_sync(self):
+        """停止 Line Sync 計數並關閉 Collect 串流"""
+        if self.line_sync is None:
+            return
+        self.line_sync = None
+        if self._collect_reader is not None:
+            self._collect_reader.stop()
+            self._collect_reader = None
+        self._batch_write(["Collect('On', 0);"])
+
+    def wait_for_line(self, count, timeout=None, poll_interval=0.01) -> bool:
+        """
+        等待 Line Sync 計數達到 count，等待時持續處理 Windows 消息
+
+        Parameters
+        ----------
+        count : int
+            目標行數（已開始的行數）
+        timeout : float, optional
+            等待超時時間（秒）
+        poll_interval : float
+            每次處理消息之間的最長等待時間（秒）
+
+        Returns
+        -------
+        bool
+            True表示達到目標，False表示超時或未啟動 Line Sync
+        """
+        if self._dry_run is not None:
+            return True
+        counter = self.line_sync
+        if counter is None:
+            return False
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            SXMRemote.pump()
+            wait_time = poll_interval
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return counter.wait_for(count, 0)
+                wait_time = min(poll_interval, remaining)
+            if counter.wait_for(count, wait_time):
+                return True
+
+    # ========== 漂移補償 ========== #
+    def enable_drift_tracking(self, gain=0.5, min_peak=0.2, max_shift=0.25):
+        """
+        開始以連續影像自動更新 DriftX/DriftY
+
+        每完成一張影像後呼叫 update_drift，影像來源為該張影像的存檔（AutoSave），
+        沒有新的存檔時才使用即時影像 (start_live_image)。
+
+        Parameters
+        ----------
+        gain : float
+            每次更新採用的殘餘漂移比例，小於1可避免雜訊造成震盪
+        min_peak : float
+            可接受的最低相位相關峰值
+        max_shift : float
+            可接受的最大位移，以影像尺寸的比例表示
+        """
+        if not 0 < gain <= 1:
+            raise ValueError(f"gain must be in (0, 1]: {gain}")
+        self.drift_gain = gain
+        self.drift_estimator = DriftEstimator(min_peak=min_peak, max_shift=max_shift)
+        self._drift_file = None
+
+        drift = self.GetScanParas(['DriftX', 'DriftY'])
+        self.current_state['driftx'] = drift.get('DriftX') or 0.0
+        self.current_state['drifty'] = drift.get('DriftY') or 0.0
+
+    def disable_drift_tracking(self):
+        """停止自動更新漂移補償，已寫入的補償值保持不變"""
+        self.drift_estimator = None
+
+    def _saved_drift_frame(self, geometry: ScanGeometry, save_since=None):
+        """
+        讀取最新一張存檔影像供漂移估計
+
+        提供 save_since 且 AutoSave 開啟時先等待該張影像存檔；
+        否則只使用尚未用過的最近一次存檔。
+
+        Returns
+        -------
+        np.ndarray or None
+            存檔影像，沒有新的存檔或讀取失敗時為None
+        """
+        if save_since is not None and self._auto_save_enabled():
+            self.wait_for_save(save_since, self.save_timeout)
+
+        path = self.scan_status.last_saved_file
+        if not path or path == self._drift_file:
+            return None
+        self._drift_file = path
+        try:
+            return load_saved_image(path, shape=(geometry.total_lines, geometry.pixels))
+        except (OSError, ValueError) as e:
+            if self.debug_mode:
+                print(f"Cannot load saved image {path}: {str(e)}")
+            return None
+
+    def update_drift(self, frame=None, geometry: ScanGeometry = None, timestamp=None,
+                     save_since=None):
+        """
+        以最新一張影像估計殘餘漂移，並以一次批次寫入更新 DriftX/DriftY
+
+        Parameters
+        ----------
+        frame : np.ndarray, optional
+            (lines, pixels) 形貌影像，預設使用最新的存檔影像，沒有新的存檔時使用即時影像
+        geometry : ScanGeometry, optional
+            該影像的掃描幾何，預設讀取目前設定
+        timestamp : float, optional
+            影像完成的單調時間，預設為最近一次 Scan off 的時間
+        save_since : int, optional
+            影像掃描開始前的 scan_status.save_count，提供時先等待該張影像存檔
+
+        Returns
+        -------
+        tuple or None
+            更新後的 (DriftX, DriftY)，沒有更新時為None
+        """
+        if self.drift_estimator is None or self._dry_run is not None:
+            return None
+        if geometry is None:
+            geometry = self.get_scan_geometry()
+        if frame is None:
+            frame = self._saved_drift_frame(geometry, save_since)
+        if frame is None:
+            if self.live_image is None:
+                if self.debug_mode:
+                    print("Drift not updated: no saved or live image")
+                return None
+            frame = self.live_image.snapshot()
+        if timestamp is None:
+            timestamp = self.scan_status.scan_off_time or time.monotonic()
+
+        residual = self.drift_estimator.add_frame(frame, geometry, timestamp)
+        if residual is None:
+            if self.debug_mode:
+                print(f"Drift not updated (peak {self.drift_estimator.last_peak})")
+            return None
+
+        self._observe_creep(residual)
+
+        drift_x = self.current_state.get('driftx') or 0.0
+        drift_y = self.current_state.get('drifty') or 0.0
+        drift_x += self.drift_gain * float(residual[0])
+        drift_y += self.drift_gain * float(residual[1])
+
+        if not self._batch_write([f"ScanPara('DriftX', {drift_x});",
+                                  f"ScanPara('DriftY', {drift_y});"]):
+            if self.debug_mode:
+                print("Failed to write drift compensation")
+            return None
+
+        self.current_state.update(driftx=drift_x, drifty=drift_y)
+        if self.debug_mode:
+            print(f"Residual drift ({residual[0]:.4f}, {residual[1]:.4f}) nm/s, "
+                  f"compensation set to ({drift_x:.4f}, {drift_y:.4f})")
+        return drift_x, drift_y
+
+    def _observe_creep(self, residual):
+        """
+        以影像間的殘餘漂移校正蠕變模型
+
+        只使用最近一次移動之後才完成的兩張影像，時間自移動起算
+        """
+        interval = self.drift_estimator.last_interval
+        if self._last_move is None or interval is None:
+            return
+        distance, moved_at = self._last_move
+        start, end = interval[0] - moved_at, interval[1] - moved_at
+        if start <= 0:
+            return
+        rate = math.hypot(float(residual[0]), float(residual[1]))
+        self.creep_model.observe(distance, start, end, rate)
+        if self.debug_mode:
+            print(f"Creep gamma {self.creep_model.gamma:.4f} "
+                  f"({self.creep_model.num_observations} observations)")
+
     # ========== 座標轉換功能 ========== #
     def rotate_coordinates(self, x, y, angle_deg, center_x=0, center_y=0):
         """
@@ -389,22 +952,10 @@ class SXMScanControl(SXMEventHandler):
         tuple
             (旋轉後的x, 旋轉後的y)
         """
-        angle_rad = math.radians(angle_deg)
-        cos_angle = math.cos(angle_rad)
-        sin_angle = math.sin(angle_rad)
-
-        # 平移到原點
-        x_shifted = x - center_x
-        y_shifted = y - center_y
-
-        # 旋轉
-        x_rot = x_shifted * cos_angle - y_shifted * sin_angle
-        y_rot = x_shifted * sin_angle + y_shifted * cos_angle
-
-        # 平移回原位
-        return (x_rot + center_x, y_rot + center_y)
+        x_rot, y_rot = FrameTransform.rotate((x, y), angle_deg, (center_x, center_y))[0]
+        return (float(x_rot), float(y_rot))
 
-    def get_real_coordinates(self, x_nm, y_nm):
+    def get_real_coordinates(self, x_nm, y_nm, scan_range=None):
         """
         將物理座標轉換為當前掃描範圍內的實際座標
 
@@ -412,6 +963,9 @@ class SXMScanControl(SXMEventHandler):
         ----------
         x_nm, y_nm : float
             目標座標（nm）
+        scan_range : float, optional
+            掃描範圍（nm），未提供時從SXM讀取。
+            大量座標請改用 FrameTransform.clamp_to_window 一次處理
 
         Returns
         -------
@@ -419,12 +973,13 @@ class SXMScanControl(SXMEventHandler):
             實際座標，如果超出範圍則進行限制
         """
         try:
-            scan_range = self.GetScanPara('Range')
+            if scan_range is None:
+                scan_range = self.GetScanPara('Range')
             half_range = scan_range / 2
 
             # 檢查是否在範圍內
-            x_limited = max(-half_range, min(half_range, x_nm))
-            y_limited = max(-half_range, min(half_range, y_nm))
+            x_limited, y_limited = (float(v) for v in FrameTransform.clamp_box(
+                (x_nm, y_nm), half_range, half_range)[0])
 
             if x_limited != x_nm or y_limited != y_nm:
                 if self.debug_mode:
@@ -438,28 +993,79 @@ class SXMScanControl(SXMEventHandler):
                 print(f"Coordinate conversion error: {str(e)}")
             return None
 
+    def _auto_save_enabled(self):
+        """
+        影像掃描完成後是否會自動存檔
+
+        AutoSave 可在 SXM 介面中切換，每次重新讀取，讀取失敗時才使用已知狀態
+        """
+        auto_save = self.GetScanPara('AutoSave')
+        if auto_save is None:
+            auto_save = self.current_state.get('autosave')
+        else:
+            self.current_state['autosave'] = auto_save
+        return bool(auto_save)
+
+    def wait_for_pending_save(self, timeout=None) -> bool:
+        """
+        等待上一張影像存檔完成
+
+        Parameters
+        ----------
+        timeout : float, optional
+            等待超時時間（秒），預設使用 save_timeout
+
+        Returns
+        -------
+        bool
+            True表示沒有待存檔的影像或已存檔，False表示超時
+        """
+        since_count = self._pending_save_count
+        if since_count is None:
+            return True
+        self._pending_save_count = None
+
+        timeout = self.save_timeout if timeout is None else timeout
+        if self.wait_for_save(since_count, timeout):
+            return True
+        print(f"Warning: image save not confirmed within {timeout} s")
+        return False
+
     @track_function
-    def perform_scan_sequence(self, repeat_count=1):
+    def perform_scan_sequence(self, repeat_count=1, wait_for_last_save=True):
         """
         在當前位置執行指定次數的掃描
 
+        每次開始掃描前先等待上一張影像存檔完成；
+        wait_for_last_save 為 False 時最後一張不等待，
+        讓呼叫者在存檔期間移動到下一個位置。
+
         Parameters
         ----------
         repeat_count : int
             掃描重複次數
+        wait_for_last_save : bool
+            是否等待最後一張影像存檔完成
 
         Returns
         -------
         bool
-            所有掃描是否成功完成
+            所有掃描是否成功完成，影像存檔超時也視為失敗
         """
         try:
             success = True
+            auto_save = self._auto_save_enabled()
             for i in range(repeat_count):
                 if self.debug_mode:
                     print(f"Starting scan {i+1}/{repeat_count}")
 
+                # 新的掃描會覆寫影像緩衝，須等上一張存檔完成
+                if not self.wait_for_pending_save():
+                    success = False
+
                 # 開始掃描
+                off_count = self.scan_status.scan_off_count
+                save_count = self.scan_status.save_count
                 self.scan_on()
                 if not self.is_scanning():
                     if self.debug_mode:
@@ -468,7 +1074,7 @@ class SXMScanControl(SXMEventHandler):
                     break
 
                 # 等待掃描完成
-                if self.wait_for_scan_complete():
+                if self.wait_for_scan_complete(since_count=off_count):
                     if self.debug_mode:
                         print(f"Scan {i+1} completed")
                 else:
@@ -477,9 +1083,14 @@ class SXMScanControl(SXMEventHandler):
                     success = False
                     break
 
-                # 掃描之間的短暫暫停
-                time.sleep(0.5)
+                if auto_save:
+                    self._pending_save_count = save_count
+
+                if self.drift_estimator is not None:
+                    self.update_drift(save_since=save_count)
 
+            if wait_for_last_save and not self.wait_for_pending_save():
+                success = False
             return success
 
         except Exception as e:
@@ -487,7 +1098,7 @@ class SXMScanControl(SXMEventHandler):
                 print(f"Error during scan sequence: {str(e)}")
             return False
 
-    def auto_move(self, movement_script: str, distance: float, center_x: float,
+    def auto_move(self, movement_script: str, distance, center_x: float,
                   center_y: float, angle: float) -> list:
         """
         生成自動移動序列的座標列表
@@ -496,9 +1107,10 @@ class SXMScanControl(SXMEventHandler):
         ----------
         movement_script : str
             移動指令序列，如 "RULLDDRR"
-            R: 右, L: 左, U: 上, D: 下
-        distance : float
-            每次移動的距離（nm）
+            R: 右, L: 左, U: 上, D: 下；可使用次數、群組與蛇形，
+            如 "(10R U 10L U)x10"、"S20x20"，語法見 MoveScript
+        distance : float or Tuple[float, float]
+            每次移動的距離（nm）；(快軸, 慢軸) 時兩軸使用各自的距離，如 TilePlan.distance
         center_x : float
             起始中心 X 座標
         center_y : float
@@ -512,34 +1124,20 @@ class SXMScanControl(SXMEventHandler):
             移動位置的座標列表，格式為 [(x1, y1), (x2, y2), ...]
         """
         try:
-            positions = [(center_x, center_y)]  # 包含起始位置
-            x, y = center_x, center_y
-
             if self.debug_mode:
                 print(f"\nGenerating movement positions:")
-                print(f"Start position: ({x}, {y})")
+                print(f"Start position: ({center_x}, {center_y})")
                 print(f"Movement script: {movement_script}")
                 print(f"Distance: {distance} nm")
 
-            # 計算每個移動點的座標
-            for i, direction in enumerate(movement_script):
-                try:
-                    # 計算移動向量
-                    dx, dy = self.calculate_movement(direction, distance)
-                    new_x = x + dx
-                    new_y = y + dy
-
-                    if self.debug_mode:
-                        print(f"Position {i+1}: ({new_x}, {new_y})")
-
-                    # 更新位置並加入列表
-                    x, y = new_x, new_y
-                    positions.append((x, y))
+            # 一次計算所有移動點的座標（包含起始位置）
+            path = FrameTransform.path_from_moves(
+                movement_script, distance, (center_x, center_y), angle)
+            positions = [(float(x), float(y)) for x, y in path]
 
-                except Exception as e:
-                    if self.debug_mode:
-                        print(f"Error calculating position {i+1}: {str(e)}")
-                    raise
+            if self.debug_mode:
+                for i, (x, y) in enumerate(positions[1:]):
+                    print(f"Position {i+1}: ({x}, {y})")
 
             return positions
 
@@ -548,10 +1146,191 @@ class SXMScanControl(SXMEventHandler):
                 print(f"Position generation error: {str(e)}")
             raise
 
+    def plan_route(self, positions: list, optimize_route: bool = False,
+                   route_precedence=()) -> list:
+        """
+        依需要重新排列自動移動位置，起始位置固定為第一個
+
+        Parameters
+        ----------
+        positions : list
+            auto_move 產生的位置列表
+        optimize_route : bool
+            是否進行路徑最佳化
+        route_precedence : List[Tuple[int, int]]
+            (a, b) 表示位置 a 必須在位置 b 之前走訪
+
+        Returns
+        -------
+        list
+            走訪順序的位置列表
+        """
+        if not optimize_route:
+            return positions
+
+        plan = RouteOptimizer.optimize(positions, route_precedence)
+        self.last_route_plan = plan
+        print(f"Route travel: {plan.travel_before:.1f} nm -> {plan.travel_after:.1f} nm "
+              f"({plan.saving:.0%} shorter)")
+        if self.debug_mode:
+            print(f"Route order: {plan.order}")
+        return plan.apply(positions)
+
+    def _scan_at_positions(self, positions: list, wait_time: float, repeat_count: int = 1,
+                           adaptive_settle: bool = False, start=None):
+        """
+        依序移動到每個位置並掃描，最後一張影像在移動到下一個位置期間存檔
+
+        Parameters
+        ----------
+        positions : list
+            掃描中心列表
+        wait_time : float
+            每次移動後的等待時間（秒）
+        repeat_count : int
+            每個位置的掃描重複次數
+        adaptive_settle : bool
+            是否依移動距離與蠕變模型決定等待時間
+        start : tuple, optional
+            目前的掃描中心；未提供時第一個位置即為目前位置，不需移動
+
+        Returns
+        -------
+        bool
+            所有位置的移動、掃描與影像存檔是否都成功；單一位置失敗時仍繼續下一個位置
+        """
+        success = True
+        previous = start
+        for i, (x, y) in enumerate(positions):
+            # 除了初始位置外，需要先移動
+            if previous is not None:
+                if self.debug_mode:
+                    print(
+                        f"\nMoving to position {i}/{len(positions)-1}")
+
+                # 移動到新位置
+                if not self.set_position(x, y):
+                    print(
+                        f"Warning: Failed to move to position ({x}, {y})")
+                    success = False
+                    continue
+
+                # 等待系統穩定
+                self._wait_after_move(
+                    math.dist(previous, (x, y)), wait_time, adaptive_settle)
+            previous = (x, y)
+
+            # 執行掃描，最後一張影像在移動到下一個位置期間存檔
+            if not self.perform_scan_sequence(repeat_count, wait_for_last_save=False):
+                position_type = "initial position" if i == 0 and start is None else f"position {i}"
+                print(f"Warning: Scan or image save failed at {position_type}")
+                success = False
+                continue
+
+        if not self.wait_for_pending_save():
+            success = False
+        return success
+
+    def plan_tiles(self, width: float, height: float, overlap: float = 0.1,
+                   center_x: float = None, center_y: float = None,
+                   num_points_x: int = None, num_points_y: int = None,
+                   geometry: ScanGeometry = None) -> TilePlan:
+        """
+        以目前的掃描視窗大小將區域分割為多個視窗
+
+        Parameters
+        ----------
+        width, height : float
+            區域沿快軸與慢軸的大小 (nm)
+        overlap : float
+            相鄰視窗重疊的比例
+        center_x, center_y : float, optional
+            區域中心 (nm)，預設為目前的掃描中心
+        num_points_x, num_points_y : int, optional
+            全域 CITS 網格點數
+        geometry : ScanGeometry, optional
+            掃描幾何快照，未提供時以一次批次讀取獲取
+
+        Returns
+        -------
+        TilePlan
+            視窗走訪順序、移動序列與各視窗的 CITS 區域
+        """
+        if geometry is None:
+            geometry = self.get_scan_geometry()
+        if center_x is None:
+            center_x = geometry.center_x
+        if center_y is None:
+            center_y = geometry.center_y
+
+        plan = TilePlanner.plan(
+            center_x, center_y, width, height, geometry.scan_range, geometry.angle,
+            geometry.aspect_ratio, overlap, start=(geometry.center_x, geometry.center_y),
+            num_points_x=num_points_x, num_points_y=num_points_y)
+
+        # 在任何移動之前檢查整個序列
+        PlanValidator.validate_scan_centers(
+            plan.positions, geometry.scan_range, geometry.angle, geometry.aspect_ratio
+        ).raise_if_invalid()
+
+        self.last_tile_plan = plan
+        if self.debug_mode:
+            print(f"Tiled plan: {len(plan.tiles)} windows, step {plan.step[0]:.1f} x "
+                  f"{plan.step[1]:.1f} nm, moves '{plan.movement_script}', "
+                  f"travel {plan.travel:.1f} nm")
+        return plan
+
+    @track_function
+    @supports_dry_run
+    def survey_area(self, width: float, height: float, wait_time: float,
+                    overlap: float = 0.1, repeat_count: int = 1,
+                    center_x: float = None, center_y: float = None,
+                    adaptive_settle: bool = False) -> bool:
+        """
+        以多個掃描視窗掃描大於單一視窗的區域
+
+        Parameters
+        ----------
+        width, height : float
+            區域沿快軸與慢軸的大小 (nm)
+        wait_time : float
+            每次移動後的等待時間（秒）
+        overlap : float, optional
+            相鄰視窗重疊的比例
+        repeat_count : int, optional
+            每個視窗的掃描重複次數
+        center_x, center_y : float, optional
+            區域中心 (nm)，預設為目前的掃描中心
+        adaptive_settle : bool, optional
+            是否依移動距離與蠕變模型決定等待時間，取代固定的 wait_time
+        dry_run : bool, optional
+            不操作儀器，只統計命令並預估時間
+
+        Returns
+        -------
+        bool or dict
+            掃描是否成功完成；dry_run 時為 run_dry_run 的統計結果
+        """
+        try:
+            geometry = self.get_scan_geometry()
+            plan = self.plan_tiles(width, height, overlap, center_x, center_y,
+                                   geometry=geometry)
+            return self._scan_at_positions(plan.positions, wait_time, repeat_count,
+                                           adaptive_settle,
+                                           start=(geometry.center_x, geometry.center_y))
+
+        except Exception as e:
+            if self.debug_mode:
+                print(f"Survey error: {str(e)}")
+            return False
+
     # combine auto_move and perform_scan_sequence
     @track_function
-    def auto_move_scan_area(self, movement_script: str, distance: float,
-                            wait_time: float, repeat_count: int = 1) -> bool:
+    @supports_dry_run
+    def auto_move_scan_area(self, movement_script: str, distance,
+                            wait_time: float, repeat_count: int = 1,
+                            optimize_route: bool = False, route_precedence=(),
+                            adaptive_settle: bool = False, strict: bool = False) -> bool:
         """
         執行自動移動和掃描序列
 
@@ -559,27 +1338,35 @@ class SXMScanControl(SXMEventHandler):
         ----------
         movement_script : str
             移動指令序列，如 "RULLDDRR"
-            R: 右, L: 左, U: 上, D: 下
-        distance : float
-            每次移動的距離（nm）
+            R: 右, L: 左, U: 上, D: 下；可使用次數、群組與蛇形，
+            如 "(10R U 10L U)x10"、"S20x20"，語法見 MoveScript
+        distance : float or Tuple[float, float]
+            每次移動的距離（nm）；(快軸, 慢軸) 時兩軸使用各自的距離
         wait_time : float
             每次移動後的等待時間（秒）
         repeat_count : int, optional
             每個位置的掃描重複次數
+        optimize_route : bool, optional
+            是否重新排列移動位置以縮短總移動距離
+        route_precedence : List[Tuple[int, int]], optional
+            (a, b) 表示第 a 個位置必須在第 b 個位置之前走訪（以 auto_move 的順序編號）
+        adaptive_settle : bool, optional
+            是否依移動距離與蠕變模型決定等待時間，取代固定的 wait_time
+        strict : bool, optional
+            為 True 時任一位置的移動、掃描或存檔失敗即回傳 False；
+            預設只記錄警告並繼續下一個位置
+        dry_run : bool, optional
+            不操作儀器，只統計命令並預估時間
 
         Returns
         -------
-        bool
-            序列是否成功完成
+        bool or dict
+            序列是否完成；dry_run 時為 run_dry_run 的統計結果
         """
         try:
             # 獲取當前掃描參數
-            center_x = self.GetScanPara('X')
-            center_y = self.GetScanPara('Y')
-            angle = self.GetScanPara('Angle')
-
-            if any(v is None for v in [center_x, center_y, angle]):
-                raise ValueError("無法獲取掃描參數")
+            geometry = self.get_scan_geometry()
+            center_x, center_y, angle = geometry.center_x, geometry.center_y, geometry.angle
 
             if self.debug_mode:
                 print(f"Starting auto move scan sequence:")
@@ -595,29 +1382,19 @@ class SXMScanControl(SXMEventHandler):
                     center_y=center_y,
                     angle=angle
                 )
+                positions = self.plan_route(positions, optimize_route, route_precedence)
 
-                # 在每個位置執行掃描（包含初始位置）
-                for i, (x, y) in enumerate(positions):
-                    # 除了初始位置外，需要先移動
-                    if i > 0:
-                        if self.debug_mode:
-                            print(
-                                f"\nMoving to position {i}/{len(positions)-1}")
-
-                        # 移動到新位置
-                        if not self.set_position(x, y):
-                            print(
-                                f"Warning: Failed to move to position ({x}, {y})")
-                            continue
+                # 在任何移動之前檢查整個序列
+                PlanValidator.validate_scan_centers(
+                    positions, geometry.scan_range, angle, geometry.aspect_ratio
+                ).raise_if_invalid()
 
-                        # 等待系統穩定
-                        time.sleep(wait_time)
-
-                    # 執行掃描
-                    if not self.perform_scan_sequence(repeat_count):
-                        position_type = "initial position" if i == 0 else f"position {i}"
-                        print(f"Warning: Scan failed at {position_type}")
-                        continue
+                # 在每個位置執行掃描（包含初始位置）
+                if not self._scan_at_positions(positions, wait_time, repeat_count,
+                                               adaptive_settle):
+                    print("Warning: Auto move scan sequence finished with failures")
+                    if strict:
+                        return False
 
             except Exception as e:
                 if self.debug_mode:
@@ -649,26 +1426,10 @@ class SXMScanControl(SXMEventHandler):
         tuple (float, float)
             (dx, dy) 需要移動的x和y分量
         """
-        angle_rad = math.radians(self.current_angle)
-        cos_angle = math.cos(angle_rad)
-        sin_angle = math.sin(angle_rad)
-
-        if direction == 'R':
-            dx = distance * cos_angle
-            dy = distance * sin_angle
-        elif direction == 'L':
-            dx = -distance * cos_angle
-            dy = -distance * sin_angle
-        elif direction == 'U':
-            dx = -distance * sin_angle
-            dy = distance * cos_angle
-        elif direction == 'D':
-            dx = distance * sin_angle
-            dy = -distance * cos_angle
-        else:
+        if len(direction) != 1:
             raise ValueError(f"Unknown direction: {direction}")
-
-        return dx, dy
+        dx, dy = FrameTransform.movement_vectors(direction, distance, self.current_angle)[0]
+        return float(dx), float(dy)
 
     # ========== Scan Ratio and Aspect Ratio ========== #
 
@@ -710,39 +1471,71 @@ class SXMScanControl(SXMEventHandler):
                 print(f"Error getting aspect ratio: {str(e)}")
             return self.current_state['aspect_ratio']
 
-    def calculate_actual_scan_dimensions(self) -> tuple:
+    def get_scan_geometry(self) -> ScanGeometry:
+        """
+        以一次批次讀取獲取掃描幾何快照
+
+        Returns
+        -------
+        ScanGeometry
+            掃描中心、範圍、角度、像素與比例
+
+        Raises
+        ------
+        ValueError
+            當任何必要參數讀取失敗時
+        """
+        params = self.GetScanParas(list(ScanGeometry.SCAN_PARAM_FIELDS))
+        geometry = ScanGeometry.from_scan_params(params)
+        self._apply_geometry(geometry)
+
+        if self.debug_mode:
+            print(f"Scan geometry: {geometry}")
+        return geometry
+
+    def _apply_geometry(self, geometry: ScanGeometry):
+        """將掃描幾何寫入目前狀態"""
+        self.current_state.update({
+            'x': geometry.center_x,
+            'y': geometry.center_y,
+            'range': geometry.scan_range,
+            'angle': geometry.angle,
+            'speed': geometry.speed,
+            'pixel_ratio': geometry.pixel_ratio,
+            'aspect_ratio': geometry.aspect_ratio
+        })
+        self.current_angle = geometry.angle
+
+    def calculate_actual_scan_dimensions(self, geometry: ScanGeometry = None) -> tuple:
         """
         計算實際的掃描範圍尺寸
 
         當image format改變時，會影響慢軸的掃描範圍。
         例如：當image format設為0.5時，慢軸掃描範圍會是原來的兩倍。
 
+        Parameters
+        ----------
+        geometry : ScanGeometry, optional
+            掃描幾何，未提供時以一次批次讀取獲取
+
         Returns
         -------
         tuple
             (快軸範圍, 慢軸範圍) 單位nm
         """
         try:
-            scan_range = self.current_state['range']
-            aspect_ratio = self.get_aspect_ratio()
-
-            if scan_range is None:
-                scan_range = self.GetScanPara('Range')
-
-            if scan_range is None or aspect_ratio is None:
-                return (None, None)
-
-            fast_axis_range = scan_range
-            slow_axis_range = scan_range / aspect_ratio  # 當aspect_ratio < 1時，慢軸範圍會變大
+            if geometry is None:
+                geometry = self.get_scan_geometry()
 
-            return (fast_axis_range, slow_axis_range)
+            # 當aspect_ratio < 1時，慢軸範圍會變大
+            return (geometry.fast_axis_range, geometry.slow_axis_range)
 
         except Exception as e:
             if self.debug_mode:
                 print(f"Error calculating scan dimensions: {str(e)}")
             return (None, None)
 
-    def calculate_scan_lines(self) -> tuple:
+    def calculate_scan_lines(self, geometry: ScanGeometry = None) -> tuple:
         """
         計算實際的掃描線數和間距
 
@@ -750,6 +1543,11 @@ class SXMScanControl(SXMEventHandler):
         1. 當image format變小（例如0.5）時，慢軸範圍變大，掃描線數會等比例增加
         2. 當pixel density變小（例如0.5）時，每個pixel會再分成更多條線
 
+        Parameters
+        ----------
+        geometry : ScanGeometry, optional
+            掃描幾何，未提供時以一次批次讀取獲取
+
         Returns
         -------
         tuple
@@ -757,27 +1555,14 @@ class SXMScanControl(SXMEventHandler):
             如果計算失敗則返回(None, None)
         """
         try:
-            # 取得必要參數
-            pixels = self.GetScanPara('Pixel')
-            pixel_ratio = self.get_pixel_ratio()
-            aspect_ratio = self.get_aspect_ratio()
-
-            if any(x is None for x in [pixels, pixel_ratio, aspect_ratio]):
-                return (None, None)
-
-            # 計算實際掃描範圍
-            _, slow_axis_range = self.calculate_actual_scan_dimensions()
+            if geometry is None:
+                geometry = self.get_scan_geometry()
 
             # 計算實際掃描線數
             # 1. 基礎線數等於pixel數
             # 2. 因image format改變而增加的線數：除以aspect_ratio
             # 3. 因pixel density改變而增加的線數：除以pixel_ratio
-            total_lines = int(pixels / (aspect_ratio * pixel_ratio))
-
-            # 計算線間距
-            line_spacing = slow_axis_range / total_lines if total_lines > 0 else None
-
-            return (total_lines, line_spacing)
+            return (geometry.total_lines, geometry.line_spacing)
 
         except Exception as e:
             if self.debug_mode:
@@ -3,6 +3,7 @@
 import time
 from .SXMPyScan import SXMScanControl
 from utils.KB2902BSMU import KeysightB2902B
+from utils.SXMPyTracking import AtomTracker
 
 
 class SXMSpectroControl(SXMScanControl):
@@ -11,12 +12,32 @@ class SXMSpectroControl(SXMScanControl):
     繼承掃描控制以獲得位置控制和掃描功能
     """
 
+    _DRY_RUN_STATE = SXMScanControl._DRY_RUN_STATE + ('_fb_on', 'zoffset', 'tracking_offset')
+
     def __init__(self, debug_mode=False):
         super().__init__(debug_mode)
-        self.FbOn = self.get_feedback_state()  # 回饋狀態
+        self._fb_on = None  # 回饋狀態的快取，由 FbOn 第一次讀取或暖啟動快取填入
         self.zoffset = None  # Z軸偏移量
+        self.atom_tracker = AtomTracker()
+        self.tracking_channel = 0  # 追蹤時讀取形貌高度的 SXM 通道
+        self.tracking_offset = (0.0, 0.0)  # 追蹤得到的目標偏移 (nm)，套用到後續所有位置
+        self.last_tracking_log = []
+        self.sts_log = None  # 設為 list 時記錄每個已開始的 STS 點 (x, y, 光譜檔)，由 start_sts_log 開始
+        self._sts_log_base = 0  # 開始記錄時的 spect_save_count
+        self.spect_save_timeout = 5.0  # 等待單點光譜存檔事件的時間（秒）
 
     # ========== 回饋控制功能 ========== #
+    @property
+    def FbOn(self):
+        """回饋狀態（0: 開啟, 1: 關閉），尚未讀取過時以 get_feedback_state 向儀器讀取"""
+        if self._fb_on is None:
+            self.get_feedback_state()
+        return self._fb_on
+
+    @FbOn.setter
+    def FbOn(self, value):
+        self._fb_on = value
+
     def feedback_on(self):
         """
         開啟回饋控制
@@ -111,7 +132,7 @@ class SXMSpectroControl(SXMScanControl):
         bool
             移動是否成功
         """
-        return self._send_command(f"SpectPara(1, {x});")[0]
+        return self.SetSpectPara(1, x)
     
     def move_tip_y_spectpos(self, y: float) -> bool:
         """
@@ -127,7 +148,7 @@ class SXMSpectroControl(SXMScanControl):
         bool
             移動是否成功
         """
-        return self._send_command(f"SpectPara(2, {y});")[0]
+        return self.SetSpectPara(2, y)
 
     def move_tip_for_spectro(self, x: float, y: float) -> bool:
         try:
@@ -169,28 +190,23 @@ class SXMSpectroControl(SXMScanControl):
             success = True
 
             # 設定模式
-            command = f"SpectPara(0, {mode});"
-            success &= self._send_command(command)[0]
+            success &= self.SetSpectPara(0, mode)
 
             if params:
                 # 設定點數
                 if 'points' in params:
-                    command = f"SpectPara('Points', {params['points']});"
-                    success &= self._send_command(command)[0]
+                    success &= self.SetSpectPara('Points', params['points'])
 
                 # 設定偏壓範圍
                 if 'start_bias' in params:
-                    command = f"SpectPara(7, {params['start_bias']});"
-                    success &= self._send_command(command)[0]
+                    success &= self.SetSpectPara(7, params['start_bias'])
 
                 if 'end_bias' in params:
-                    command = f"SpectPara(8, {params['end_bias']});"
-                    success &= self._send_command(command)[0]
+                    success &= self.SetSpectPara(8, params['end_bias'])
 
                 # 設定延遲
                 if 'delay' in params:
-                    command = f"SpectPara(4, {params['delay']});"
-                    success &= self._send_command(command)[0]
+                    success &= self.SetSpectPara(4, params['delay'])
 
             return success
 
@@ -233,7 +249,9 @@ class SXMSpectroControl(SXMScanControl):
             # 開始測量
             if not self.spectroscopy_start():
                 return False
-            
+
+            if self.sts_log is not None:
+                self.sts_log.append((x, y, None))
             return True
         
         except Exception as e:
@@ -243,6 +261,52 @@ class SXMSpectroControl(SXMScanControl):
             self.feedback_on()
             return False
 
+    def start_sts_log(self):
+        """開始記錄 STS 點，之後的光譜存檔事件依序對應到記錄的點"""
+        self.sts_log = []
+        self._sts_log_base = self.scan_status.spect_save_count
+
+    def wait_for_spectrum(self, timeout=None):
+        """
+        等待 sts_log 最後一點的光譜存檔事件，並將檔名記入該點
+
+        記錄開始後的第 n 個光譜存檔事件屬於第 n 個 STS 點。
+        超過 timeout 仍未到達的事件視為遺失，多出的事件視為屬於先前的點，
+        兩種情況都重新對齊計數，並將無法確定的點的檔名保持為None
+
+        Parameters
+        ----------
+        timeout : float, optional
+            等待時間（秒），預設為 spect_save_timeout
+
+        Returns
+        -------
+        str or None
+            該點的光譜檔名
+        """
+        if not self.sts_log or self._dry_run is not None:
+            return None
+        if timeout is None:
+            timeout = self.spect_save_timeout
+
+        expected = self._sts_log_base + len(self.sts_log)
+        filename = None
+        if self.wait_for_status(lambda s: s.spect_save_count >= expected, timeout):
+            with self.scan_status._lock:
+                count = self.scan_status.spect_save_count
+                if count == expected:
+                    filename = self.scan_status.last_spect_file
+            self._sts_log_base += count - expected
+        else:
+            self._sts_log_base -= 1
+
+        x, y, _ = self.sts_log[-1]
+        self.sts_log[-1] = (x, y, filename)
+        if filename is None and self.debug_mode:
+            print(f"Spectrum file for STS point {len(self.sts_log)} ({x:.3f}, {y:.3f}) "
+                  f"not identified")
+        return filename
+
     def perform_spectroscopy(self, x, y, wait_time=0.0, params=None):
         """
         在指定位置執行完整的光譜測量
@@ -267,7 +331,7 @@ class SXMSpectroControl(SXMScanControl):
                 return False
 
             # 等待穩定
-            time.sleep(wait_time)
+            self._sleep(wait_time)
 
             # 關閉回饋
             if not self.feedback_off():
@@ -286,7 +350,7 @@ class SXMSpectroControl(SXMScanControl):
             if params:
                 total_time = (params.get('points', 200) *
                               params.get('delay', 100) / 1000 + 1)
-                time.sleep(total_time)
+                self._sleep(total_time)
 
             # 重新開啟回饋
             self.feedback_on()
@@ -300,7 +364,62 @@ class SXMSpectroControl(SXMScanControl):
             self.feedback_on()
             return False
 
-    def perform_spectroscopy_sequence(self, positions, params=None):
+    # ========== 原子追蹤 ========== #
+    def read_height_at(self, x, y, dwell=None):
+        """
+        以光譜位置移動探針並讀取形貌高度，回饋需為開啟
+
+        Parameters
+        ----------
+        x, y : float
+            探測位置（nm）
+        dwell : float, optional
+            移動後讀取前的等待時間（秒），預設為 atom_tracker.dwell
+
+        Returns
+        -------
+        float or None
+            tracking_channel 的數值
+        """
+        if not self._batch_write([self._spect_command(1, x), self._spect_command(2, y)]):
+            return None
+        self._sleep(self.atom_tracker.dwell if dwell is None else dwell)
+        return self.GetChannel(self.tracking_channel)
+
+    def track_target(self, x, y, origin=None):
+        """
+        以局部梯度搜尋將目標重新對準特徵中心
+
+        Parameters
+        ----------
+        x, y : float
+            起始位置（nm）
+        origin : tuple, optional
+            計算偏移上限的基準位置，預設為起始位置
+
+        Returns
+        -------
+        tuple or None
+            特徵中心 (x, y)，失去目標時為None
+        """
+        try:
+            # 回饋狀態 0 為開啟，讀取失敗或其他值都視為關閉
+            if self.get_feedback_state() != 0 and not self.feedback_on():
+                return None
+            found = self.atom_tracker.locate(self.read_height_at, x, y, origin)
+            if self.debug_mode:
+                if found is None:
+                    print(f"Tracking lost target near ({x:.3f}, {y:.3f})")
+                else:
+                    print(f"Tracking: ({x:.3f}, {y:.3f}) -> ({found[0]:.3f}, {found[1]:.3f})")
+            return found
+
+        except Exception as e:
+            if self.debug_mode:
+                print(f"Tracking error: {str(e)}")
+            return None
+
+    def perform_spectroscopy_sequence(self, positions, params=None, track_every=0):
         """
         執行一系列位置的光譜測量
 
@@ -310,15 +429,34 @@ class SXMSpectroControl(SXMScanControl):
             測量位置列表，每個元素為(x, y)
         params : dict, optional
             測量參數
+        track_every : int, optional
+            每隔幾次量測以 atom_tracker 重新對準目標，0 表示不追蹤；
+            得到的偏移存於 tracking_offset 並套用到之後所有位置
 
         Returns
         -------
         list
             成功測量的位置索引列表
         """
+        if track_every < 0:
+            raise ValueError(f"track_every must be non-negative: {track_every}")
+
         successful_measurements = []
+        self.last_tracking_log = []
+        if track_every:
+            self.tracking_offset = (0.0, 0.0)
 
         for i, (x, y) in enumerate(positions):
+            if track_every and i % track_every == 0:
+                offset_x, offset_y = self.tracking_offset
+                found = self.track_target(x + offset_x, y + offset_y)
+                if found is not None:
+                    self.tracking_offset = (found[0] - x, found[1] - y)
+                self.last_tracking_log.append((i, time.monotonic(), found is not None,
+                                               self.tracking_offset))
+
+            offset_x, offset_y = self.tracking_offset if track_every else (0.0, 0.0)
+            x, y = x + offset_x, y + offset_y
             if self.debug_mode:
                 print(f"Measuring position {i+1}/{len(positions)}: ({x}, {y})")
 
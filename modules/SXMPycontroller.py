@@ -1,4 +1,7 @@
 from modules.SXMPyCITS import SXMCITSControl
+from modules.SXMPyBase import supports_dry_run
+from utils.SXMPyCalc import ScanGeometry
+from utils.SXMPyStateCache import StateCache
 from utils.logger import track_function
 
 
@@ -17,6 +20,53 @@ class SXMController(SXMCITSControl):
         from modules.SXMSTSController import STSController
         self.sts_controller = STSController(self, smu_controller)
 
+    # ========== 暖啟動狀態 ========== #
+    def load_warm_state(self, cache: StateCache):
+        """
+        以快取的最後已知狀態預先填入控制器，不存取硬體
+
+        Parameters
+        ----------
+        cache : StateCache
+            狀態快取
+        """
+        self.state_cache = cache
+
+        geometry = cache.get_geometry()
+        if geometry is not None:
+            self._apply_geometry(geometry)
+
+        self.spect_state.update(cache.get_spect_state())
+
+        if self._fb_on is None:
+            self.FbOn = cache.get_feedback_state()
+
+    def refresh_warm_state(self) -> ScanGeometry:
+        """
+        以一次批次讀取重新驗證掃描幾何與回饋狀態，並寫回快取
+
+        Returns
+        -------
+        ScanGeometry
+            目前的掃描幾何
+        """
+        items = [('GetScanPara', p) for p in ScanGeometry.SCAN_PARAM_FIELDS]
+        items.append(('GetFeedPara', 'Enable'))
+        values = self._batch_read(items)
+
+        geometry = ScanGeometry.from_scan_params(
+            {p: values.get(('GetScanPara', p)) for p in ScanGeometry.SCAN_PARAM_FIELDS})
+        self._apply_geometry(geometry)
+        self.FbOn = values.get(('GetFeedPara', 'Enable'))
+
+        if self.state_cache is not None:
+            self.state_cache.set_geometry(geometry)
+            self.state_cache.set_feedback_state(self.FbOn)
+            self.state_cache.set_spect_state(self.spect_state)
+            self.state_cache.save()
+
+        return geometry
+
     @track_function
     def initialize_system(self):
         try:
@@ -41,8 +91,11 @@ class SXMController(SXMCITSControl):
             print(f"Shutdown Error: {str(e)}")
 
     @track_function
-    def auto_move_scan_area(self, movement_script: str, distance: float,
-                            wait_time: float, repeat_count: int = 1) -> bool:
+    @supports_dry_run
+    def auto_move_scan_area(self, movement_script: str, distance,
+                            wait_time: float, repeat_count: int = 1,
+                            optimize_route: bool = False, route_precedence=(),
+                            adaptive_settle: bool = False, strict: bool = False) -> bool:
         try:
             print(
                 f"Starting auto move scan:\n"
@@ -52,7 +105,8 @@ class SXMController(SXMCITSControl):
                 f"Repeat count: {repeat_count}"
             )
             return super().auto_move_scan_area(
-                movement_script, distance, wait_time, repeat_count
+                movement_script, distance, wait_time, repeat_count,
+                optimize_route, route_precedence, adaptive_settle, strict
             )
         except Exception as e:
             print(f"Auto move scan error: {str(e)}")
@@ -580,6 +580,35 @@ def loop():
     # print ("end loop")
 
 
+def pump(max_messages=100):
+    """
+    Dispatch pending windows messages without blocking.
+    DDE advise callbacks are only delivered while messages are dispatched.
+    Returns the number of dispatched messages.
+    """
+    from ctypes import POINTER, byref, c_ulong
+    from ctypes.wintypes import BOOL, HWND, MSG, UINT
+
+    LPMSG = POINTER(MSG)
+    LRESULT = c_ulong
+    PeekMessage = get_winfunc("user32", "PeekMessageW",
+                              BOOL, (LPMSG, HWND, UINT, UINT, UINT))
+    TranslateMessage = get_winfunc(
+        "user32", "TranslateMessage", BOOL, (LPMSG,))
+    DispatchMessage = get_winfunc(
+        "user32", "DispatchMessageW", LRESULT, (LPMSG,))
+
+    PM_REMOVE = 0x0001
+    msg = MSG()
+    lpmsg = byref(msg)
+    count = 0
+    while count < max_messages and PeekMessage(lpmsg, HWND(), 0, 0, PM_REMOVE):
+        TranslateMessage(lpmsg)
+        DispatchMessage(lpmsg)
+        count += 1
+    return count
+
+
 # Do not execute here. Otherwise the class will be instantiated twice
 # and functins will run twice (25/01/21)
 # MySXM = SXMRemote.DDEClient("SXM","Remote");
@@ -0,0 +1,126 @@
+"""
+Line Sync Replay
+
+以錄製或合成的 Collect 資料串流測試 Line Sync 計數與觸發延遲，不需要連接儀器：
+1. 以 CollectReplay 依取樣頻率播放資料
+2. 以 LineSyncCounter.wait_for 等待各個目標行，記錄觸發時的計數與延遲
+3. executor 模式以 DryRunClient 取代 DDE 客戶端、以 ReplayReaderFactory 取代 CollectReader，
+   執行 _run_cits_line_sync，STS 線期間暫停播放以模擬 SXM 暫停掃描；
+   加上 nopause 時不暫停，檢查執行器會偵測到掃描在 STS 期間前進
+
+執行方式：
+    python test/line_sync_replay.py                      # 合成 64 行
+    python test/line_sync_replay.py recorded.bin 10000   # 錄製的 ReadFile 原始資料與取樣頻率
+    python test/line_sync_replay.py executor [nopause]   # 以合成資料執行 Line Sync CITS 執行器
+
+executor 模式仍需處理 Windows 消息，須在儀器電腦上執行
+"""
+
+import sys
+import time
+from pathlib import Path
+
+# 添加專案根目錄到系統路徑
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from utils.SXMPyCollect import (CollectReplay, LineSyncCounter, ReplayReaderFactory,
+                                COLLECT_LINE_SYNC, decode_collect, encode_collect,
+                                synthetic_line_sync)
+
+
+def run_executor(pause=True):
+    """以合成資料串流執行 _run_cits_line_sync"""
+    from modules.SXMPyCITS import SXMCITSControl
+    from utils.SXMPyCalc import ScanGeometry, ScanTimingModel
+    from utils.SXMPyDryRun import DryRunClient
+
+    scan = {'Pixel': 32, 'Range': 100.0, 'X': 0.0, 'Y': 0.0, 'Angle': 0.0,
+            'PixelRatio': 1.0, 'AspectRatio': 1.0,
+            'Speed': 20.0, 'Scan': 0}
+    feedback = {'Enable': 1, 'ZOffset': 0.0, 'ZOffsetSlew': 1.0}
+
+    class ReplayController(SXMCITSControl):
+        """以 DryRunClient 作為客戶端、STS 點只等待不量測的控制器"""
+
+        @staticmethod
+        def client_factory():
+            return DryRunClient(scan, feedback, ScanTimingModel())
+
+        def simple_spectroscopy(self, x, y):
+            return True
+
+        def _run_sts_row(self, sts_line, row_index, num_rows):
+            replay = factory.replay
+            if pause:
+                replay.pause()
+            try:
+                super()._run_sts_row(sts_line, row_index, num_rows)
+            finally:
+                replay.resume()
+
+    controller = ReplayController()
+
+    def finish():
+        # 影像播放完畢時模擬 SXM 的 Scan off
+        controller.MySXM.scan['Scan'] = 0
+        controller._handle_scan_off()
+
+    geometry = ScanGeometry.from_scan_params(scan)
+    freq = 10000.0
+    factory = ReplayReaderFactory(
+        encode_collect(synthetic_line_sync(geometry.total_lines, 100), COLLECT_LINE_SYNC),
+        freq=freq, on_finish=finish)
+    controller.collect_reader_factory = factory
+
+    scanlines = [8, 8, 8, 8]
+    coordinates = [[(0.0, float(i))] for i in range(len(scanlines) - 1)]
+    print(f"Executor: {geometry.total_lines} lines, STS after lines "
+          f"{controller.plan_line_sync_targets(scanlines)}, pause={pause}")
+    try:
+        controller._run_cits_line_sync(coordinates, scanlines, geometry,
+                                       geometry.total_lines * 100 / freq)
+        print("completed")
+    except RuntimeError as e:
+        print(f"aborted: {e}")
+    for key, value in controller.last_line_sync_report.items():
+        print(f"  {key}: {value}")
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == 'executor':
+        run_executor(pause='nopause' not in sys.argv[2:])
+        return
+
+    if len(sys.argv) > 1:
+        stream = Path(sys.argv[1]).read_bytes()
+        freq = float(sys.argv[2]) if len(sys.argv) > 2 else 10000.0
+    else:
+        freq = 10000.0
+        stream = encode_collect(synthetic_line_sync(64, 200), COLLECT_LINE_SYNC)
+
+    # 先離線計算總行數，作為目標的上限
+    reference = LineSyncCounter()
+    reference.feed(decode_collect(stream, [COLLECT_LINE_SYNC]))
+    total = reference.count
+    print(f"Stream: {len(stream) // 4:,} samples, {total} line sync edges")
+
+    counter = LineSyncCounter()
+    replay = CollectReplay(stream, counter.feed, channels=[COLLECT_LINE_SYNC], freq=freq)
+    targets = list(range(1, total + 1, max(total // 8, 1)))
+
+    replay.start()
+    try:
+        for target in targets:
+            if not counter.wait_for(target, timeout=5.0):
+                print(f"line {target:4d}: timeout")
+                break
+            latency = (time.monotonic() - counter.last_edge_time) * 1000
+            print(f"line {target:4d}: triggered at count {counter.count:4d}, "
+                  f"latency {latency:6.2f} ms")
+    finally:
+        replay.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+AtomTracker 的行為測試（合成表面，不需要儀器）
+
+執行方式：
+    python -m pytest -q test/test_atom_tracker.py
+"""
+
+import math
+import sys
+from pathlib import Path
+
+import pytest
+
+# 添加專案根目錄到系統路徑
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from utils.SXMPyTracking import AtomTracker
+
+
+def gaussian(cx, cy, height=0.1, width=0.15):
+    """中心在 (cx, cy) 的高斯特徵，height 為負時為凹陷"""
+    def probe(x, y):
+        return height * math.exp(-((x - cx) ** 2 + (y - cy) ** 2) / (2 * width ** 2))
+    return probe
+
+
+def test_locates_atom_centre_from_nearby_start():
+    tracker = AtomTracker(radius=0.1, iterations=5)
+    found = tracker.locate(gaussian(1.04, -0.03), 1.0, 0.0)
+    assert found == pytest.approx((1.04, -0.03), abs=0.01)
+
+
+def test_locates_defect_minimum():
+    tracker = AtomTracker(radius=0.1, iterations=5, feature='min')
+    found = tracker.locate(gaussian(0.05, 0.02, height=-0.1), 0.0, 0.0)
+    assert found == pytest.approx((0.05, 0.02), abs=0.01)
+
+
+def test_target_beyond_max_offset_is_lost():
+    # 特徵在 3 nm 外，持續往上坡移動直到超過 max_offset
+    tracker = AtomTracker(radius=0.5, iterations=10, max_offset=1.0)
+    assert tracker.locate(gaussian(3.0, 0.0, width=1.5), 0.0, 0.0) is None
+
+
+def test_failed_height_reading_loses_target():
+    tracker = AtomTracker()
+    assert tracker.locate(lambda x, y: None, 0.0, 0.0) is None
+    assert tracker.locate(lambda x, y: float('nan'), 0.0, 0.0) is None
+
+
+def test_flat_surface_keeps_position():
+    tracker = AtomTracker()
+    assert tracker.locate(lambda x, y: 0.0, 0.3, 0.4) == (0.3, 0.4)
+
+
+def test_invalid_settings_are_rejected():
+    with pytest.raises(ValueError):
+        AtomTracker(radius=0.0)
+    with pytest.raises(ValueError):
+        AtomTracker(feature='edge')
+    with pytest.raises(ValueError):
+        AtomTracker(iterations=0)
@@ -0,0 +1,86 @@
+"""
+CITSCube 的行為測試
+
+執行方式：
+    python -m pytest -q test/test_cits_cube.py
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# 添加專案根目錄到系統路徑
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from utils.SXMPyCalc import CITSCube, ScanGeometry
+from utils.SXMPyTransform import FrameTransform
+
+
+def make_cube(angle=30.0, speed=None):
+    """中心 (5, -5)、原點在掃描座標 (-40, -40)、半格 10 nm 的 5x5 格點"""
+    geometry = ScanGeometry(5.0, -5.0, 100.0, angle, 64, speed=speed)
+    return CITSCube(geometry, (-40.0, -40.0), (10.0, 10.0), (5, 5))
+
+
+def sample_points(cube, window_points):
+    """掃描座標轉換為樣品座標"""
+    return FrameTransform.to_sample_frame(
+        np.asarray(window_points, dtype=float),
+        cube.geometry.center_x, cube.geometry.center_y, cube.geometry.angle)
+
+
+def test_points_land_on_their_lattice_nodes():
+    cube = make_cube()
+    up = sample_points(cube, [(-40.0, -40.0), (-20.0, -40.0), (-40.0, -20.0)])
+    down = sample_points(cube, [(-30.0, -30.0), (-10.0, -30.0)])
+
+    assert cube.add(up, 1, ['a.VERT', 'b.VERT', None]) == 3
+    assert cube.add(down, -1) == 2
+
+    assert cube.num_points == 5
+    assert cube.direction[0, 0] == 1 and cube.direction[1, 1] == -1
+    assert cube.direction[1, 3] == -1
+    np.testing.assert_allclose(cube.positions[0, 2], up[1])
+    # 量測順序跨兩組連續編號
+    assert cube.order[0, 0] == 0 and cube.order[2, 0] == 2
+    assert cube.order[1, 1] == 3 and cube.order[1, 3] == 4
+    assert cube.files[0, 2] == 'b.VERT'
+    assert cube.files[2, 0] is None and cube.files[1, 1] is None
+    assert np.isnan(cube.positions[4, 4]).all()
+
+
+def test_points_off_the_lattice_are_skipped_with_their_files():
+    cube = make_cube(angle=0.0)
+    points = sample_points(cube, [(-35.0, -40.0), (500.0, 0.0), (0.0, 0.0)])
+    assert cube.add(points, 1, ['off.VERT', 'outside.VERT', 'centre.VERT']) == 1
+    assert cube.files[4, 4] == 'centre.VERT'
+    assert cube.add([], 1) == 0
+
+
+def test_save_and_load_round_trip(tmp_path):
+    cube = make_cube(speed=None)
+    cube.add(sample_points(cube, [(-40.0, -40.0), (0.0, 0.0)]), 1, ['a.VERT', None])
+    cube.add(sample_points(cube, [(-30.0, -30.0)]), -1, ['b.VERT'])
+
+    path = cube.save(str(tmp_path / "cube"))
+    assert path.endswith('.npz')
+    loaded = CITSCube.load(path)
+
+    assert loaded.geometry == cube.geometry
+    assert loaded.geometry.speed is None
+    assert loaded.origin == cube.origin
+    assert loaded.step == cube.step
+    assert loaded.shape == cube.shape
+    np.testing.assert_array_equal(loaded.positions, cube.positions)
+    np.testing.assert_array_equal(loaded.direction, cube.direction)
+    np.testing.assert_array_equal(loaded.order, cube.order)
+    assert loaded.files.tolist() == cube.files.tolist()
+
+
+def test_save_keeps_scan_speed(tmp_path):
+    cube = make_cube(speed=4.0)
+    loaded = CITSCube.load(cube.save(str(tmp_path / "cube.npz")))
+    assert loaded.geometry.speed == 4.0
+    assert loaded.num_points == 0
@@ -0,0 +1,60 @@
+"""
+CreepModel 的行為測試
+
+執行方式：
+    python -m pytest -q test/test_creep_model.py
+"""
+
+import math
+import sys
+from pathlib import Path
+
+import pytest
+
+# 添加專案根目錄到系統路徑
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from utils.SXMPyCalc import CreepModel
+
+
+def mean_rate(gamma, thermal, distance, start, end):
+    """對數蠕變在兩個時間點之間的平均漂移速率"""
+    return thermal + gamma * distance * math.log10(end / start) / (end - start)
+
+
+def test_settle_time_grows_with_distance_and_is_clamped():
+    model = CreepModel(gamma=0.01, drift_tolerance=0.05, min_wait=0.1, max_wait=120.0)
+    assert model.settle_time(0.0) == 0.1
+    assert model.settle_time(1000.0) == pytest.approx(0.01 * 1000 / (0.05 * math.log(10)))
+    assert model.settle_time(-1000.0) == model.settle_time(1000.0)
+    assert model.settle_time(1e9) == 120.0
+
+
+def test_fits_gamma_and_thermal_drift_from_frame_pairs():
+    model = CreepModel(gamma=0.001)
+    for distance, start, end in [(500, 60, 120), (2000, 60, 120), (1000, 120, 180),
+                                 (3000, 30, 90), (800, 200, 260)]:
+        model.observe(distance, start, end, mean_rate(0.02, 0.003, distance, start, end))
+
+    assert model.num_observations == 5
+    assert model.gamma == pytest.approx(0.02, rel=1e-6)
+    assert model.thermal_drift == pytest.approx(0.003, rel=1e-6)
+    # 較大的 gamma 使等待時間變長
+    assert model.settle_time(1000.0) > CreepModel(gamma=0.001).settle_time(1000.0)
+
+
+def test_single_observation_scales_gamma():
+    model = CreepModel(gamma=0.001)
+    model.observe(1000, 60, 120, mean_rate(0.02, 0.0, 1000, 60, 120))
+    assert model.gamma == pytest.approx(0.02)
+
+
+def test_invalid_observations_are_ignored():
+    model = CreepModel(gamma=0.01)
+    model.observe(0.0, 60, 120, 1.0)
+    model.observe(1000, 0, 120, 1.0)
+    model.observe(1000, 120, 60, 1.0)
+    model.observe(1000, 60, 120, math.nan)
+    assert model.num_observations == 0
+    assert model.gamma == 0.01
@@ -0,0 +1,76 @@
+"""
+DriftEstimator 的行為測試
+
+執行方式：
+    python -m pytest -q test/test_drift_estimator.py
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# 添加專案根目錄到系統路徑
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from utils.SXMPyCalc import ScanGeometry
+from utils.SXMPyDrift import DriftEstimator, phase_correlation
+
+
+def surface(shift_x=0.0, shift_y=0.0, size=64, seed=1):
+    """隨機高斯凸起組成的形貌，內容往 +x/+y 移動 shift 像素"""
+    y, x = np.mgrid[0:size, 0:size].astype(float)
+    rng = np.random.default_rng(seed)
+    z = np.zeros((size, size))
+    for cx, cy in rng.uniform(0, size, (40, 2)):
+        z += np.exp(-((x - cx - shift_x) ** 2 + (y - cy - shift_y) ** 2) / 6)
+    return z
+
+
+def geometry(center_x=0.0, center_y=0.0, angle=0.0, scan_range=64.0):
+    return ScanGeometry(center_x, center_y, scan_range, angle, 64)
+
+
+def test_phase_correlation_finds_subpixel_shift():
+    shift_row, shift_col, peak = phase_correlation(surface(), surface(2.5, -1.0))
+    assert shift_col == pytest.approx(2.5, abs=0.2)
+    assert shift_row == pytest.approx(-1.0, abs=0.2)
+    assert peak > 0.5
+
+
+def test_velocity_from_shifted_frames():
+    estimator = DriftEstimator()
+    assert estimator.add_frame(surface(), geometry(), 0.0) is None
+
+    velocity = estimator.add_frame(surface(3.0, 1.0), geometry(), 10.0)
+    # 1 nm/pixel，10 秒移動 (3, 1) nm
+    np.testing.assert_allclose(velocity, [0.3, 0.1], atol=0.02)
+    assert estimator.last_interval == (0.0, 10.0)
+
+
+def test_scan_center_move_is_subtracted():
+    estimator = DriftEstimator()
+    estimator.add_frame(surface(), geometry(), 0.0)
+    # 視窗往 +x 移動 4 nm，沒有漂移時影像內容往 -x 移動 4 pixel
+    velocity = estimator.add_frame(surface(-4.0), geometry(center_x=4.0), 10.0)
+    np.testing.assert_allclose(velocity, [0.0, 0.0], atol=0.02)
+
+
+def test_incompatible_or_unreliable_frames_give_no_estimate():
+    estimator = DriftEstimator()
+    estimator.add_frame(surface(), geometry(), 0.0)
+    assert estimator.add_frame(surface(1.0), geometry(scan_range=128.0), 10.0) is None
+    # 新的幾何成為參考，但時間沒有前進
+    assert estimator.add_frame(surface(1.0), geometry(scan_range=128.0), 10.0) is None
+
+    # 不相關的雜訊影像沒有明確的相關峰值
+    rng = np.random.default_rng(0)
+    estimator = DriftEstimator(min_peak=0.2)
+    estimator.add_frame(rng.normal(size=(64, 64)), geometry(), 0.0)
+    assert estimator.add_frame(rng.normal(size=(64, 64)), geometry(), 10.0) is None
+    assert estimator.last_peak < 0.2
+
+    estimator.reset()
+    assert estimator.add_frame(np.full((64, 64), np.nan), geometry(), 0.0) is None
@@ -0,0 +1,89 @@
+"""
+dry run 的行為測試：起始狀態取自狀態快取或呼叫者提供的快照，不對儀器送出任何命令
+
+modules 依賴 Windows 的 DDE（ctypes.WINFUNCTYPE），其他平台上略過。
+
+執行方式：
+    python -m pytest -q test/test_dry_run.py
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# 添加專案根目錄到系統路徑
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.append(str(ROOT_DIR))
+
+try:
+    from modules import SXMRemote
+    from modules.SXMPyBase import InstrumentSnapshot
+    from modules.SXMPycontroller import SXMController
+except ImportError:
+    pytest.skip("modules require the Windows DDE API", allow_module_level=True)
+
+from utils.SXMPyCalc import ScanGeometry
+from utils.SXMPyStateCache import StateCache
+
+
+class RecordingClient:
+    """記錄所有DDE程式的客戶端，dry run 期間不應被呼叫"""
+
+    def __init__(self, *args):
+        self.commands = []
+        self.LastAnswer = b''
+        self.NotGotAnswer = False
+
+    def SendWait(self, command):
+        self.commands.append(command)
+
+
+@pytest.fixture
+def controller(monkeypatch):
+    monkeypatch.setattr(SXMRemote, 'DDEClient', RecordingClient)
+    stm = SXMController()
+    yield stm
+    stm.stop_monitoring()
+
+
+def test_dry_run_starts_from_state_cache(controller, tmp_path):
+    cache = StateCache(str(tmp_path / "state.json"))
+    cache.set_geometry(ScanGeometry(10.0, -10.0, 100.0, 0.0, 64, 1.0, 1.0, 4.0))
+    cache.set_feedback_state(0)
+    controller.load_warm_state(cache)
+    client = controller.MySXM
+
+    report = controller.standard_cits(3, 4, 1, dry_run=True)
+
+    assert client.commands == []
+    assert controller.MySXM is client
+    assert not controller.dry_running
+    assert report['success']
+    assert report['sts_points'] == 12
+    assert report['scan_lines'] == 64
+    assert report['scan_time'] > 0
+
+
+def test_dry_run_uses_caller_state(controller):
+    client = controller.MySXM
+    state = InstrumentSnapshot(
+        scan={'X': 0.0, 'Y': 0.0, 'Range': 100.0, 'Angle': 0.0, 'Pixel': 32,
+              'PixelRatio': 1.0, 'AspectRatio': 1.0, 'Speed': 2.0},
+        feedback={'Enable': 0})
+
+    report = controller.auto_move_scan_area("RU", 20.0, 1.0, dry_run=True,
+                                            dry_run_state=state)
+
+    assert client.commands == []
+    assert report['success']
+    assert report['moves'] == 2
+    assert report['frames'] == 3
+    # 控制器狀態在 dry run 後還原
+    assert controller.current_state['range'] is None
+
+
+def test_dry_run_without_cached_geometry_is_rejected(controller):
+    with pytest.raises(ValueError):
+        controller.standard_cits(3, 4, 1, dry_run=True)
+    assert controller.MySXM.commands == []
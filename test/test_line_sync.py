@@ -0,0 +1,132 @@
+"""
+Line Sync CITS 執行器的離線重播測試
+
+以 DryRunClient 取代 DDE 客戶端、以 ReplayReaderFactory 播放合成的 Line Sync 資料，
+執行 _run_cits_line_sync：STS 線期間暫停播放時應在每個目標行觸發；
+不暫停時應偵測到掃描在 STS 期間前進並中止。
+
+modules 依賴 Windows 的 DDE（ctypes.WINFUNCTYPE），其他平台上略過。
+
+執行方式：
+    python -m pytest -q test/test_line_sync.py
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# 添加專案根目錄到系統路徑
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.append(str(ROOT_DIR))
+
+try:
+    from modules.SXMPyCITS import SXMCITSControl
+except ImportError:
+    pytest.skip("modules require the Windows DDE API", allow_module_level=True)
+
+from utils.SXMPyCalc import ScanGeometry, ScanTimingModel
+from utils.SXMPyCollect import (LineSyncCounter, ReplayReaderFactory, COLLECT_LINE_SYNC,
+                                decode_collect, encode_collect, synthetic_line_sync)
+from utils.SXMPyDryRun import DryRunClient
+
+SCAN = {'Pixel': 32, 'Range': 100.0, 'X': 0.0, 'Y': 0.0, 'Angle': 0.0,
+        'PixelRatio': 1.0, 'AspectRatio': 1.0, 'Speed': 20.0, 'Scan': 0}
+FEEDBACK = {'Enable': 1, 'ZOffset': 0.0, 'ZOffsetSlew': 1.0}
+FREQ = 10000.0
+SAMPLES_PER_LINE = 100
+
+
+def run_executor(pause, sts_duration=0.0):
+    """
+    執行 _run_cits_line_sync
+
+    Returns
+    -------
+    tuple
+        (控制器, 執行器拋出的 RuntimeError 或 None, 各 STS 線執行的次數)
+    """
+    rows = []
+
+    class ReplayController(SXMCITSControl):
+        """以 DryRunClient 作為客戶端、STS 點不量測的控制器"""
+
+        @staticmethod
+        def client_factory():
+            return DryRunClient(dict(SCAN), dict(FEEDBACK), ScanTimingModel())
+
+        def simple_spectroscopy(self, x, y):
+            return True
+
+        def _sleep(self, seconds):
+            pass
+
+        def _run_sts_row(self, sts_line, row_index, num_rows):
+            replay = factory.replay
+            if pause:
+                replay.pause()
+            try:
+                rows.append(row_index)
+                time.sleep(sts_duration)
+                return super()._run_sts_row(sts_line, row_index, num_rows)
+            finally:
+                replay.resume()
+
+    controller = ReplayController()
+
+    def finish():
+        # 影像播放完畢時模擬 SXM 的 Scan off
+        controller.MySXM.scan['Scan'] = 0
+        controller._handle_scan_off()
+
+    geometry = ScanGeometry.from_scan_params(SCAN)
+    factory = ReplayReaderFactory(
+        encode_collect(synthetic_line_sync(geometry.total_lines, SAMPLES_PER_LINE),
+                       COLLECT_LINE_SYNC),
+        freq=FREQ, on_finish=finish)
+    controller.collect_reader_factory = factory
+
+    scanlines = [8, 8, 8, 8]
+    coordinates = [[(0.0, float(i))] for i in range(len(scanlines) - 1)]
+    error = None
+    try:
+        controller._run_cits_line_sync(coordinates, scanlines, geometry,
+                                       geometry.total_lines * SAMPLES_PER_LINE / FREQ)
+    except RuntimeError as e:
+        error = e
+    finally:
+        controller.stop_monitoring()
+    return controller, error, rows
+
+
+def test_counter_counts_every_synthetic_line():
+    counter = LineSyncCounter()
+    counter.feed(decode_collect(encode_collect(synthetic_line_sync(32, SAMPLES_PER_LINE),
+                                               COLLECT_LINE_SYNC), [COLLECT_LINE_SYNC]))
+    assert counter.count == 32
+
+
+def test_sts_rows_trigger_at_their_target_lines_when_raster_pauses():
+    controller, error, rows = run_executor(pause=True, sts_duration=0.05)
+    report = controller.last_line_sync_report
+
+    assert error is None
+    assert rows == [0, 1, 2]
+    assert len(report['triggered']) == len(report['targets']) == 3
+    assert all(t >= target for t, target in zip(report['triggered'], report['targets']))
+    assert report['max_lag'] <= 2
+    assert report['raster_paused']
+    assert not controller.scan_status.is_scanning
+
+
+def test_executor_aborts_when_raster_keeps_running():
+    # 約 5 行的 STS 時間內掃描沒有暫停
+    controller, error, rows = run_executor(pause=False, sts_duration=0.05)
+    report = controller.last_line_sync_report
+
+    assert error is not None
+    assert rows == [0]
+    assert report['row_advance'][0] > controller.LINE_SYNC_ROW_TOLERANCE
+    assert not report['raster_paused']
+    assert not controller.scan_status.is_scanning
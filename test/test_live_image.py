@@ -0,0 +1,101 @@
+"""
+LiveImageBuilder 的行為測試
+
+執行方式：
+    python -m pytest -q test/test_live_image.py
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# 添加專案根目錄到系統路徑
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from utils.SXMPyCalc import ScanGeometry
+from utils.SXMPyCollect import COLLECT_Z_FAST
+from utils.SXMPyLiveImage import LiveImageBuilder
+
+
+def make_builder(pixels=8):
+    return LiveImageBuilder(ScanGeometry(0.0, 0.0, 100.0, 0.0, pixels))
+
+
+def scan_line(builder, line_number, direction='up', samples=None):
+    """送出一個 ScanLine 事件並加入該行的樣本"""
+    builder.on_scan_line({'line_number': line_number, 'direction': direction})
+    if samples is not None:
+        builder.feed({COLLECT_Z_FAST: np.asarray(samples, dtype=float)})
+
+
+def test_rows_are_filled_at_line_boundaries():
+    builder = make_builder()
+    updates = []
+    builder.subscribe(lambda row_index, row, direction: updates.append((row_index, direction)))
+
+    scan_line(builder, 1, samples=np.linspace(0, 7, 16))
+    assert not builder.filled.any()
+    scan_line(builder, 2, samples=np.full(10, 3.0))
+    builder.on_scan_off()
+
+    assert updates == [(0, 'up'), (1, 'up')]
+    np.testing.assert_allclose(builder.frame[0], np.arange(8))
+    np.testing.assert_allclose(builder.frame[1], 3.0)
+    assert np.isnan(builder.frame[2:]).all()
+    assert builder.progress == 2 / 8
+    assert builder.missed_lines == 0
+
+
+def test_down_frame_is_flipped():
+    builder = make_builder()
+    scan_line(builder, 8, 'down', samples=[1.0, 1.0])
+    scan_line(builder, 7, 'down', samples=[2.0, 2.0])
+    builder.on_scan_off()
+    np.testing.assert_allclose(builder.frame[0], 1.0)
+    np.testing.assert_allclose(builder.frame[1], 2.0)
+    assert builder.missed_lines == 0
+
+
+def test_skipped_line_numbers_are_counted_and_merged_samples_dropped():
+    builder = make_builder()
+    scan_line(builder, 1, samples=[1.0, 1.0])
+    # 第 2、3 行的事件遺失，第 1 行累積的樣本跨越多行
+    scan_line(builder, 4, samples=[4.0, 4.0])
+    builder.on_scan_off()
+    assert not builder.filled[0]
+    assert builder.filled[3]
+    assert builder.missed_lines == 3
+
+    # 行號遞減時同樣偵測
+    builder = make_builder()
+    scan_line(builder, 8, 'down', samples=[1.0, 1.0])
+    scan_line(builder, 5, 'down', samples=[1.0, 1.0])
+    assert builder.missed_lines == 3
+
+
+def test_other_directions_and_short_lines_are_not_written():
+    builder = make_builder()
+    scan_line(builder, 1, 'backward', samples=[1.0, 2.0, 3.0])
+    scan_line(builder, 2, 'forward', samples=[1.0])
+    builder.on_scan_off()
+    assert not builder.filled.any()
+    assert builder.missed_lines == 1
+
+
+def test_samples_before_the_first_line_are_ignored():
+    builder = make_builder()
+    builder.feed({COLLECT_Z_FAST: np.ones(20)})
+    scan_line(builder, 1, samples=[5.0, 5.0])
+    builder.on_scan_off()
+    np.testing.assert_allclose(builder.frame[0], 5.0)
+
+
+def test_set_row_resamples_and_snapshot_is_a_copy():
+    builder = make_builder(pixels=4)
+    builder.set_row(2, [0.0, 3.0])
+    np.testing.assert_allclose(builder.frame[2], [0.0, 1.0, 2.0, 3.0])
+    frame = builder.snapshot()
+    frame[2] = 0
+    assert builder.frame[2, 3] == 3.0
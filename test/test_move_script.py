@@ -0,0 +1,76 @@
+"""
+MoveScript 的行為測試
+
+執行方式：
+    python -m pytest -q test/test_move_script.py
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# 添加專案根目錄到系統路徑
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from utils.SXMPyTransform import MoveScript
+
+
+def test_plain_scripts_are_unchanged():
+    assert MoveScript.expand("RULLDDRR") == "RULLDDRR"
+    assert MoveScript.expand("ruld") == "RULD"
+    assert MoveScript.expand(['R', 'U']) == "RU"
+    assert MoveScript.expand("") == ""
+
+
+def test_counts_and_separators():
+    assert MoveScript.expand("3R 2U, L") == "RRRUUL"
+    assert MoveScript.expand("10r") == "R" * 10
+
+
+def test_groups_repeat():
+    assert MoveScript.expand("(10R U 10L U)x10") == ("R" * 10 + "U" + "L" * 10 + "U") * 10
+    assert MoveScript.expand("3(RU)") == "RURURU"
+    assert MoveScript.expand("2(R (U)x2)") == "RUURUU"
+    assert MoveScript.expand("Rx3 U") == "RRRU"
+
+
+def test_serpentine_visits_every_position_once():
+    script = MoveScript.expand("S20x20")
+    assert len(script) == 20 * 20 - 1
+    assert script.startswith("R" * 19 + "U" + "L" * 19 + "U")
+    assert script.count("U") == 19
+
+    assert MoveScript.expand("S3x2:LD") == "LLDRR"
+    assert MoveScript.expand("S1x3") == "UU"
+
+
+def test_compiled_codes_are_read_only():
+    codes = MoveScript.compile("(RU)x2")
+    assert len(codes) == 4
+    with pytest.raises(ValueError):
+        codes[0] = ord('L')
+
+
+@pytest.mark.parametrize("script", [
+    "RX",          # 未知方向
+    "(RU",         # 缺少 ')'
+    "RU)",         # 缺少 '('
+    "3",           # 次數後沒有方向
+    "2S3x3",       # 蛇形前不能有次數
+    "x3",          # 重複前沒有片段
+    "S3x3:RL",     # 蛇形的兩個方向必須垂直
+    "S0x3",        # 蛇形大小不合法
+])
+def test_invalid_scripts_raise_value_error(script):
+    with pytest.raises(ValueError):
+        MoveScript.compile(script)
+
+
+def test_expansion_limit(monkeypatch):
+    monkeypatch.setattr(MoveScript, 'max_steps', 100)
+    MoveScript._compile.cache_clear()
+    with pytest.raises(ValueError):
+        MoveScript.compile("(10R)x11")
+    MoveScript._compile.cache_clear()
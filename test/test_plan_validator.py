@@ -0,0 +1,71 @@
+"""
+PlanValidator 的行為測試
+
+執行方式：
+    python -m pytest -q test/test_plan_validator.py
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# 添加專案根目錄到系統路徑
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from utils.SXMPyCalc import PlanValidator
+
+
+def test_points_inside_window_are_valid():
+    points = np.array([[-40.0, -40.0], [0.0, 0.0], [40.0, 40.0]])
+    result = PlanValidator.validate_points(points, 0.0, 0.0, 100.0)
+    assert result.valid
+    assert result.num_points == 3
+    result.raise_if_invalid()
+
+
+def test_reports_every_kind_of_violation():
+    points = np.array([[0.0, 0.0], [np.nan, 0.0], [9000.0, 0.0], [60.0, 0.0]])
+    result = PlanValidator.validate_points(points, 0.0, 0.0, 100.0)
+    assert not result.valid
+    assert result.invalid_values.tolist() == [1]
+    assert result.out_of_limits.tolist() == [2]
+    assert result.out_of_window.tolist() == [2, 3]
+    with pytest.raises(ValueError, match="outside the current scan window"):
+        result.raise_if_invalid()
+
+
+def test_window_follows_angle_and_aspect_ratio():
+    # 旋轉 90 度後快軸沿 Y；長寬比 2 時慢軸只有 50 nm
+    inside = PlanValidator.validate_points([[0.0, 45.0]], 0.0, 0.0, 100.0, angle=90.0)
+    assert inside.valid
+    outside = PlanValidator.validate_points([[0.0, 30.0]], 0.0, 0.0, 100.0, aspect_ratio=2.0)
+    assert outside.out_of_window.tolist() == [0]
+
+
+def test_window_is_skipped_without_scan_center():
+    result = PlanValidator.validate_points([[500.0, 500.0]])
+    assert result.valid
+
+
+def test_scan_centers_check_the_whole_window():
+    centers = [(0.0, 0.0), (7990.0, 0.0), (np.inf, 0.0)]
+    result = PlanValidator.validate_scan_centers(centers, 100.0)
+    assert result.out_of_limits.tolist() == [1]
+    assert result.invalid_values.tolist() == [2]
+
+    rotated = PlanValidator.validate_scan_centers([(7940.0, 0.0)], 100.0, angle=45.0)
+    assert rotated.out_of_limits.tolist() == [0]
+
+
+def test_scan_range_outside_limits():
+    result = PlanValidator.validate_scan_centers([(0.0, 0.0)], 6000.0)
+    assert not result.valid
+    assert "Scan range" in result.messages[0]
+
+
+def test_clamp_to_window_moves_points_to_the_edge():
+    clamped = PlanValidator.clamp_to_window([[80.0, 0.0], [10.0, -10.0]], 0.0, 0.0, 100.0)
+    np.testing.assert_allclose(clamped, [[50.0, 0.0], [10.0, -10.0]])
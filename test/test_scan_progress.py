@@ -0,0 +1,75 @@
+"""
+ScanProgress 的行為測試
+
+modules 依賴 Windows 的 DDE（ctypes.WINFUNCTYPE），其他平台上略過。
+
+執行方式：
+    python -m pytest -q test/test_scan_progress.py
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# 添加專案根目錄到系統路徑
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.append(str(ROOT_DIR))
+
+try:
+    from modules.SXMPyEvent import ScanProgress
+except ImportError:
+    pytest.skip("modules require the Windows DDE API", allow_module_level=True)
+
+
+def test_lines_done_counts_from_the_first_line_in_either_direction():
+    progress = ScanProgress(10)
+    progress.on_scan_line({'line_number': 100, 'direction': 'down'})
+    assert progress.snapshot()['lines_done'] == 0
+
+    # 合併後只收到部分事件，仍以行號差計算
+    progress.on_scan_line({'line_number': 96, 'direction': 'down'})
+    state = progress.snapshot()
+    assert state['lines_done'] == 4
+    assert state['direction'] == 'down'
+    assert not state['finished']
+
+    progress = ScanProgress(10)
+    progress.on_scan_line({'line_number': 1})
+    progress.on_scan_line({'line_number': 4})
+    assert progress.snapshot()['lines_done'] == 3
+
+
+def test_lines_done_is_capped_and_events_without_line_are_ignored():
+    progress = ScanProgress(3)
+    progress.on_scan_line({'line_number': 1})
+    progress.on_scan_line({'line_number': 50})
+    progress.on_scan_line({'direction': 'up'})
+    assert progress.snapshot()['lines_done'] == 3
+
+
+def test_rate_and_eta():
+    progress = ScanProgress(10)
+    progress.on_scan_line({'line_number': 1})
+    assert progress.snapshot()['eta'] is None
+    time.sleep(0.05)
+    progress.on_scan_line({'line_number': 3})
+    state = progress.snapshot()
+    assert state['lines_per_second'] > 0
+    assert state['eta'] == pytest.approx(8 / state['lines_per_second'])
+
+
+def test_scan_off_finishes_and_publishes():
+    updates = []
+    progress = ScanProgress(5, callback=updates.append)
+    progress.on_scan_line({'line_number': 1})
+    progress.on_scan_off()
+    assert len(updates) == 2
+    assert updates[-1]['finished']
+    assert updates[-1]['lines_done'] == 5
+    assert updates[-1]['eta'] == 0.0
+
+
+def test_total_lines_is_at_least_one():
+    assert ScanProgress(0).total_lines == 1
@@ -0,0 +1,63 @@
+"""
+StateCache 的行為測試
+
+執行方式：
+    python -m pytest -q test/test_state_cache.py
+"""
+
+import sys
+from pathlib import Path
+
+# 添加專案根目錄到系統路徑
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from utils.SXMPyCalc import ScanGeometry
+from utils.SXMPyStateCache import StateCache
+
+
+def test_round_trip_keeps_every_section(tmp_path):
+    path = tmp_path / "cache" / "state.json"
+    geometry = ScanGeometry(10.0, -5.0, 200.0, 30.0, 256, 1.0, 0.5, 2.0)
+
+    cache = StateCache(str(path))
+    cache.set_geometry(geometry)
+    cache.set_spect_state({1: 12.5, 'Points': 200})
+    cache.set_feedback_state(0)
+    cache.set_compliance({1: 0.01, 2: 0.002})
+    cache.set_script_index(['b', 'a'])
+    assert cache.save()
+
+    loaded = StateCache(str(path))
+    assert loaded.get_geometry() == geometry
+    assert loaded.get_spect_state() == {1: 12.5, 'Points': 200}
+    assert loaded.get_feedback_state() == 0
+    assert loaded.get_compliance() == {1: 0.01, 2: 0.002}
+    assert loaded.get_script_index() == ['a', 'b']
+    assert loaded.timestamp == cache.timestamp
+
+
+def test_missing_or_corrupt_file_gives_empty_cache(tmp_path):
+    assert StateCache(str(tmp_path / "missing.json")).get_geometry() is None
+
+    path = tmp_path / "state.json"
+    path.write_text("{not json", encoding='utf-8')
+    cache = StateCache(str(path))
+    assert cache.get_geometry() is None
+    assert cache.get_feedback_state() is None
+    assert cache.get_compliance() == {}
+
+
+def test_geometry_with_unknown_fields_is_ignored(tmp_path):
+    path = tmp_path / "state.json"
+    path.write_text('{"geometry": {"center_x": 1.0, "unknown": 2}}', encoding='utf-8')
+    assert StateCache(str(path)).get_geometry() is None
+
+
+def test_save_replaces_file_atomically(tmp_path):
+    path = tmp_path / "state.json"
+    cache = StateCache(str(path))
+    cache.set_feedback_state(1)
+    assert cache.save()
+    assert not path.with_suffix('.json.tmp').exists()
+    assert StateCache(str(path)).get_feedback_state() == 1
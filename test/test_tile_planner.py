@@ -0,0 +1,62 @@
+"""
+TilePlanner 的行為測試
+
+執行方式：
+    python -m pytest -q test/test_tile_planner.py
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# 添加專案根目錄到系統路徑
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from utils.SXMPyCalc import TilePlanner
+from utils.SXMPyTransform import FrameTransform
+
+
+def replay(plan):
+    """以 movement_script 與 distance 重建視窗中心，與 auto_move 相同"""
+    return FrameTransform.path_from_moves(plan.movement_script, plan.distance,
+                                          plan.positions[0], plan.angle)
+
+
+def test_script_reproduces_tile_centres():
+    plan = TilePlanner.plan(0.0, 0.0, 500.0, 300.0, 100.0, angle=30.0, overlap=0.1)
+    assert np.isscalar(plan.distance)
+    np.testing.assert_allclose(replay(plan), plan.positions, atol=1e-9)
+
+
+def test_unequal_steps_give_per_axis_distance():
+    plan = TilePlanner.plan(0.0, 0.0, 400.0, 400.0, 100.0, angle=15.0, aspect_ratio=2.0)
+    fast, slow = plan.step
+    assert plan.distance == (fast, slow)
+    assert fast == pytest.approx(2 * slow)
+    assert 'U' in plan.movement_script or 'D' in plan.movement_script
+    np.testing.assert_allclose(replay(plan), plan.positions, atol=1e-9)
+
+
+def test_tiles_cover_the_region_with_the_shortest_serpentine():
+    plan = TilePlanner.plan(0.0, 0.0, 350.0, 250.0, 100.0, start=(-1000.0, -1000.0))
+    assert len(plan.tiles) == len({tile.index for tile in plan.tiles})
+    # 起始角靠近目前的掃描中心
+    first = np.array(plan.positions[0])
+    assert np.all(first <= np.min(plan.positions, axis=0) + 1e-9)
+    # 每一步只移動一個視窗
+    assert len(plan.movement_script) == len(plan.tiles) - 1
+
+
+def test_cits_grid_points_are_owned_once():
+    plan = TilePlanner.plan(0.0, 0.0, 300.0, 300.0, 100.0, overlap=0.2,
+                            num_points_x=31, num_points_y=17)
+    assert plan.grid_shape == (17, 31)
+    assert sum(tile.num_points for tile in plan.tiles) == 31 * 17
+
+
+def test_invalid_distance_shape_is_rejected():
+    with pytest.raises(ValueError):
+        FrameTransform.movement_vectors("RU", (1.0, 2.0, 3.0), 0.0)
@@ -0,0 +1,139 @@
+"""
+Coordinate Transform Benchmark
+
+比較逐點 math 計算與 FrameTransform 向量化核心在大量座標下的處理速度：
+1. 旋轉
+2. 樣品座標 -> 掃描座標
+3. 限制在掃描視窗內
+4. 移動序列展開
+5. 移動語法編譯（蛇形掃描）
+
+執行方式：python test/transform_benchmark.py [點數]
+"""
+
+import math
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# 添加專案根目錄到系統路徑
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from utils.SXMPyTransform import FrameTransform, MoveScript
+
+
+def scalar_rotate(points, angle, center_x, center_y):
+    """原本的逐點旋轉"""
+    angle_rad = math.radians(angle)
+    cos_angle = math.cos(angle_rad)
+    sin_angle = math.sin(angle_rad)
+    result = []
+    for x, y in points:
+        x_shifted = x - center_x
+        y_shifted = y - center_y
+        result.append((x_shifted * cos_angle - y_shifted * sin_angle + center_x,
+                       x_shifted * sin_angle + y_shifted * cos_angle + center_y))
+    return result
+
+
+def scalar_clamp(points, center_x, center_y, scan_range, angle, aspect_ratio):
+    """原本的逐點視窗限制"""
+    angle_rad = math.radians(angle)
+    cos_angle = math.cos(angle_rad)
+    sin_angle = math.sin(angle_rad)
+    half_fast, half_slow = scan_range / 2, scan_range / aspect_ratio / 2
+    result = []
+    for x, y in points:
+        dx, dy = x - center_x, y - center_y
+        fast = max(-half_fast, min(half_fast, dx * cos_angle + dy * sin_angle))
+        slow = max(-half_slow, min(half_slow, -dx * sin_angle + dy * cos_angle))
+        result.append((fast * cos_angle - slow * sin_angle + center_x,
+                       fast * sin_angle + slow * cos_angle + center_y))
+    return result
+
+
+def scalar_path(script, distance, start, angle):
+    """原本的逐步移動展開"""
+    angle_rad = math.radians(angle)
+    cos_angle = math.cos(angle_rad)
+    sin_angle = math.sin(angle_rad)
+    vectors = {
+        'R': (distance * cos_angle, distance * sin_angle),
+        'L': (-distance * cos_angle, -distance * sin_angle),
+        'U': (-distance * sin_angle, distance * cos_angle),
+        'D': (distance * sin_angle, -distance * cos_angle),
+    }
+    x, y = start
+    positions = [(x, y)]
+    for direction in script:
+        dx, dy = vectors[direction]
+        x, y = x + dx, y + dy
+        positions.append((x, y))
+    return positions
+
+
+def timed(func, *args, repeat=3):
+    """回傳最短執行時間（秒）與結果"""
+    best, result = math.inf, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def report(name, count, scalar_time, vector_time):
+    print(f"{name:<22} scalar {count / scalar_time / 1e6:8.2f} Mpts/s   "
+          f"vector {count / vector_time / 1e6:8.2f} Mpts/s   "
+          f"speedup {scalar_time / vector_time:6.1f}x")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = np.random.default_rng(0)
+    points = rng.uniform(-500, 500, (count, 2))
+    point_list = points.tolist()
+    center_x, center_y, angle, scan_range, aspect_ratio = 12.5, -7.0, 33.0, 400.0, 2.0
+
+    print(f"Coordinate transform benchmark: {count:,} points\n")
+
+    scalar_time, scalar_result = timed(scalar_rotate, point_list, angle, center_x, center_y)
+    vector_time, vector_result = timed(FrameTransform.rotate, points, angle, (center_x, center_y))
+    assert np.allclose(scalar_result, vector_result)
+    report("rotate", count, scalar_time, vector_time)
+
+    vector_time, window = timed(FrameTransform.to_scan_frame, points, center_x, center_y, angle)
+    back_time, restored = timed(FrameTransform.to_sample_frame, window, center_x, center_y, angle)
+    assert np.allclose(restored, points)
+    report("sample -> scan frame", count, scalar_time, vector_time)
+    report("scan -> sample frame", count, scalar_time, back_time)
+
+    scalar_time, scalar_result = timed(scalar_clamp, point_list, center_x, center_y,
+                                       scan_range, angle, aspect_ratio)
+    vector_time, vector_result = timed(FrameTransform.clamp_to_window, points, center_x,
+                                       center_y, scan_range, angle, aspect_ratio)
+    assert np.allclose(scalar_result, vector_result)
+    report("clamp to window", count, scalar_time, vector_time)
+
+    script = ''.join(rng.choice(list('RLUD'), count))
+    scalar_time, scalar_result = timed(scalar_path, script, 10.0, (center_x, center_y), angle)
+    vector_time, vector_result = timed(FrameTransform.path_from_moves, script, 10.0,
+                                       (center_x, center_y), angle)
+    assert np.allclose(scalar_result, vector_result)
+    report("path from moves", count, scalar_time, vector_time)
+
+    side = math.isqrt(count)
+    dsl = f"S{side}x{side}"
+    expanded = MoveScript.expand(dsl)
+    scalar_time, scalar_result = timed(scalar_path, expanded, 10.0, (center_x, center_y), angle)
+    vector_time, vector_result = timed(FrameTransform.path_from_moves, dsl, 10.0,
+                                       (center_x, center_y), angle)
+    assert np.allclose(scalar_result, vector_result)
+    report(f"path from '{dsl}'", len(expanded), scalar_time, vector_time)
+
+
+if __name__ == '__main__':
+    main()
@@ -10,8 +10,11 @@ This module provides comprehensive coordinate calculation support for:
 
 import math
 import numpy as np
-from dataclasses import dataclass
-from typing import Tuple, List
+from collections import deque
+from dataclasses import asdict, dataclass, field, replace
+from typing import Tuple, List, Optional
+from config.SXMParameters import SXMParameters
+from utils.SXMPyTransform import FrameTransform
 
 
 @dataclass
@@ -28,23 +31,94 @@ class LocalCITSParams:
     startpoint_direction: int = 1
 
 
+@dataclass(frozen=True)
+class ScanGeometry:
+    """Immutable snapshot of the scan frame geometry"""
+    center_x: float         # Scan center X (nm)
+    center_y: float         # Scan center Y (nm)
+    scan_range: float       # Fast axis range (nm)
+    angle: float            # Scan angle (degrees)
+    pixels: int             # Pixels per line
+    pixel_ratio: float = 1.0    # Pixel density
+    aspect_ratio: float = 1.0   # Image format
+    speed: Optional[float] = None  # Scan speed (lines/s)
+
+    # SXM 掃描參數名稱與欄位的對應
+    SCAN_PARAM_FIELDS = {
+        'X': 'center_x',
+        'Y': 'center_y',
+        'Range': 'scan_range',
+        'Angle': 'angle',
+        'Pixel': 'pixels',
+        'PixelRatio': 'pixel_ratio',
+        'AspectRatio': 'aspect_ratio',
+        'Speed': 'speed',
+    }
+
+    @classmethod
+    def from_scan_params(cls, params: dict) -> 'ScanGeometry':
+        """
+        由掃描參數字典建立幾何快照
+
+        Parameters
+        ----------
+        params : dict
+            以SXM參數名稱為鍵的數值，例如 SXMBase.GetScanParas 的結果
+
+        Returns
+        -------
+        ScanGeometry
+            掃描幾何
+        """
+        missing = [name for name in cls.SCAN_PARAM_FIELDS
+                   if name != 'Speed' and params.get(name) is None]
+        if missing:
+            raise ValueError(f"Missing scan parameters: {', '.join(missing)}")
+
+        return cls(
+            center_x=float(params['X']),
+            center_y=float(params['Y']),
+            scan_range=float(params['Range']),
+            angle=float(params['Angle']),
+            pixels=int(params['Pixel']),
+            pixel_ratio=float(params['PixelRatio']),
+            aspect_ratio=float(params['AspectRatio']),
+            speed=None if params.get('Speed') is None else float(params['Speed'])
+        )
+
+    @property
+    def fast_axis_range(self) -> float:
+        """快軸範圍 (nm)"""
+        return self.scan_range
+
+    @property
+    def slow_axis_range(self) -> float:
+        """慢軸範圍 (nm)，當 aspect_ratio < 1 時慢軸範圍變大"""
+        return self.scan_range / self.aspect_ratio
+
+    @property
+    def total_lines(self) -> int:
+        """整張影像的掃描線數"""
+        return int(self.pixels / (self.aspect_ratio * self.pixel_ratio))
+
+    @property
+    def line_spacing(self) -> Optional[float]:
+        """掃描線間距 (nm)"""
+        return self.slow_axis_range / self.total_lines if self.total_lines > 0 else None
+
+    def with_center(self, center_x: float, center_y: float) -> 'ScanGeometry':
+        """回傳移動到新中心後的幾何"""
+        return replace(self, center_x=center_x, center_y=center_y)
+
+
 class SXMCalculator:
     """計算工具類別"""
 
     @staticmethod
     def rotate_coordinates(x, y, angle_deg, center_x=0, center_y=0):
-        """座標旋轉計算"""
-        angle_rad = math.radians(angle_deg)
-        cos_angle = math.cos(angle_rad)
-        sin_angle = math.sin(angle_rad)
-
-        x_shifted = x - center_x
-        y_shifted = y - center_y
-
-        x_rot = x_shifted * cos_angle - y_shifted * sin_angle
-        y_rot = x_shifted * sin_angle + y_shifted * cos_angle
-
-        return (x_rot + center_x, y_rot + center_y)
+        """座標旋轉計算，大量座標請直接使用 FrameTransform.rotate"""
+        x_rot, y_rot = FrameTransform.rotate((x, y), angle_deg, (center_x, center_y))[0]
+        return (float(x_rot), float(y_rot))
 
     @staticmethod
     def calculate_grid_points(start_x, start_y, width, height, nx, ny):
@@ -56,20 +130,10 @@ class SXMCalculator:
     @staticmethod
     def calculate_movement_vector(direction, distance, angle):
         """計算移動向量"""
-        angle_rad = math.radians(angle)
-        cos_angle = math.cos(angle_rad)
-        sin_angle = math.sin(angle_rad)
-
-        if direction == 'R':
-            return (distance * cos_angle, distance * sin_angle)
-        elif direction == 'L':
-            return (-distance * cos_angle, -distance * sin_angle)
-        elif direction == 'U':
-            return (-distance * sin_angle, distance * cos_angle)
-        elif direction == 'D':
-            return (distance * sin_angle, -distance * cos_angle)
-        else:
+        if len(direction) != 1:
             raise ValueError(f"Unknown direction: {direction}")
+        dx, dy = FrameTransform.movement_vectors(direction, distance, angle)[0]
+        return (float(dx), float(dy))
 
 
 class CITSCalculator:
@@ -141,20 +205,10 @@ class CITSCalculator:
             # 建立網格
             X, Y = np.meshgrid(x, y)
 
-            # 旋轉網格點
-            angle_rad = np.radians(angle)
-            cos_angle = np.cos(angle_rad)
-            sin_angle = np.sin(angle_rad)
-
-            X_rot = X * cos_angle - Y * sin_angle
-            Y_rot = X * sin_angle + Y * cos_angle
-
-            # 平移到掃描中心
-            X_final = X_rot + center_x
-            Y_final = Y_rot + center_y
-
-            # 組合成座標矩陣
-            coordinates = np.stack([X_final, Y_final], axis=2)
+            # 由掃描座標旋轉並平移到掃描中心，組合成 (ny, nx, 2) 座標矩陣
+            coordinates = FrameTransform.to_sample_frame(
+                np.stack([X, Y], axis=2), center_x, center_y, angle
+            ).reshape(X.shape + (2,))
 
             # 計算每條掃描線的起始和結束點
             line_starts = coordinates[:, 0, :]
@@ -172,6 +226,78 @@ class CITSCalculator:
             print(f"Error calculating CITS coordinates: {str(e)}")
             return None
 
+    @staticmethod
+    def plan_cits(
+        geometry: ScanGeometry,
+        num_points_x: int,
+        num_points_y: int,
+        scan_direction: int = 1
+    ) -> tuple:
+        """
+        依掃描幾何快照計算 CITS 座標與掃描線分配
+
+        Parameters
+        ----------
+        geometry : ScanGeometry
+            掃描幾何
+        num_points_x, num_points_y : int
+            X、Y 方向點數
+        scan_direction : int
+            掃描方向 (1: 由下到上, -1: 由上到下)
+
+        Returns
+        -------
+        tuple
+            與 calculate_cits_coordinates 相同
+        """
+        return CITSCalculator.calculate_cits_coordinates(
+            geometry.center_x, geometry.center_y,
+            geometry.scan_range, geometry.angle,
+            num_points_x, num_points_y,
+            geometry.total_lines, scan_direction, geometry.aspect_ratio
+        )
+
+    @staticmethod
+    def plan_dual_cits(
+        geometry: ScanGeometry,
+        num_points_x: int,
+        num_points_y: int
+    ) -> Tuple[tuple, LocalCITSParams, Tuple[float, float]]:
+        """
+        規劃雙向 CITS：上掃影像量測一般網格，下掃影像量測位於網格中心的半格偏移網格
+
+        Parameters
+        ----------
+        geometry : ScanGeometry
+            掃描幾何
+        num_points_x, num_points_y : int
+            上掃網格的 X、Y 方向點數，至少為2
+
+        Returns
+        -------
+        Tuple[tuple, LocalCITSParams, Tuple[float, float]]
+            (上掃的 plan_cits 結果, 下掃網格的局部區域, 上掃網格沿快軸與慢軸的點距 (nm))
+        """
+        if num_points_x < 2 or num_points_y < 2:
+            raise ValueError(f"Dual-direction CITS needs at least 2x2 points: "
+                             f"{num_points_x}x{num_points_y}")
+
+        up_plan = CITSCalculator.plan_cits(geometry, num_points_x, num_points_y, 1)
+        window = FrameTransform.to_scan_frame(
+            up_plan[0], geometry.center_x, geometry.center_y, geometry.angle
+        ).reshape(num_points_y, num_points_x, 2)
+        dx = float(window[0, 1, 0] - window[0, 0, 0])
+        dy = float(window[1, 0, 1] - window[0, 0, 1])
+
+        # 下掃網格的第一點為上掃網格第一格的中心
+        start_x, start_y = FrameTransform.to_sample_frame(
+            window[0, 0] + np.array([dx / 2, dy / 2]),
+            geometry.center_x, geometry.center_y, geometry.angle)[0]
+        down_area = LocalCITSParams(
+            start_x=float(start_x), start_y=float(start_y), dx=dx, dy=dy,
+            nx=num_points_x - 1, ny=num_points_y - 1, scan_direction=-1)
+        return up_plan, down_area, (dx, dy)
+
     @staticmethod
     def calculate_scanline_distribution(total_lines: int, num_points: int, safe_margin: float = 0.02):
         """
@@ -231,6 +357,129 @@ class CITSCalculator:
         return scanlines
 
 
+@dataclass
+class CITSCube:
+    """STS points of interleaved CITS grids placed on one common lattice"""
+    geometry: ScanGeometry
+    origin: Tuple[float, float]     # Scan-frame position of lattice index (0, 0) (nm)
+    step: Tuple[float, float]       # Lattice step along fast and slow axis (nm)
+    shape: Tuple[int, int]          # (rows, columns)
+    positions: np.ndarray = field(init=False)   # (rows, columns, 2) sample coordinates, NaN if empty
+    direction: np.ndarray = field(init=False)   # 1 up frame, -1 down frame, 0 empty
+    order: np.ndarray = field(init=False)       # Measurement order, -1 if empty
+    files: np.ndarray = field(init=False)       # Spectrum file names, None if unknown
+
+    def __post_init__(self):
+        self.positions = np.full(self.shape + (2,), np.nan)
+        self.direction = np.zeros(self.shape, dtype=np.int8)
+        self.order = np.full(self.shape, -1, dtype=int)
+        self.files = np.full(self.shape, None, dtype=object)
+
+    @property
+    def num_points(self) -> int:
+        """已填入的點數"""
+        return int(np.count_nonzero(self.direction))
+
+    def add(self, points, direction: int, files: Optional[List[str]] = None) -> int:
+        """
+        依量測順序加入一組 STS 點
+
+        Parameters
+        ----------
+        points : array_like
+            (N, 2) 實際量測的樣品座標 (nm)
+        direction : int
+            1 表示上掃影像，-1 表示下掃影像
+        files : List[str], optional
+            與 points 一一對應的光譜檔名
+
+        Returns
+        -------
+        int
+            放入格點的點數，離格點超過四分之一格者略過
+        """
+        points = FrameTransform.as_points(points)
+        if not len(points):
+            return 0
+        window = FrameTransform.to_scan_frame(
+            points, self.geometry.center_x, self.geometry.center_y, self.geometry.angle)
+        index = (window - np.asarray(self.origin)) / np.asarray(self.step)
+        nearest = np.rint(index).astype(int)
+        on_lattice = (np.all(np.abs(index - nearest) <= 0.25, axis=1) &
+                      np.all((nearest >= 0) & (nearest < self.shape[::-1]), axis=1))
+
+        start = int(self.order.max()) + 1
+        placed = 0
+        for k in np.flatnonzero(on_lattice):
+            column, row = nearest[k]
+            self.positions[row, column] = points[k]
+            self.direction[row, column] = direction
+            self.order[row, column] = start + k
+            if files is not None and k < len(files):
+                self.files[row, column] = files[k]
+            placed += 1
+        return placed
+
+    def save(self, path: str) -> str:
+        """
+        以 npz 格式儲存，檔名沒有副檔名時加上 .npz
+
+        Parameters
+        ----------
+        path : str
+            檔案路徑
+
+        Returns
+        -------
+        str
+            實際寫入的路徑
+        """
+        if not path.endswith('.npz'):
+            path += '.npz'
+        geometry = asdict(self.geometry)
+        if geometry['speed'] is None:
+            geometry['speed'] = np.nan
+        np.savez(path,
+                 positions=self.positions, direction=self.direction, order=self.order,
+                 files=np.array(['' if f is None else str(f) for f in self.files.ravel()]
+                                ).reshape(self.shape),
+                 origin=np.asarray(self.origin), step=np.asarray(self.step),
+                 shape=np.asarray(self.shape),
+                 geometry_fields=np.array(list(geometry)),
+                 geometry_values=np.array(list(geometry.values()), dtype=float))
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> 'CITSCube':
+        """
+        讀取 save 儲存的檔案
+
+        Parameters
+        ----------
+        path : str
+            檔案路徑
+
+        Returns
+        -------
+        CITSCube
+            讀回的資料
+        """
+        with np.load(path) as data:
+            geometry = dict(zip(data['geometry_fields'].tolist(),
+                                data['geometry_values'].tolist()))
+            geometry['pixels'] = int(geometry['pixels'])
+            if math.isnan(geometry['speed']):
+                geometry['speed'] = None
+            cube = cls(ScanGeometry(**geometry), tuple(data['origin'].tolist()),
+                       tuple(data['step'].tolist()), tuple(int(n) for n in data['shape']))
+            cube.positions = data['positions']
+            cube.direction = data['direction']
+            cube.order = data['order']
+            cube.files = np.array([f or None for f in data['files'].ravel()],
+                                  dtype=object).reshape(cube.shape)
+        return cube
+
+
 """
 Local CITS Calculator Module
 Provides functionality for calculating measurement points for local area CITS.
@@ -269,18 +518,9 @@ class LocalCITSCalculator:
         X, Y = np.meshgrid(x, y)
         coordinates = np.column_stack((X.ravel(), Y.ravel()))
 
-        # 2. 旋轉（逆時針為正）
-        angle_rad = np.radians(scan_angle)
-        rotation_matrix = np.array([
-            [np.cos(angle_rad), np.sin(angle_rad)],
-            [-np.sin(angle_rad), np.cos(angle_rad)]
-        ])
-        coordinates = np.matmul(coordinates, rotation_matrix)
-
-        # 移動到起始點
-        coordinates += np.array([params.start_x, params.start_y])
-
-        return coordinates
+        # 旋轉（逆時針為正）並移動到起始點
+        return FrameTransform.to_sample_frame(
+            coordinates, params.start_x, params.start_y, scan_angle)
 
     @staticmethod
     def get_scan_axes(scan_angle: float, scan_direction: int) -> Tuple[np.ndarray, np.ndarray]:
@@ -300,16 +540,10 @@ class LocalCITSCalculator:
             (慢軸向量, 快軸向量)，都是單位向量
 
         """
-        angle_rad = np.radians(scan_angle)
-
-        # 快軸：和x軸夾角為scan_angle
-        fast_axis = np.array([np.cos(angle_rad), np.sin(angle_rad)])
+        # 快軸：和x軸夾角為scan_angle；慢軸：快軸逆時針旋轉90度
+        fast_axis, slow_axis = FrameTransform.rotation_matrix(scan_angle)
 
-        # 慢軸：慢軸逆時針旋轉90度
-        slow_axis = np.array(
-            [-np.sin(angle_rad), np.cos(angle_rad)])*scan_direction
-
-        return slow_axis, fast_axis
+        return slow_axis * scan_direction, fast_axis
 
     @staticmethod
     def sort_coordinates_by_scan_direction(
@@ -398,6 +632,97 @@ class LocalCITSCalculator:
 
         return coordinates, start_points, end_points, (slow_axis, fast_axis)
 
+    @staticmethod
+    def plan_local_cits(
+        geometry: ScanGeometry,
+        local_areas: List[LocalCITSParams],
+        scan_direction: int = 1
+    ) -> Tuple[np.ndarray, List[int], List[np.ndarray]]:
+        """
+        依掃描幾何快照計算局部 CITS 座標、掃描線分配與座標群組
+
+        Parameters
+        ----------
+        geometry : ScanGeometry
+            掃描幾何
+        local_areas : List[LocalCITSParams]
+            局部區域參數
+        scan_direction : int
+            掃描方向 (1: 由下到上, -1: 由上到下)
+
+        Returns
+        -------
+        Tuple[np.ndarray, List[int], List[np.ndarray]]
+            (排序後座標, 掃描線分配, 座標群組)
+        """
+        coordinates, _, _, _ = LocalCITSCalculator.combi_local_cits_coordinates(
+            geometry.center_x, geometry.center_y,
+            geometry.slow_axis_range, geometry.angle,
+            geometry.total_lines, scan_direction, local_areas
+        )
+        scanline_distribution, coordinate_distribution = \
+            LocalCITSCalculator.calculate_local_scanline_distribution(
+                coordinates, geometry.center_x, geometry.center_y, geometry.angle,
+                geometry.slow_axis_range, scan_direction, geometry.total_lines
+            )
+        return coordinates, scanline_distribution, coordinate_distribution
+
+    @staticmethod
+    def plan_slow_axis_window(
+        geometry: ScanGeometry,
+        coordinates: np.ndarray,
+        margin_lines: int = 2,
+        limits: Optional[dict] = None
+    ) -> Optional[ScanGeometry]:
+        """
+        計算只涵蓋所有量測點的慢軸子視窗
+
+        快軸範圍與掃描線間距不變，以提高 AspectRatio 縮小慢軸範圍，
+        並沿慢軸移動掃描中心到量測點所在的區帶。
+
+        Parameters
+        ----------
+        geometry : ScanGeometry
+            完整的掃描幾何
+        coordinates : np.ndarray
+            (N, 2) 量測點座標 (nm)
+        margin_lines : int
+            區帶兩側保留的掃描線數
+        limits : dict, optional
+            參數範圍，預設為 SXMParameters.PARAM_RANGES
+
+        Returns
+        -------
+        ScanGeometry or None
+            子視窗幾何，無法縮小時為None
+        """
+        limits = limits or SXMParameters.PARAM_RANGES
+        points = np.asarray(coordinates, dtype=float).reshape(-1, 2)
+        if not len(points) or not geometry.line_spacing:
+            return None
+
+        slow = FrameTransform.to_scan_frame(
+            points, geometry.center_x, geometry.center_y, geometry.angle)[:, 1]
+        margin = margin_lines * geometry.line_spacing
+        band_min, band_max = slow.min() - margin, slow.max() + margin
+        band_width = max(band_max - band_min, geometry.line_spacing)
+
+        _, max_aspect = limits.get('AspectRatio', (0.1, 10.0))
+        aspect_ratio = min(geometry.scan_range / band_width, max_aspect)
+        if aspect_ratio <= geometry.aspect_ratio * 1.05:
+            return None
+
+        # 子視窗的慢軸範圍可能因 AspectRatio 上限而大於區帶，以區帶中點為中心
+        band_center = (band_min + band_max) / 2
+        center_x, center_y = FrameTransform.to_sample_frame(
+            (0.0, band_center), geometry.center_x, geometry.center_y, geometry.angle)[0]
+        return replace(
+            geometry,
+            center_x=float(center_x),
+            center_y=float(center_y),
+            aspect_ratio=float(aspect_ratio)
+        )
+
     @staticmethod
     def calculate_local_scanline_distribution(
         coordinates: np.ndarray,
@@ -436,18 +761,9 @@ class LocalCITSCalculator:
             - List of coordinate arrays for each STS measurement position
         """
         try:
-            # Convert angle to radians and calculate slow axis unit vector
-            angle_rad = np.radians(angle)
-            slow_axis = np.array([
-                -np.sin(angle_rad),
-                np.cos(angle_rad)
-            ]) * scan_direction
-
-            # Translate coordinates to origin
-            translated_coords = coordinates - np.array([center_x, center_y])
-
-            # Project points onto slow axis
-            projections = np.dot(translated_coords, slow_axis)
+            # Project points onto the slow axis in the scan direction
+            projections = FrameTransform.to_scan_frame(
+                coordinates, center_x, center_y, angle)[:, 1] * scan_direction
 
             # Scale projections to match scan line numbers
             # Map from [-scan_range/2, scan_range/2] to [0, total_lines]
@@ -573,14 +889,915 @@ class LocalCITSCalculator:
         np.ndarray
             正規化後的座標陣列
         """
-        # 1. 平移到原點
-        coords_centered = coordinates - np.array([center_x, center_y])
+        return FrameTransform.to_scan_frame(coordinates, center_x, center_y, angle)
+
+
+"""
+Plan Validation Module
+Checks complete measurement plans against scanner limits before any hardware action.
+
+All checks work on (N, 2) coordinate arrays in a single NumPy pass, so a whole
+CITS grid or auto-move sequence is accepted or rejected up front.
+"""
 
-        # 2. 旋轉至水平（逆時針旋轉回原位）
-        angle_rad = np.radians(angle)
-        rotation_matrix = np.array([
-            [np.cos(angle_rad), np.sin(angle_rad)],
-            [-np.sin(angle_rad), np.cos(angle_rad)]
-        ])
 
-        return coords_centered @ rotation_matrix
+@dataclass
+class PlanValidationResult:
+    """Result of a measurement plan validation"""
+    num_points: int
+    invalid_values: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=int))
+    out_of_limits: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=int))
+    out_of_window: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=int))
+    messages: List[str] = field(default_factory=list)
+
+    @property
+    def valid(self) -> bool:
+        return not self.messages
+
+    def raise_if_invalid(self):
+        """Raise ValueError describing every violation found"""
+        if not self.valid:
+            raise ValueError("Invalid measurement plan: " + "; ".join(self.messages))
+
+
+class PlanValidator:
+    """量測計畫的向量化預先檢查"""
+
+    @staticmethod
+    def _describe(indices: np.ndarray, points: np.ndarray, limit: int = 3) -> str:
+        """列出前幾個違規點"""
+        shown = ", ".join(
+            f"#{i} ({points[i, 0]:.3f}, {points[i, 1]:.3f})" for i in indices[:limit]
+        )
+        more = f" and {len(indices) - limit} more" if len(indices) > limit else ""
+        return shown + more
+
+    @staticmethod
+    def to_window_frame(
+        points: np.ndarray,
+        center_x: float,
+        center_y: float,
+        angle: float
+    ) -> np.ndarray:
+        """
+        將樣品座標轉換為掃描視窗座標（快軸, 慢軸）
+
+        Parameters
+        ----------
+        points : np.ndarray
+            (N, 2) 樣品座標 (nm)
+        center_x, center_y : float
+            掃描中心 (nm)
+        angle : float
+            掃描角度（度）
+
+        Returns
+        -------
+        np.ndarray
+            (N, 2) 以掃描中心為原點的 (快軸, 慢軸) 座標
+        """
+        return FrameTransform.to_scan_frame(points, center_x, center_y, angle)
+
+    @staticmethod
+    def validate_points(
+        points,
+        center_x: Optional[float] = None,
+        center_y: Optional[float] = None,
+        scan_range: Optional[float] = None,
+        angle: float = 0.0,
+        aspect_ratio: float = 1.0,
+        limits: Optional[dict] = None,
+        tolerance: float = 1e-6
+    ) -> PlanValidationResult:
+        """
+        檢查量測點是否在掃描器極限與目前掃描視窗內
+
+        Parameters
+        ----------
+        points : array_like
+            (..., 2) 量測點座標 (nm)，例如 CITS 座標矩陣
+        center_x, center_y : float, optional
+            目前掃描中心 (nm)，未提供時不檢查視窗
+        scan_range : float, optional
+            快軸掃描範圍 (nm)，未提供時不檢查視窗
+        angle : float
+            掃描角度（度）
+        aspect_ratio : float
+            影像長寬比，慢軸範圍為 scan_range / aspect_ratio
+        limits : dict, optional
+            參數範圍，預設為 SXMParameters.PARAM_RANGES
+        tolerance : float
+            邊界容許誤差 (nm)
+
+        Returns
+        -------
+        PlanValidationResult
+            檢查結果
+        """
+        limits = limits or SXMParameters.PARAM_RANGES
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        result = PlanValidationResult(num_points=len(points))
+        if len(points) == 0:
+            return result
+
+        finite = np.all(np.isfinite(points), axis=1)
+        result.invalid_values = np.flatnonzero(~finite)
+        if len(result.invalid_values):
+            result.messages.append(
+                f"{len(result.invalid_values)} points are not finite")
+
+        (x_min, x_max), (y_min, y_max) = limits['X'], limits['Y']
+        inside = ((points[:, 0] >= x_min - tolerance) & (points[:, 0] <= x_max + tolerance) &
+                  (points[:, 1] >= y_min - tolerance) & (points[:, 1] <= y_max + tolerance))
+        result.out_of_limits = np.flatnonzero(~inside & finite)
+        if len(result.out_of_limits):
+            result.messages.append(
+                f"{len(result.out_of_limits)} points outside scanner limits "
+                f"X{limits['X']} Y{limits['Y']}: "
+                + PlanValidator._describe(result.out_of_limits, points))
+
+        if None not in (center_x, center_y, scan_range):
+            window = PlanValidator.to_window_frame(points, center_x, center_y, angle)
+            half_fast = scan_range / 2
+            half_slow = scan_range / aspect_ratio / 2
+            in_window = ((np.abs(window[:, 0]) <= half_fast + tolerance) &
+                         (np.abs(window[:, 1]) <= half_slow + tolerance))
+            result.out_of_window = np.flatnonzero(~in_window & finite)
+            if len(result.out_of_window):
+                result.messages.append(
+                    f"{len(result.out_of_window)} points outside the current scan window "
+                    f"({scan_range:.3f} x {scan_range / aspect_ratio:.3f} nm at "
+                    f"({center_x:.3f}, {center_y:.3f}), {angle}°): "
+                    + PlanValidator._describe(result.out_of_window, points))
+
+        return result
+
+    @staticmethod
+    def validate_geometry_points(points, geometry: ScanGeometry,
+                                 limits: Optional[dict] = None) -> PlanValidationResult:
+        """以掃描幾何快照檢查量測點，參數意義同 validate_points"""
+        return PlanValidator.validate_points(
+            points, geometry.center_x, geometry.center_y, geometry.scan_range,
+            geometry.angle, geometry.aspect_ratio, limits
+        )
+
+    @staticmethod
+    def validate_scan_centers(
+        centers,
+        scan_range: float,
+        angle: float = 0.0,
+        aspect_ratio: float = 1.0,
+        limits: Optional[dict] = None,
+        tolerance: float = 1e-6
+    ) -> PlanValidationResult:
+        """
+        檢查一系列掃描中心（如 auto_move 產生的位置）的整個掃描視窗是否都在掃描器極限內
+
+        Parameters
+        ----------
+        centers : array_like
+            (N, 2) 掃描中心座標 (nm)
+        scan_range : float
+            快軸掃描範圍 (nm)
+        angle : float
+            掃描角度（度）
+        aspect_ratio : float
+            影像長寬比
+        limits : dict, optional
+            參數範圍，預設為 SXMParameters.PARAM_RANGES
+        tolerance : float
+            邊界容許誤差 (nm)
+
+        Returns
+        -------
+        PlanValidationResult
+            檢查結果，out_of_limits 為視窗超出極限的中心索引
+        """
+        limits = limits or SXMParameters.PARAM_RANGES
+        centers = np.asarray(centers, dtype=float).reshape(-1, 2)
+        result = PlanValidationResult(num_points=len(centers))
+
+        range_min, range_max = limits['Range']
+        if scan_range is None or not (range_min <= scan_range <= range_max):
+            result.messages.append(
+                f"Scan range {scan_range} outside limits {limits['Range']}")
+            return result
+        if len(centers) == 0:
+            return result
+
+        finite = np.all(np.isfinite(centers), axis=1)
+        result.invalid_values = np.flatnonzero(~finite)
+        if len(result.invalid_values):
+            result.messages.append(
+                f"{len(result.invalid_values)} scan centers are not finite")
+
+        # 視窗四個角相對於中心的位置
+        half_fast = scan_range / 2
+        half_slow = scan_range / aspect_ratio / 2
+        corners = np.array([[-half_fast, -half_slow], [half_fast, -half_slow],
+                            [half_fast, half_slow], [-half_fast, half_slow]])
+        corners = FrameTransform.to_sample_frame(corners, 0.0, 0.0, angle)
+
+        all_corners = centers[:, None, :] + corners[None, :, :]
+        (x_min, x_max), (y_min, y_max) = limits['X'], limits['Y']
+        inside = np.all(
+            (all_corners[..., 0] >= x_min - tolerance) & (all_corners[..., 0] <= x_max + tolerance) &
+            (all_corners[..., 1] >= y_min - tolerance) & (all_corners[..., 1] <= y_max + tolerance),
+            axis=1)
+        result.out_of_limits = np.flatnonzero(~inside & finite)
+        if len(result.out_of_limits):
+            result.messages.append(
+                f"{len(result.out_of_limits)} scan windows extend beyond scanner limits "
+                f"X{limits['X']} Y{limits['Y']}: "
+                + PlanValidator._describe(result.out_of_limits, centers))
+
+        return result
+
+    @staticmethod
+    def clamp_to_window(
+        points,
+        center_x: float,
+        center_y: float,
+        scan_range: float,
+        angle: float = 0.0,
+        aspect_ratio: float = 1.0
+    ) -> np.ndarray:
+        """
+        將量測點限制在掃描視窗內
+
+        Parameters
+        ----------
+        points : array_like
+            (N, 2) 量測點座標 (nm)
+        center_x, center_y : float
+            掃描中心 (nm)
+        scan_range : float
+            快軸掃描範圍 (nm)
+        angle : float
+            掃描角度（度）
+        aspect_ratio : float
+            影像長寬比
+
+        Returns
+        -------
+        np.ndarray
+            (N, 2) 限制後的座標
+        """
+        return FrameTransform.clamp_to_window(
+            points, center_x, center_y, scan_range, angle, aspect_ratio)
+
+
+"""
+Scan Timing Module
+Predicts how long a ScanLine segment takes and calibrates from observed scans.
+
+Speed is given in lines/s, so the time of one line does not depend on Pixel,
+PixelRatio or AspectRatio; those only set how many lines a full frame has.
+"""
+
+
+class ScanTimingModel:
+    """
+    掃描時間模型：duration = overhead + lines * line_factor / speed
+
+    line_factor 與 overhead 由實際的 Scan on/off 時間以最小平方法校正
+    """
+
+    def __init__(self, line_factor: float = 1.0, overhead: float = 0.5, history: int = 50):
+        """
+        Parameters
+        ----------
+        line_factor : float
+            每行時間相對於 1/Speed 的倍數
+        overhead : float
+            每段掃描的固定額外時間（秒）
+        history : int
+            用於校正的最近觀測數
+        """
+        self.line_factor = line_factor
+        self.overhead = overhead
+        self._observations = deque(maxlen=history)
+
+    def predict(self, lines: float, speed: float) -> float:
+        """
+        預測掃描時間
+
+        Parameters
+        ----------
+        lines : float
+            掃描行數
+        speed : float
+            掃描速度 (lines/s)
+
+        Returns
+        -------
+        float
+            預測時間（秒）
+        """
+        if not speed or speed <= 0:
+            raise ValueError(f"Invalid scan speed: {speed}")
+        return self.overhead + lines * self.line_factor / speed
+
+    def timeout(self, lines: float, speed: float, margin: float = 1.5,
+                minimum_slack: float = 5.0) -> float:
+        """
+        由預測時間得到等待超時時間
+
+        Parameters
+        ----------
+        lines : float
+            掃描行數
+        speed : float
+            掃描速度 (lines/s)
+        margin : float
+            預測時間的倍數
+        minimum_slack : float
+            超出預測時間的最小寬限（秒）
+
+        Returns
+        -------
+        float
+            超時時間（秒）
+        """
+        expected = self.predict(lines, speed)
+        return max(expected * margin, expected + minimum_slack)
+
+    def observe(self, lines: float, speed: float, duration: float):
+        """
+        加入一筆實際掃描時間並重新校正
+
+        Parameters
+        ----------
+        lines : float
+            掃描行數
+        speed : float
+            掃描速度 (lines/s)
+        duration : float
+            實際時間（秒）
+        """
+        if not speed or speed <= 0 or lines <= 0 or duration <= 0:
+            return
+        self._observations.append((lines / speed, duration))
+        self._fit()
+
+    def _fit(self):
+        """以觀測資料校正 line_factor 與 overhead"""
+        data = np.array(self._observations)
+        x, y = data[:, 0], data[:, 1]
+
+        if len(np.unique(x)) >= 2:
+            slope, intercept = np.polyfit(x, y, 1)
+            if slope > 0:
+                self.line_factor = float(slope)
+                self.overhead = float(max(intercept, 0.0))
+                return
+
+        # 只有單一掃描長度時保留 overhead，只校正 line_factor
+        factor = np.mean((y - self.overhead) / x)
+        if factor > 0:
+            self.line_factor = float(factor)
+
+    @property
+    def num_observations(self) -> int:
+        """已用於校正的觀測數"""
+        return len(self._observations)
+
+
+"""
+Route Optimization Module
+Reorders auto-move positions to shorten total travel.
+
+The first position is the current scan center and stays first. Optional
+precedence pairs (a, b) require position a to be visited before position b.
+"""
+
+
+@dataclass
+class RoutePlan:
+    """Result of a route optimization"""
+    order: List[int]
+    travel_before: float
+    travel_after: float
+
+    @property
+    def saving(self) -> float:
+        """節省的移動距離比例"""
+        if self.travel_before <= 0:
+            return 0.0
+        return 1.0 - self.travel_after / self.travel_before
+
+    def apply(self, positions: list) -> list:
+        """依最佳順序排列位置"""
+        return [positions[i] for i in self.order]
+
+
+class RouteOptimizer:
+    """最近鄰居加 2-opt 的路徑最佳化"""
+
+    @staticmethod
+    def path_length(points, order: Optional[List[int]] = None) -> float:
+        """
+        計算依序走訪的總距離
+
+        Parameters
+        ----------
+        points : array_like
+            (N, 2) 位置座標
+        order : List[int], optional
+            走訪順序，預設為原順序
+
+        Returns
+        -------
+        float
+            總距離
+        """
+        points = np.asarray(points, dtype=float)
+        if order is not None:
+            points = points[list(order)]
+        if len(points) < 2:
+            return 0.0
+        return float(np.sum(np.linalg.norm(np.diff(points, axis=0), axis=1)))
+
+    @staticmethod
+    def _respects(order: List[int], precedence) -> bool:
+        """檢查順序是否滿足所有先後限制"""
+        rank = {node: i for i, node in enumerate(order)}
+        return all(rank[a] < rank[b] for a, b in precedence)
+
+    @staticmethod
+    def nearest_neighbour(distances: np.ndarray, precedence=()) -> List[int]:
+        """
+        從第0點開始，每次走向可走訪的最近點
+
+        Parameters
+        ----------
+        distances : np.ndarray
+            (N, N) 距離矩陣
+        precedence : Iterable[Tuple[int, int]]
+            (a, b) 表示 a 必須在 b 之前
+
+        Returns
+        -------
+        List[int]
+            走訪順序
+        """
+        n = len(distances)
+        predecessors = {i: set() for i in range(n)}
+        for a, b in precedence:
+            predecessors[b].add(a)
+
+        order = [0]
+        visited = {0}
+        while len(order) < n:
+            current = order[-1]
+            candidates = [i for i in range(n)
+                          if i not in visited and predecessors[i] <= visited]
+            if not candidates:
+                raise ValueError("Route precedence constraints contain a cycle")
+            nearest = min(candidates, key=lambda i: distances[current, i])
+            order.append(nearest)
+            visited.add(nearest)
+        return order
+
+    @staticmethod
+    def two_opt(distances: np.ndarray, order: List[int], precedence=(),
+                max_passes: int = 50) -> List[int]:
+        """
+        以 2-opt 反轉路段改善開放路徑，第一點固定
+
+        Parameters
+        ----------
+        distances : np.ndarray
+            (N, N) 距離矩陣
+        order : List[int]
+            初始走訪順序
+        precedence : Iterable[Tuple[int, int]]
+            (a, b) 表示 a 必須在 b 之前
+        max_passes : int
+            最多改善輪數
+
+        Returns
+        -------
+        List[int]
+            改善後的走訪順序
+        """
+        order = list(order)
+        precedence = list(precedence)
+        n = len(order)
+
+        for _ in range(max_passes):
+            improved = False
+            for i in range(1, n - 1):
+                for j in range(i + 1, n):
+                    before = distances[order[i - 1], order[i]]
+                    after = distances[order[i - 1], order[j]]
+                    if j + 1 < n:
+                        before += distances[order[j], order[j + 1]]
+                        after += distances[order[i], order[j + 1]]
+                    if after < before - 1e-9:
+                        candidate = order[:i] + order[i:j + 1][::-1] + order[j + 1:]
+                        if not precedence or RouteOptimizer._respects(candidate, precedence):
+                            order = candidate
+                            improved = True
+            if not improved:
+                break
+        return order
+
+    @staticmethod
+    def optimize(positions, precedence=()) -> RoutePlan:
+        """
+        最佳化走訪順序
+
+        Parameters
+        ----------
+        positions : array_like
+            (N, 2) 位置座標，第0點為起點
+        precedence : Iterable[Tuple[int, int]]
+            (a, b) 表示位置 a 必須在位置 b 之前走訪
+
+        Returns
+        -------
+        RoutePlan
+            最佳順序與前後總距離
+        """
+        points = np.asarray(positions, dtype=float).reshape(-1, 2)
+        precedence = [(int(a), int(b)) for a, b in precedence]
+        travel_before = RouteOptimizer.path_length(points)
+
+        if len(points) < 3:
+            order = list(range(len(points)))
+            return RoutePlan(order, travel_before, travel_before)
+
+        distances = np.linalg.norm(points[:, None, :] - points[None, :, :], axis=2)
+        order = RouteOptimizer.nearest_neighbour(distances, precedence)
+        order = RouteOptimizer.two_opt(distances, order, precedence)
+        travel_after = RouteOptimizer.path_length(points, order)
+
+        # 原順序若已較短則保留
+        if travel_after >= travel_before:
+            order = list(range(len(points)))
+            travel_after = travel_before
+
+        return RoutePlan(order, travel_before, travel_after)
+
+
+"""
+Settle Time Module
+Chooses the wait after a scan-center move from the move distance.
+
+Piezo creep after a step d follows x(t) = x0 + gamma * d * log10(t / t0), so the
+creep rate gamma * d / (t * ln 10) falls below a tolerance r after
+t = gamma * d / (r * ln 10). The X/Y DAC readback is the command value and does not
+show creep, so gamma is fitted from the residual drift measured between consecutive
+topography frames after a move (see SXMPyDrift.DriftEstimator).
+"""
+
+
+class CreepModel:
+    """
+    壓電蠕變模型，由移動距離決定穩定等待時間
+
+    移動 d 後 t 秒的漂移速率為 thermal + gamma * |d| / (t * ln 10)。
+    兩張影像完成時間 t1、t2（自移動結束起算）之間的平均速率為
+    thermal + gamma * |d| * log10(t2 / t1) / (t2 - t1)，
+    gamma 與 thermal 由影像間的殘餘漂移以最小平方法校正
+    """
+
+    def __init__(self, gamma: float = 0.01, drift_tolerance: float = 0.05,
+                 min_wait: float = 0.1, max_wait: float = 120.0, history: int = 50):
+        """
+        Parameters
+        ----------
+        gamma : float
+            每十倍時間的蠕變量相對於移動距離的比例
+        drift_tolerance : float
+            可接受的漂移速率 (nm/s)
+        min_wait, max_wait : float
+            等待時間的上下限（秒）
+        history : int
+            用於校正的最近觀測數
+        """
+        self.gamma = gamma
+        self.thermal_drift = 0.0  # 與移動無關的漂移速率 (nm/s)
+        self.drift_tolerance = drift_tolerance
+        self.min_wait = min_wait
+        self.max_wait = max_wait
+        self._observations = deque(maxlen=history)
+
+    def settle_time(self, distance: float) -> float:
+        """
+        移動後需要的等待時間
+
+        Parameters
+        ----------
+        distance : float
+            移動距離 (nm)
+
+        Returns
+        -------
+        float
+            等待時間（秒）
+        """
+        wait = self.gamma * abs(distance) / (self.drift_tolerance * math.log(10))
+        return float(min(max(wait, self.min_wait), self.max_wait))
+
+    def drift_rate(self, distance: float, elapsed: float) -> float:
+        """預測移動後 elapsed 秒時的蠕變漂移速率 (nm/s)"""
+        if elapsed <= 0:
+            return math.inf
+        return self.gamma * abs(distance) / (elapsed * math.log(10))
+
+    def observe(self, distance: float, start: float, end: float, drift_rate: float):
+        """
+        加入一筆影像間的漂移速率並重新校正
+
+        Parameters
+        ----------
+        distance : float
+            最近一次移動的距離 (nm)
+        start, end : float
+            兩張影像完成的時間，自移動結束起算（秒）
+        drift_rate : float
+            兩張影像之間的殘餘漂移速率大小 (nm/s)
+        """
+        if distance == 0 or start <= 0 or end <= start or not math.isfinite(drift_rate):
+            return
+        x = abs(distance) * math.log10(end / start) / (end - start)
+        self._observations.append((x, abs(drift_rate)))
+        self._fit()
+
+    def _fit(self):
+        """以觀測資料校正 gamma 與 thermal_drift"""
+        data = np.array(self._observations)
+        x, y = data[:, 0], data[:, 1]
+
+        if len(np.unique(x)) >= 2:
+            slope, intercept = np.polyfit(x, y, 1)
+            if slope > 0:
+                self.gamma = float(slope)
+                self.thermal_drift = float(max(intercept, 0.0))
+                return
+
+        # 只有單一條件時保留 thermal_drift，只校正 gamma
+        gamma = np.mean((y - self.thermal_drift) / x)
+        if gamma > 0:
+            self.gamma = float(gamma)
+
+    @property
+    def num_observations(self) -> int:
+        """已用於校正的觀測數"""
+        return len(self._observations)
+
+
+"""
+Tiled Survey Module
+Splits a region larger than one scan window into a grid of scan windows.
+
+Tiles are laid out in the scan frame with a fixed step of tile size * (1 - overlap),
+centred on the region, and visited in the shortest of the eight serpentine orders
+(four start corners, rows or columns first).
+A global CITS grid is split by nearest tile centre, so every point belongs to exactly
+one tile and keeps its global (row, column) index.
+"""
+
+
+@dataclass
+class Tile:
+    """One scan window of a tiled survey"""
+    index: Tuple[int, int]          # (column, row) in the tile grid, along fast/slow axis
+    center: Tuple[float, float]     # Scan center (nm)
+    columns: range = range(0)       # Global CITS grid columns owned by this tile
+    rows: range = range(0)          # Global CITS grid rows owned by this tile
+    cits_area: Optional[LocalCITSParams] = None  # CITS points owned by this tile
+
+    @property
+    def num_points(self) -> int:
+        """此視窗負責的 CITS 點數"""
+        return len(self.columns) * len(self.rows)
+
+
+@dataclass
+class TilePlan:
+    """Result of a tiled survey plan"""
+    tiles: List[Tile]               # Tiles in visiting order
+    step: Tuple[float, float]       # Tile step along fast and slow axis (nm)
+    angle: float                    # Scan angle (degrees)
+    movement_script: str            # Moves between consecutive tiles, e.g. "RRUL"
+    grid_shape: Optional[Tuple[int, int]] = None  # Global CITS grid (rows, columns)
+
+    @property
+    def positions(self) -> List[Tuple[float, float]]:
+        """走訪順序的掃描中心"""
+        return [tile.center for tile in self.tiles]
+
+    @property
+    def distance(self):
+        """
+        movement_script 每步的距離 (nm)，可直接用於 auto_move；
+        快慢軸步距不同（AspectRatio 不為1）時為 (快軸, 慢軸) 步距
+        """
+        fast, slow = self.step
+        if math.isclose(fast, slow):
+            return fast
+        return (fast, slow)
+
+    @property
+    def travel(self) -> float:
+        """走訪所有視窗的總移動距離 (nm)"""
+        return RouteOptimizer.path_length(self.positions) if self.tiles else 0.0
+
+    def owner_map(self) -> Optional[np.ndarray]:
+        """
+        每個全域 CITS 點所屬的視窗
+
+        Returns
+        -------
+        np.ndarray or None
+            (rows, columns) 陣列，數值為 tiles 中的索引
+        """
+        if self.grid_shape is None:
+            return None
+        owners = np.full(self.grid_shape, -1, dtype=int)
+        for order, tile in enumerate(self.tiles):
+            if tile.num_points:
+                owners[tile.rows.start:tile.rows.stop, tile.columns.start:tile.columns.stop] = order
+        return owners
+
+
+class TilePlanner:
+    """大範圍量測的視窗分割與走訪順序"""
+
+    @staticmethod
+    def _tile_count(extent: float, tile: float, step: float) -> int:
+        """涵蓋 extent 所需的視窗數"""
+        if extent <= tile:
+            return 1
+        return int(math.ceil((extent - tile) / step - 1e-9)) + 1
+
+    @staticmethod
+    def serpentine_order(nx: int, ny: int, centers: np.ndarray,
+                         start: Optional[Tuple[float, float]] = None) -> List[Tuple[int, int]]:
+        """
+        在四個起始角與兩個主要方向的蛇形順序中選出總移動距離最短者
+
+        Parameters
+        ----------
+        nx, ny : int
+            快軸與慢軸方向的視窗數
+        centers : np.ndarray
+            (ny, nx, 2) 視窗中心
+        start : Tuple[float, float], optional
+            目前的掃描中心，計入移動到第一個視窗的距離
+
+        Returns
+        -------
+        List[Tuple[int, int]]
+            (column, row) 走訪順序
+        """
+        best, best_length = None, math.inf
+        for fast_major in (True, False):
+            outer, inner = (ny, nx) if fast_major else (nx, ny)
+            for reverse_outer in (False, True):
+                for reverse_inner in (False, True):
+                    order = []
+                    for k, a in enumerate(range(outer)[::-1] if reverse_outer else range(outer)):
+                        inner_range = range(inner)
+                        if (k % 2 == 1) != reverse_inner:
+                            inner_range = inner_range[::-1]
+                        order.extend((b, a) if fast_major else (a, b) for b in inner_range)
+
+                    points = np.array([centers[row, column] for column, row in order])
+                    if start is not None:
+                        points = np.vstack((np.asarray(start, dtype=float), points))
+                    length = RouteOptimizer.path_length(points)
+                    if length < best_length - 1e-9:
+                        best, best_length = order, length
+        return best
+
+    @staticmethod
+    def movement_script(order: List[Tuple[int, int]]) -> str:
+        """由視窗順序產生 R/L/U/D 移動序列"""
+        script = []
+        for (c0, r0), (c1, r1) in zip(order[:-1], order[1:]):
+            script.append(('R' if c1 > c0 else 'L') * abs(c1 - c0))
+            script.append(('U' if r1 > r0 else 'D') * abs(r1 - r0))
+        return ''.join(script)
+
+    @staticmethod
+    def _split_grid(count: int, extent: float, tile_centers: np.ndarray) -> Tuple[np.ndarray, List[range]]:
+        """
+        沿一個軸產生全域網格座標，並依最近的視窗中心分配
+
+        Returns
+        -------
+        Tuple[np.ndarray, List[range]]
+            (網格座標, 每個視窗負責的連續索引範圍)
+        """
+        grid = np.linspace(-extent / 2, extent / 2, count) if count > 1 else np.zeros(1)
+        boundaries = (tile_centers[:-1] + tile_centers[1:]) / 2
+        owner = np.searchsorted(boundaries, grid, side='right')
+        ranges = []
+        for k in range(len(tile_centers)):
+            indices = np.flatnonzero(owner == k)
+            ranges.append(range(indices[0], indices[-1] + 1) if len(indices) else range(0))
+        return grid, ranges
+
+    @staticmethod
+    def plan(
+        center_x: float,
+        center_y: float,
+        width: float,
+        height: float,
+        tile_size: float,
+        angle: float = 0.0,
+        aspect_ratio: float = 1.0,
+        overlap: float = 0.0,
+        start: Optional[Tuple[float, float]] = None,
+        num_points_x: Optional[int] = None,
+        num_points_y: Optional[int] = None,
+        safe_margin: float = 0.004
+    ) -> TilePlan:
+        """
+        將區域分割為掃描視窗，並可選擇將全域 CITS 網格分配到各視窗
+
+        Parameters
+        ----------
+        center_x, center_y : float
+            區域中心 (nm)
+        width, height : float
+            區域沿快軸與慢軸的大小 (nm)
+        tile_size : float
+            每個視窗的快軸掃描範圍 (nm)，即 Range
+        angle : float
+            掃描角度（度），區域與視窗都以此角度旋轉
+        aspect_ratio : float
+            影像長寬比，視窗慢軸範圍為 tile_size / aspect_ratio
+        overlap : float
+            相鄰視窗重疊的比例，0 到小於1
+        start : Tuple[float, float], optional
+            目前的掃描中心，用於選擇走訪的起始角
+        num_points_x, num_points_y : int, optional
+            全域 CITS 網格的點數，涵蓋整個區域；未提供時只規劃掃描
+        safe_margin : float
+            CITS 點與視窗邊界保留的比例，與 CITSCalculator 相同
+
+        Returns
+        -------
+        TilePlan
+            視窗走訪順序、移動序列與各視窗的 CITS 區域
+        """
+        if width <= 0 or height <= 0:
+            raise ValueError(f"Invalid region size: {width} x {height}")
+        if tile_size <= 0 or aspect_ratio <= 0:
+            raise ValueError(f"Invalid tile size: {tile_size}, aspect ratio {aspect_ratio}")
+        if not 0 <= overlap < 1:
+            raise ValueError(f"overlap must be in [0, 1): {overlap}")
+        if (num_points_x is None) != (num_points_y is None):
+            raise ValueError("num_points_x and num_points_y must be given together")
+        if num_points_x is not None and (num_points_x < 1 or num_points_y < 1):
+            raise ValueError(f"Invalid CITS grid: {num_points_x} x {num_points_y}")
+
+        # 視窗的可用大小與步距
+        tile_fast = tile_size * (1 - safe_margin)
+        tile_slow = tile_size / aspect_ratio * (1 - safe_margin)
+        step_fast = tile_fast * (1 - overlap)
+        step_slow = tile_slow * (1 - overlap)
+        nx = TilePlanner._tile_count(width, tile_fast, step_fast)
+        ny = TilePlanner._tile_count(height, tile_slow, step_slow)
+
+        # 掃描座標中的視窗中心，以區域中心對稱排列
+        fast_centers = (np.arange(nx) - (nx - 1) / 2) * step_fast
+        slow_centers = (np.arange(ny) - (ny - 1) / 2) * step_slow
+        window = np.stack(np.meshgrid(fast_centers, slow_centers), axis=2)
+        centers = FrameTransform.to_sample_frame(
+            window, center_x, center_y, angle).reshape(ny, nx, 2)
+
+        order = TilePlanner.serpentine_order(nx, ny, centers, start)
+
+        column_ranges = [range(0)] * nx
+        row_ranges = [range(0)] * ny
+        grid_shape = None
+        if num_points_x is not None:
+            grid_x, column_ranges = TilePlanner._split_grid(num_points_x, width, fast_centers)
+            grid_y, row_ranges = TilePlanner._split_grid(num_points_y, height, slow_centers)
+            dx = width / (num_points_x - 1) if num_points_x > 1 else 0.0
+            dy = height / (num_points_y - 1) if num_points_y > 1 else 0.0
+            grid_shape = (num_points_y, num_points_x)
+
+        tiles = []
+        for column, row in order:
+            tile = Tile(index=(column, row),
+                        center=(float(centers[row, column, 0]), float(centers[row, column, 1])),
+                        columns=column_ranges[column], rows=row_ranges[row])
+            if tile.num_points:
+                start_x, start_y = FrameTransform.to_sample_frame(
+                    (grid_x[tile.columns.start], grid_y[tile.rows.start]),
+                    center_x, center_y, angle)[0]
+                tile.cits_area = LocalCITSParams(
+                    start_x=float(start_x), start_y=float(start_y), dx=dx, dy=dy,
+                    nx=len(tile.columns), ny=len(tile.rows))
+            tiles.append(tile)
+
+        return TilePlan(tiles=tiles, step=(step_fast, step_slow), angle=angle,
+                        movement_script=TilePlanner.movement_script(order),
+                        grid_shape=grid_shape)
@@ -0,0 +1,370 @@
+"""
+SXMPyCollect Module
+讀取 SXM 驅動程式 (\\\\.\\SXM) 輸出的 Collect 資料串流
+
+資料格式：
+每個樣本為一個 32 位元整數，低 8 位元為通道編號，高 24 位元為數值。
+通道編號見 COLLECT_CHANNELS，例如 13 為 Frame/Line Sync，14 為 zFastData。
+
+LineSyncCounter 由 Frame/Line Sync 通道的上升緣計算已開始的掃描行數；
+CollectReplay 以錄製或合成的資料取代驅動程式，介面與 CollectReader 相同。
+"""
+
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+import numpy as np
+
+
+COLLECT_CHANNELS = {
+    0: 'IN A',
+    1: 'LIAY',
+    2: 'LIAX',
+    3: 'SyncRadius',
+    4: 'IN_B',
+    5: 'SyncAngle',
+    6: 'Lia2X',
+    7: 'Lia2Y',
+    8: 'Lia3X',
+    9: 'Lia3Y',
+    10: 'Lia4X',
+    11: 'Lia4Y',
+    12: 'zSlowData',
+    13: 'Frame/Line Sync',
+    14: 'zFastData',
+    15: 'WaveCounter',
+    16: 'LIA1R',
+    17: 'LIA1Phi'
+}
+
+COLLECT_LINE_SYNC = 13
+COLLECT_Z_FAST = 14
+
+
+def decode_collect(buffer: bytes, channels: Optional[Iterable[int]] = None) -> Dict[int, np.ndarray]:
+    """
+    將 Collect 原始資料依通道分開
+
+    Parameters
+    ----------
+    buffer : bytes
+        ReadFile 讀到的原始資料
+    channels : Iterable[int], optional
+        只保留這些通道，預設為全部
+
+    Returns
+    -------
+    Dict[int, np.ndarray]
+        通道編號對應的數值陣列（int32）
+    """
+    count = len(buffer) // 4
+    words = np.frombuffer(buffer, dtype='<i4', count=count)
+    channel_ids = words & 0xFF
+    values = words >> 8
+
+    if channels is None:
+        channels = np.unique(channel_ids)
+
+    return {int(ch): values[channel_ids == ch] for ch in channels}
+
+
+def encode_collect(values: np.ndarray, channel: int) -> bytes:
+    """
+    將單一通道的數值編碼為 Collect 原始資料，為 decode_collect 的反轉換
+
+    Parameters
+    ----------
+    values : np.ndarray
+        數值陣列（24 位元有號整數範圍）
+    channel : int
+        通道編號
+
+    Returns
+    -------
+    bytes
+        Collect 原始資料
+    """
+    values = np.asarray(values, dtype='<i4')
+    return ((values << 8) | (channel & 0xFF)).astype('<i4').tobytes()
+
+
+def synthetic_line_sync(lines: int, samples_per_line: int, pulse_width: int = 2,
+                        level: int = 1) -> np.ndarray:
+    """
+    產生合成的 Line Sync 訊號，每行開頭為一個脈衝
+
+    Parameters
+    ----------
+    lines : int
+        行數
+    samples_per_line : int
+        每行的樣本數
+    pulse_width : int
+        脈衝寬度（樣本數）
+    level : int
+        脈衝高度
+
+    Returns
+    -------
+    np.ndarray
+        長度為 lines * samples_per_line 的訊號
+    """
+    if pulse_width >= samples_per_line:
+        raise ValueError(f"pulse_width must be shorter than a line: {pulse_width}")
+    line = np.zeros(samples_per_line, dtype=np.int32)
+    line[:pulse_width] = level
+    return np.tile(line, lines)
+
+
+class LineSyncCounter:
+    """
+    計算 Frame/Line Sync 通道的上升緣，即已開始的掃描行數
+    可直接作為 CollectReader 的 callback
+    """
+
+    def __init__(self, channel: int = None, threshold: int = 0):
+        """
+        Parameters
+        ----------
+        channel : int, optional
+            Line Sync 通道，預設為 COLLECT_LINE_SYNC
+        threshold : int
+            數值大於此值視為高電位
+        """
+        self.channel = COLLECT_LINE_SYNC if channel is None else channel
+        self.threshold = threshold
+        self._condition = threading.Condition()
+        self.reset()
+
+    def reset(self):
+        """清除計數"""
+        with self._condition:
+            self._count = 0
+            self._last_high = False
+            self.last_edge_time = None
+
+    @property
+    def count(self) -> int:
+        """目前的上升緣數"""
+        with self._condition:
+            return self._count
+
+    def feed(self, chunks: Dict[int, np.ndarray]):
+        """
+        加入 Collect 樣本
+
+        Parameters
+        ----------
+        chunks : Dict[int, np.ndarray]
+            通道編號對應的樣本
+        """
+        samples = chunks.get(self.channel)
+        if samples is None or not len(samples):
+            return
+
+        high = np.asarray(samples) > self.threshold
+        with self._condition:
+            # 與上一批最後一個樣本比較，跨批次的邊緣不會遺漏
+            previous = np.concatenate(([self._last_high], high[:-1]))
+            edges = int(np.count_nonzero(high & ~previous))
+            self._last_high = bool(high[-1])
+            if edges:
+                self._count += edges
+                self.last_edge_time = time.monotonic()
+                self._condition.notify_all()
+
+    def wait_for(self, count: int, timeout: Optional[float] = None) -> bool:
+        """
+        等待計數達到 count
+
+        Parameters
+        ----------
+        count : int
+            目標上升緣數
+        timeout : float, optional
+            超時時間（秒）
+
+        Returns
+        -------
+        bool
+            是否在超時前達到
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: self._count >= count, timeout)
+
+
+class CollectReader(threading.Thread):
+    """
+    在背景執行緒持續讀取 Collect 資料串流
+    每次讀取後以 {通道: 數值陣列} 呼叫 callback
+    """
+
+    def __init__(self, callback: Callable[[Dict[int, np.ndarray]], None],
+                 channels: Optional[Iterable[int]] = None,
+                 device: str = r"\\.\SXM", read_size: int = 4200*16*4):
+        """
+        Parameters
+        ----------
+        callback : callable
+            收到資料時呼叫的函數
+        channels : Iterable[int], optional
+            只保留這些通道
+        device : str
+            驅動程式裝置名稱
+        read_size : int
+            每次讀取的位元組數
+        """
+        super().__init__(daemon=True)
+        self.callback = callback
+        self.channels = list(channels) if channels is not None else None
+        self.device = device
+        self.read_size = read_size
+        self._stop_event = threading.Event()
+        self._handle = None
+
+    def _open(self):
+        """開啟驅動程式裝置"""
+        try:
+            from win32 import win32file
+        except ImportError:
+            import win32file
+
+        self._win32file = win32file
+        self._handle = win32file.CreateFile(
+            self.device,
+            win32file.GENERIC_READ,
+            win32file.FILE_SHARE_READ,
+            None,
+            win32file.OPEN_EXISTING,
+            win32file.FILE_ATTRIBUTE_NORMAL,
+            0
+        )
+
+    def run(self):
+        """讀取迴圈"""
+        try:
+            self._open()
+            while not self._stop_event.is_set():
+                status, data = self._win32file.ReadFile(self._handle, self.read_size, None)
+                if status != 0:
+                    print(f"Collect ReadFile returned {status}")
+                if len(data) >= 4:
+                    self.callback(decode_collect(bytes(data), self.channels))
+        except Exception as e:
+            print(f"Collect reader error: {str(e)}")
+        finally:
+            if self._handle is not None:
+                self._handle.Close()
+                self._handle = None
+
+    def stop(self, timeout: float = 1.0):
+        """停止讀取"""
+        self._stop_event.set()
+        self.join(timeout=timeout)
+
+
+class CollectReplay(threading.Thread):
+    """
+    以錄製或合成的 Collect 原始資料取代驅動程式
+    依取樣頻率的實際時間分批呼叫 callback，用於離線測試
+    """
+
+    def __init__(self, buffer: bytes, callback: Callable[[Dict[int, np.ndarray]], None],
+                 channels: Optional[Iterable[int]] = None, freq: float = 10000.0,
+                 chunk_samples: int = 256, on_finish: Optional[Callable[[], None]] = None):
+        """
+        Parameters
+        ----------
+        buffer : bytes
+            Collect 原始資料，如 encode_collect 的結果或錄製的 ReadFile 資料
+        callback : callable
+            收到資料時呼叫的函數
+        channels : Iterable[int], optional
+            只保留這些通道
+        freq : float
+            播放的取樣頻率（Hz），0 表示不等待
+        chunk_samples : int
+            每次呼叫 callback 的樣本數
+        on_finish : callable, optional
+            資料播放完畢（未被 stop 中斷）時呼叫，如模擬 Scan off
+        """
+        super().__init__(daemon=True)
+        self.buffer = bytes(buffer)
+        self.callback = callback
+        self.channels = list(channels) if channels is not None else None
+        self.freq = freq
+        self.chunk_samples = chunk_samples
+        self.on_finish = on_finish
+        self._stop_event = threading.Event()
+        self._running = threading.Event()
+        self._running.set()
+
+    def run(self):
+        """播放迴圈"""
+        chunk_bytes = self.chunk_samples * 4
+        period = self.chunk_samples / self.freq if self.freq else 0.0
+        next_call = time.monotonic()
+        for offset in range(0, len(self.buffer) - 3, chunk_bytes):
+            if not self._running.is_set():
+                # 暫停期間不累積播放時間
+                while not self._running.wait(0.05):
+                    if self._stop_event.is_set():
+                        return
+                next_call = time.monotonic()
+            if self._stop_event.is_set():
+                return
+            self.callback(decode_collect(self.buffer[offset:offset + chunk_bytes], self.channels))
+            next_call += period
+            delay = next_call - time.monotonic()
+            if delay > 0:
+                self._stop_event.wait(delay)
+
+        if self.on_finish is not None and not self._stop_event.is_set():
+            self.on_finish()
+
+    def pause(self):
+        """暫停播放，如模擬 SXM 在 STS 期間暫停掃描"""
+        self._running.clear()
+
+    def resume(self):
+        """繼續播放"""
+        self._running.set()
+
+    def stop(self, timeout: float = 1.0):
+        """停止播放"""
+        self._stop_event.set()
+        self.join(timeout=timeout)
+
+
+class ReplayReaderFactory:
+    """
+    以 CollectReplay 取代 CollectReader 的工廠，可直接指定給控制器的 collect_reader_factory
+    控制器以 (callback, channels=...) 呼叫，最近建立的播放執行緒保存在 replay
+    """
+
+    def __init__(self, buffer: bytes, freq: float = 10000.0,
+                 on_finish: Optional[Callable[[], None]] = None, **kwargs):
+        """
+        Parameters
+        ----------
+        buffer : bytes
+            Collect 原始資料
+        freq : float
+            播放的取樣頻率（Hz）
+        on_finish : callable, optional
+            資料播放完畢時呼叫
+        **kwargs
+            傳給 CollectReplay 的其他參數，如 chunk_samples
+        """
+        self.buffer = buffer
+        self.freq = freq
+        self.on_finish = on_finish
+        self.kwargs = kwargs
+        self.replay: Optional[CollectReplay] = None
+
+    def __call__(self, callback: Callable[[Dict[int, np.ndarray]], None],
+                 channels: Optional[Iterable[int]] = None) -> CollectReplay:
+        self.replay = CollectReplay(self.buffer, callback, channels=channels, freq=self.freq,
+                                    on_finish=self.on_finish, **self.kwargs)
+        return self.replay
@@ -0,0 +1,185 @@
+"""
+SXMPyDrift Module
+以相鄰兩張形貌影像的相位相關（FFT）估計熱漂移速度
+
+流程：
+1. 每張影像先以每行平均值整平、補齊未完成的像素並乘上 Hann 視窗
+2. 以部分白化（除以幅值的平方根）的交叉功率譜反轉換找出位移峰值，並以拋物線內插到次像素；
+   完全白化在平滑表面上會被高頻雜訊主導，部分白化兼顧峰值銳利度與雜訊抑制
+3. 位移換算為掃描座標 (nm)，扣除兩張影像之間掃描中心的移動，再轉換為樣品座標
+4. 除以兩張影像的時間差得到殘餘漂移速度 (nm/s)
+
+影像列索引沿慢軸正方向增加，行索引沿快軸正方向增加。
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+from utils.SXMPyCalc import ScanGeometry
+from utils.SXMPyTransform import FrameTransform
+
+
+def _prepare_frame(frame: np.ndarray) -> np.ndarray:
+    """整平、補齊 NaN 並乘上 Hann 視窗"""
+    data = np.array(frame, dtype=float)
+    finite = np.isfinite(data)
+    if finite.sum() < data.size // 2:
+        raise ValueError("Frame has too few valid pixels")
+
+    data[~finite] = np.mean(data[finite])
+    data -= data.mean(axis=1, keepdims=True)
+    window = np.outer(np.hanning(data.shape[0]), np.hanning(data.shape[1]))
+    return data * window
+
+
+def _subpixel_offset(before: float, peak: float, after: float) -> float:
+    """以三點拋物線內插峰值位置"""
+    denominator = before - 2 * peak + after
+    if denominator == 0:
+        return 0.0
+    return float(np.clip(0.5 * (before - after) / denominator, -0.5, 0.5))
+
+
+def phase_correlation(reference: np.ndarray, image: np.ndarray,
+                      whitening: float = 0.5) -> Tuple[float, float, float]:
+    """
+    以相位相關計算 image 相對於 reference 的位移
+
+    Parameters
+    ----------
+    reference : np.ndarray
+        (rows, cols) 參考影像
+    image : np.ndarray
+        (rows, cols) 目前影像，尺寸須與參考影像相同
+    whitening : float
+        交叉功率譜除以幅值的次方，1為傳統相位相關，0為一般互相關
+
+    Returns
+    -------
+    Tuple[float, float, float]
+        (列位移, 行位移, 峰值)，位移為正表示影像內容往索引增加的方向移動；
+        峰值以完全相同影像為1正規化，越高表示相關越明確
+    """
+    if np.shape(reference) != np.shape(image):
+        raise ValueError(f"Frame shapes differ: {np.shape(reference)} vs {np.shape(image)}")
+
+    cross = np.fft.fft2(_prepare_frame(image)) * np.conj(np.fft.fft2(_prepare_frame(reference)))
+    magnitude = np.abs(cross) + 1e-12
+    correlation = np.real(np.fft.ifft2(cross / magnitude ** whitening))
+    # 完全相同的影像在原點的相關值
+    norm = np.sum(magnitude ** (1 - whitening)) / magnitude.size
+
+    rows, cols = correlation.shape
+    peak_row, peak_col = np.unravel_index(np.argmax(correlation), correlation.shape)
+    peak = correlation[peak_row, peak_col]
+
+    row_offset = _subpixel_offset(correlation[(peak_row - 1) % rows, peak_col], peak,
+                                  correlation[(peak_row + 1) % rows, peak_col])
+    col_offset = _subpixel_offset(correlation[peak_row, (peak_col - 1) % cols], peak,
+                                  correlation[peak_row, (peak_col + 1) % cols])
+
+    # 超過一半尺寸的位移視為負方向
+    shift_row = (peak_row + rows // 2) % rows - rows // 2 + row_offset
+    shift_col = (peak_col + cols // 2) % cols - cols // 2 + col_offset
+    return float(shift_row), float(shift_col), float(peak / norm)
+
+
+class DriftEstimator:
+    """
+    由連續影像估計殘餘漂移速度
+    保留上一張影像作為參考，尺寸或角度不同時重新開始
+    """
+
+    def __init__(self, min_peak: float = 0.2, max_shift: float = 0.25):
+        """
+        Parameters
+        ----------
+        min_peak : float
+            可接受的最低相關峰值，低於此值的結果捨棄
+        max_shift : float
+            可接受的最大位移，以影像尺寸的比例表示
+        """
+        self.min_peak = min_peak
+        self.max_shift = max_shift
+        self.reset()
+
+    def reset(self):
+        """清除參考影像"""
+        self._reference = None
+        self._geometry = None
+        self._timestamp = None
+        self.last_shift = None  # 上一次的殘餘位移 (nm)，樣品座標
+        self.last_peak = None
+        self.last_interval = None  # 上一次估計所用的兩張影像時間 (t_reference, t_frame)
+
+    def _compatible(self, frame: np.ndarray, geometry: ScanGeometry) -> bool:
+        """新影像是否可與參考影像比較"""
+        previous = self._geometry
+        return (self._reference is not None and
+                self._reference.shape == frame.shape and
+                np.isclose(previous.scan_range, geometry.scan_range) and
+                np.isclose(previous.angle, geometry.angle) and
+                np.isclose(previous.aspect_ratio, geometry.aspect_ratio))
+
+    def add_frame(self, frame: np.ndarray, geometry: ScanGeometry,
+                  timestamp: float) -> Optional[np.ndarray]:
+        """
+        加入一張影像並估計與上一張之間的漂移速度
+
+        Parameters
+        ----------
+        frame : np.ndarray
+            (lines, pixels) 形貌影像，未完成的像素為 NaN
+        geometry : ScanGeometry
+            該影像的掃描幾何
+        timestamp : float
+            影像完成的單調時間（秒）
+
+        Returns
+        -------
+        np.ndarray or None
+            樣品座標的殘餘漂移速度 (vx, vy)，單位 nm/s；
+            沒有可比較的參考影像或結果不可靠時為None
+        """
+        frame = np.asarray(frame, dtype=float)
+        try:
+            if not self._compatible(frame, geometry):
+                return None
+
+            dt = timestamp - self._timestamp
+            if dt <= 0:
+                return None
+
+            # 掃描中心的移動（掃描座標，nm）
+            moved = FrameTransform.to_scan_frame(
+                (geometry.center_x, geometry.center_y),
+                self._geometry.center_x, self._geometry.center_y, geometry.angle)[0]
+
+            lines, pixels = frame.shape
+            pixel_size = np.array([geometry.scan_range / pixels,
+                                   geometry.slow_axis_range / lines])
+            if np.any(np.abs(moved) / pixel_size > np.array([pixels, lines]) * self.max_shift):
+                return None
+
+            shift_row, shift_col, peak = phase_correlation(self._reference, frame)
+            self.last_peak = peak
+            if peak < self.min_peak:
+                return None
+
+            # 影像內容的位移 = 漂移 - 視窗移動
+            drift = np.array([shift_col, shift_row]) * pixel_size + moved
+            if np.any(np.abs(drift) / pixel_size > np.array([pixels, lines]) * self.max_shift):
+                return None
+
+            self.last_shift = FrameTransform.to_sample_frame(drift, 0.0, 0.0, geometry.angle)[0]
+            self.last_interval = (self._timestamp, timestamp)
+            return self.last_shift / dt
+
+        except ValueError:
+            return None
+
+        finally:
+            self._reference = frame
+            self._geometry = geometry
+            self._timestamp = timestamp
@@ -0,0 +1,151 @@
+"""
+SXMPyDryRun Module
+在不操作儀器的情況下執行高階量測程序，統計命令與預估時間
+
+1. DryRunClient：取代 DDE 客戶端，記錄每個DDE程式並以記錄的參數回應讀取
+2. DryRunReport：命令數、掃描線、STS點、移動、等待時間與預估總時間
+
+控制器在 dry run 期間以 DryRunClient 取代 MySXM，等待事件立即返回，
+time.sleep 改為累加等待時間，因此程序的控制流程與實際執行相同。
+"""
+
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from utils.SXMPyCalc import ScanGeometry, ScanTimingModel
+
+
+# 每個DDE程式的單一敘述：函式名稱與參數
+_STATEMENT = re.compile(r"^\s*(?:a\s*:=\s*)?(\w+)\s*(?:\((.*)\))?\s*$", re.S)
+_READ = re.compile(r"^\s*a\s*:=\s*(GetScanPara|GetFeedPara)\('(\w+)'\)\s*$")
+_WRITE = re.compile(r"^\s*(ScanPara|FeedPara)\('(\w+)',\s*([^)]+)\)\s*$")
+
+
+@dataclass
+class DryRunReport:
+    """
+    dry run 統計
+
+    commands 以DDE敘述的函式名稱計數，如 GetScanPara、ScanPara、ScanLine、SpectStart
+    """
+    commands: Counter = field(default_factory=Counter)
+    programs: int = 0           # DDE程式數（往返次數）
+    scan_lines: int = 0         # ScanLine 實際掃描行數
+    frames: int = 0             # 完整影像掃描數
+    sts_points: int = 0         # SpectStart 次數
+    moves: int = 0              # 改變掃描中心的程式數
+    sleep_time: float = 0.0     # 固定等待時間（秒）
+    scan_time: float = 0.0      # 掃描時間模型預估的掃描時間（秒）
+    command_time: float = 0.05  # 每個DDE程式的預估往返時間（秒）
+    success: Optional[bool] = None
+
+    @property
+    def predicted_duration(self) -> float:
+        """預估總時間（秒）"""
+        return self.scan_time + self.sleep_time + self.programs * self.command_time
+
+    def as_dict(self) -> dict:
+        """轉換為可序列化的字典"""
+        return {
+            'success': self.success,
+            'commands': dict(self.commands),
+            'programs': self.programs,
+            'scan_lines': self.scan_lines,
+            'frames': self.frames,
+            'sts_points': self.sts_points,
+            'moves': self.moves,
+            'sleep_time': self.sleep_time,
+            'scan_time': self.scan_time,
+            'predicted_duration': self.predicted_duration
+        }
+
+
+class DryRunClient:
+    """
+    記錄命令的 DDE 客戶端替身
+    讀取回應目前記錄的參數值，寫入更新記錄，不送出任何命令
+    """
+
+    def __init__(self, scan: Dict[str, float], feedback: Dict[str, float],
+                 timing_model: ScanTimingModel, report: Optional[DryRunReport] = None):
+        """
+        Parameters
+        ----------
+        scan : Dict[str, float]
+            掃描參數初始值，如 snapshot().scan
+        feedback : Dict[str, float]
+            回饋參數初始值
+        timing_model : ScanTimingModel
+            用於預估掃描時間
+        report : DryRunReport, optional
+            統計結果
+        """
+        self.scan = {k: v for k, v in scan.items() if v is not None}
+        self.feedback = {k: v for k, v in feedback.items() if v is not None}
+        self.timing_model = timing_model
+        self.report = report or DryRunReport()
+        self.LastAnswer = b''
+        self.NotGotAnswer = False
+
+    def _predict(self, lines: float) -> float:
+        """以目前的 Speed 預估掃描時間"""
+        speed = self.scan.get('Speed')
+        if not speed or lines <= 0:
+            return 0.0
+        return self.timing_model.predict(lines, speed)
+
+    def _frame_lines(self) -> int:
+        """目前設定下整張影像的掃描線數"""
+        try:
+            return ScanGeometry.from_scan_params(self.scan).total_lines
+        except (ValueError, TypeError, ZeroDivisionError):
+            return 0
+
+    def SendWait(self, command: str):
+        """記錄一個DDE程式並產生回應"""
+        report = self.report
+        report.programs += 1
+        answers = []
+        moved = False
+        value = 0.0
+
+        for statement in filter(str.strip, command.split(';')):
+            match = _STATEMENT.match(statement)
+            if match is None:
+                continue
+            name, args = match.group(1), match.group(2)
+            report.commands[name] += 1
+
+            read = _READ.match(statement)
+            if read:
+                params = self.scan if read.group(1) == 'GetScanPara' else self.feedback
+                value = params.get(read.group(2), 0.0)
+                continue
+
+            if name == 'Writeln':
+                answers.append(str(value))
+                continue
+
+            write = _WRITE.match(statement)
+            if write:
+                params = self.scan if write.group(1) == 'ScanPara' else self.feedback
+                param, new_value = write.group(2), float(write.group(3))
+                if write.group(1) == 'ScanPara':
+                    if param in ('X', 'Y') and params.get(param) != new_value:
+                        moved = True
+                    if param == 'Scan' and new_value:
+                        report.frames += 1
+                        report.scan_time += self._predict(self._frame_lines())
+                params[param] = new_value
+            elif name == 'ScanLine' and args:
+                lines = int(float(args))
+                report.scan_lines += lines
+                report.scan_time += self._predict(lines)
+            elif name == 'SpectStart':
+                report.sts_points += 1
+
+        if moved:
+            report.moves += 1
+        self.LastAnswer = ("DDE Cmd\r\n" + "".join(f"{a}\r\n" for a in answers)).encode()
@@ -0,0 +1,261 @@
+"""
+SXMPyJournal Module
+以固定長度二進位紀錄保存儀器事件，供事後分析量測效率
+
+檔案格式：
+1. <session>.jrnl：檔頭後接固定長度紀錄（單調時間、系統時間、事件類型、數值、文字位置）
+2. <session>.jstr：紀錄所引用的UTF-8文字（檔名、命令等）
+
+兩個檔案皆只附加寫入，程式中斷時已寫入的紀錄仍可讀取。
+讀取時以 np.fromfile 直接載入為結構化陣列。
+"""
+
+import math
+import struct
+import threading
+import time
+import datetime
+from enum import IntEnum
+from pathlib import Path
+from typing import Optional, Union
+
+import numpy as np
+
+
+class JournalEvent(IntEnum):
+    """事件類型"""
+    SCAN_ON = 1
+    SCAN_OFF = 2
+    SAVE_DONE = 3
+    SPECT_SAVE = 4
+    MIC_STATE = 5
+    COMMAND = 6
+    COMMAND_ERROR = 7
+
+
+# 檔頭：識別字、版本、紀錄長度
+JOURNAL_MAGIC = b'SXMJ'
+JOURNAL_VERSION = 1
+_HEADER = struct.Struct('<4sHH')
+
+# 紀錄：單調時間(s)、系統時間(s)、事件類型、數值、文字位置、文字長度
+_RECORD = struct.Struct('<ddBdqI')
+
+RECORD_DTYPE = np.dtype([
+    ('mono', '<f8'),
+    ('wall', '<f8'),
+    ('kind', 'u1'),
+    ('value', '<f8'),
+    ('text_offset', '<i8'),
+    ('text_length', '<u4')
+])
+assert RECORD_DTYPE.itemsize == _RECORD.size
+
+
+class EventJournal:
+    """
+    只附加寫入的事件紀錄器
+    可由多個執行緒同時呼叫 record
+    """
+
+    def __init__(self, directory: str = "logs/journal", session: Optional[str] = None):
+        """
+        Parameters
+        ----------
+        directory : str
+            紀錄檔存放目錄
+        session : str, optional
+            工作階段名稱，預設為啟動時間
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.session = session or datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+
+        self.record_path = self.directory / f"{self.session}.jrnl"
+        self.text_path = self.directory / f"{self.session}.jstr"
+
+        self._lock = threading.Lock()
+        is_new = not self.record_path.exists() or self.record_path.stat().st_size == 0
+        self._records = open(self.record_path, 'ab')
+        self._texts = open(self.text_path, 'ab')
+        self._text_offset = self._texts.tell()
+
+        if is_new:
+            self._records.write(_HEADER.pack(JOURNAL_MAGIC, JOURNAL_VERSION, _RECORD.size))
+            self._records.flush()
+        else:
+            # 接續既有紀錄前移除中斷寫入的不完整紀錄
+            size = self._records.tell()
+            complete = _HEADER.size + (size - _HEADER.size) // _RECORD.size * _RECORD.size
+            if complete != size:
+                self._records.truncate(complete)
+
+    def record(self, kind: JournalEvent, value: float = math.nan, text: Optional[str] = None):
+        """
+        寫入一筆事件
+
+        Parameters
+        ----------
+        kind : JournalEvent
+            事件類型
+        value : float
+            事件數值，如命令耗時（秒）
+        text : str, optional
+            附加文字，如檔名或命令
+        """
+        mono = time.monotonic()
+        wall = time.time()
+        with self._lock:
+            if self._records.closed:
+                return
+
+            offset, length = -1, 0
+            if text:
+                data = text.encode('utf-8')
+                offset, length = self._text_offset, len(data)
+                self._texts.write(data)
+                self._texts.flush()
+                self._text_offset += length
+
+            self._records.write(_RECORD.pack(mono, wall, int(kind), value, offset, length))
+            self._records.flush()
+
+    def close(self):
+        """關閉紀錄檔"""
+        with self._lock:
+            self._records.close()
+            self._texts.close()
+
+
+class JournalSession:
+    """
+    讀取一個工作階段的紀錄
+    records 為結構化陣列，欄位見 RECORD_DTYPE
+    """
+
+    def __init__(self, record_path: Union[str, Path]):
+        """
+        Parameters
+        ----------
+        record_path : str or Path
+            .jrnl 檔案路徑
+        """
+        self.record_path = Path(record_path)
+        self.text_path = self.record_path.with_suffix('.jstr')
+
+        with open(self.record_path, 'rb') as f:
+            magic, version, record_size = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != JOURNAL_MAGIC or record_size != RECORD_DTYPE.itemsize:
+            raise ValueError(f"Not a journal file: {self.record_path}")
+
+        # 忽略中斷寫入造成的不完整紀錄
+        count = (self.record_path.stat().st_size - _HEADER.size) // record_size
+        self.records = np.fromfile(self.record_path, dtype=RECORD_DTYPE,
+                                   count=count, offset=_HEADER.size)
+        self._text_data = self.text_path.read_bytes() if self.text_path.exists() else b''
+
+    def select(self, kind: JournalEvent) -> np.ndarray:
+        """取得指定類型的紀錄"""
+        return self.records[self.records['kind'] == int(kind)]
+
+    def text(self, record) -> Optional[str]:
+        """取得紀錄附加的文字"""
+        if record['text_offset'] < 0:
+            return None
+        start = int(record['text_offset'])
+        return self._text_data[start:start + int(record['text_length'])].decode('utf-8')
+
+    @property
+    def duration(self) -> float:
+        """第一筆到最後一筆紀錄的時間（秒）"""
+        if len(self.records) < 2:
+            return 0.0
+        return float(self.records['mono'][-1] - self.records['mono'][0])
+
+    def throughput(self, kind: JournalEvent = JournalEvent.SPECT_SAVE) -> float:
+        """
+        事件發生率
+
+        Returns
+        -------
+        float
+            每小時的事件數
+        """
+        duration = self.duration
+        if duration <= 0:
+            return 0.0
+        return len(self.select(kind)) / duration * 3600
+
+    def dead_times(self, kind: JournalEvent = JournalEvent.SPECT_SAVE) -> np.ndarray:
+        """
+        相鄰兩筆同類事件的間隔，如STS點之間的時間
+
+        Returns
+        -------
+        np.ndarray
+            間隔（秒）
+        """
+        return np.diff(self.select(kind)['mono'])
+
+    def scan_intervals(self) -> np.ndarray:
+        """
+        由 Scan on/off 配對出的掃描區間
+
+        Returns
+        -------
+        np.ndarray
+            shape (N, 2)，每列為 (開始, 結束) 單調時間
+        """
+        events = self.records[np.isin(self.records['kind'],
+                                      [JournalEvent.SCAN_ON, JournalEvent.SCAN_OFF])]
+        intervals = []
+        start = None
+        for kind, mono in zip(events['kind'], events['mono']):
+            if kind == JournalEvent.SCAN_ON:
+                start = mono
+            elif start is not None:
+                intervals.append((start, mono))
+                start = None
+        return np.array(intervals, dtype=float).reshape(-1, 2)
+
+    def scan_efficiency(self) -> float:
+        """
+        掃描時間佔整個工作階段的比例
+
+        Returns
+        -------
+        float
+            0到1之間的比例
+        """
+        duration = self.duration
+        if duration <= 0:
+            return 0.0
+        intervals = self.scan_intervals()
+        return float(np.sum(intervals[:, 1] - intervals[:, 0]) / duration)
+
+    def command_times(self) -> np.ndarray:
+        """各命令的耗時（秒）"""
+        return self.select(JournalEvent.COMMAND)['value']
+
+    def summary(self) -> dict:
+        """
+        工作階段統計
+
+        Returns
+        -------
+        dict
+            時間長度、事件數、STS產出率與掃描效率
+        """
+        dead_times = self.dead_times()
+        command_times = self.command_times()
+        return {
+            'duration': self.duration,
+            'records': len(self.records),
+            'scans': len(self.scan_intervals()),
+            'spect_saves': len(self.select(JournalEvent.SPECT_SAVE)),
+            'sts_per_hour': self.throughput(JournalEvent.SPECT_SAVE),
+            'mean_sts_interval': float(dead_times.mean()) if len(dead_times) else None,
+            'scan_efficiency': self.scan_efficiency(),
+            'commands': len(command_times),
+            'command_time': float(command_times.sum())
+        }
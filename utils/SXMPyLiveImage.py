@@ -0,0 +1,320 @@
+"""
+SXMPyLiveImage Module
+掃描進行中逐行組合形貌影像
+
+資料來源：
+1. Collect 資料串流：以 ScanLine 事件切分樣本，每完成一行即重新取樣為一列；
+   ScanLine 事件以 lossless 監聽取得，不受事件佇列 coalesce 影響，
+   行號不連續時跳過的行計入 missed_lines
+2. 存檔後的影像：以 load_saved_image 讀取，或以 load_rows / fill_from_file 一次填入
+
+每完成一列即通知訂閱者 (row_index, row, direction)，GUI 與漂移分析可在掃描中取得資料。
+列索引沿慢軸正方向增加，下掃影像的第1行位於最後一列。
+"""
+
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from utils.SXMPyCalc import ScanGeometry
+from utils.SXMPyCollect import COLLECT_Z_FAST
+
+
+def _read_parameter_file(path: Path) -> Tuple[dict, List[dict]]:
+    """
+    解析 SXM 的參數檔（"名稱 : 數值" 格式）
+
+    Returns
+    -------
+    Tuple[dict, List[dict]]
+        (標頭參數, FileDescBegin/FileDescEnd 區塊列表)
+    """
+    header, blocks, block = {}, [], None
+    for line in path.read_text(encoding='latin-1').splitlines():
+        line = line.strip()
+        if line == 'FileDescBegin':
+            block = {}
+        elif line == 'FileDescEnd':
+            if block is not None:
+                blocks.append(block)
+            block = None
+        elif ':' in line:
+            key, value = (part.strip() for part in line.split(':', 1))
+            (block if block is not None else header)[key] = value
+    return header, blocks
+
+
+def load_saved_image(path: str, shape: Optional[Tuple[int, int]] = None,
+                     caption: str = 'topo') -> np.ndarray:
+    """
+    讀取 SXM 存檔的影像
+
+    支援三種格式：
+    1. 參數檔 (.txt)：以 FileDesc 區塊中 FileName 或 Caption 含 caption 的第一個
+       .int 檔為資料，影像大小取自 xPixel/yPixel，數值乘上 Scale
+    2. .int 原始資料：little-endian int32，須提供 shape
+    3. 其他文字格式匯出：以 np.loadtxt 讀取
+
+    第一列為慢軸起點，與 LiveImageBuilder 的列順序相同。
+
+    Parameters
+    ----------
+    path : str
+        save_done 事件回報的檔案路徑
+    shape : Tuple[int, int], optional
+        (lines, pixels)，參數檔沒有記錄大小時使用
+    caption : str
+        選擇資料檔的關鍵字（不分大小寫）
+
+    Returns
+    -------
+    np.ndarray
+        (lines, pixels) 影像
+
+    Raises
+    ------
+    ValueError
+        找不到資料或大小不符時
+    """
+    path = Path(path)
+    scale = 1.0
+    if path.suffix.lower() == '.txt' and 'FileDescBegin' in path.read_text(encoding='latin-1'):
+        header, blocks = _read_parameter_file(path)
+        keyword = caption.lower()
+        block = next((b for b in blocks
+                      if keyword in b.get('FileName', '').lower()
+                      or keyword in b.get('Caption', '').lower()), None)
+        if block is None:
+            raise ValueError(f"No '{caption}' data file described in {path}")
+        if 'xPixel' in header and 'yPixel' in header:
+            shape = (int(float(header['yPixel'])), int(float(header['xPixel'])))
+        scale = float(block.get('Scale', 1.0))
+        path = path.with_name(block['FileName'])
+
+    if path.suffix.lower() != '.int':
+        return np.atleast_2d(np.loadtxt(path))
+
+    if shape is None:
+        raise ValueError(f"Image size unknown for {path}")
+    data = np.fromfile(path, dtype='<i4')
+    if data.size != shape[0] * shape[1]:
+        raise ValueError(f"{path} has {data.size} values, expected {shape[0]}x{shape[1]}")
+    return data.reshape(shape).astype(float) * scale
+
+
+class LiveImageBuilder:
+    """
+    依掃描幾何預先配置影像陣列，並逐列填入
+    未完成的像素為 NaN
+    """
+
+    def __init__(self, geometry: ScanGeometry, channel: int = COLLECT_Z_FAST,
+                 trace_directions: Iterable[str] = ('forward', 'up', 'down')):
+        """
+        Parameters
+        ----------
+        geometry : ScanGeometry
+            掃描幾何，決定影像的列數與像素數
+        channel : int
+            使用的 Collect 通道
+        trace_directions : Iterable[str]
+            要組合的掃描方向，其他方向（如 backward）的樣本會被捨棄
+        """
+        self.geometry = geometry
+        self.channel = channel
+        self.trace_directions = set(trace_directions)
+
+        self.lines = geometry.total_lines
+        self.pixels = geometry.pixels
+        self.frame = np.full((self.lines, self.pixels), np.nan, dtype=np.float32)
+        self.filled = np.zeros(self.lines, dtype=bool)
+        self.missed_lines = 0
+
+        self._samples: List[np.ndarray] = []
+        self._current = None  # (direction, line_number)
+        self._last_line = None  # 上一個 ScanLine 事件的行號，用於偵測遺漏
+        self._lock = threading.Lock()
+        self._subscribers: List[Callable] = []
+
+    # ========== 訂閱 ========== #
+    def subscribe(self, callback: Callable[[int, np.ndarray, Optional[str]], None]):
+        """
+        訂閱列更新
+
+        Parameters
+        ----------
+        callback : callable
+            以 (row_index, row, direction) 呼叫
+        """
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable):
+        """取消訂閱"""
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def _publish(self, row_index: int, row: np.ndarray, direction: Optional[str]):
+        for callback in list(self._subscribers):
+            try:
+                callback(row_index, row, direction)
+            except Exception as e:
+                print(f"Live image subscriber error: {str(e)}")
+
+    # ========== 控制器事件 ========== #
+    def attach(self, controller):
+        """
+        以 lossless 監聽連接控制器的 ScanLine 與 Scan off 事件
+        兩者都在回調執行緒中依到達順序處理，行的邊界不會因事件佇列延遲而合併
+
+        Parameters
+        ----------
+        controller : SXMEventHandler
+            控制器
+        """
+        controller.add_event_listener('scan_line', self.on_scan_line, lossless=True)
+        controller.add_event_listener('scan_off', self.on_scan_off, lossless=True)
+
+    def detach(self, controller):
+        """中斷與控制器事件的連接"""
+        controller.remove_event_listener('scan_line', self.on_scan_line)
+        controller.remove_event_listener('scan_off', self.on_scan_off)
+
+    def on_scan_line(self, data: dict):
+        """ScanLine 事件：結束上一行並開始累積新的一行"""
+        line_number = data.get('line_number')
+        if line_number is None:
+            return
+        direction = data.get('direction')
+
+        with self._lock:
+            previous = self._last_line
+            # 行號依掃描方向遞增或遞減，相差超過1表示中間有行沒有收到
+            if previous is not None and abs(line_number - previous) > 1:
+                # 跳過的行沒有邊界，累積的樣本跨越多行，捨棄
+                self.missed_lines += abs(line_number - previous)
+                self._samples = []
+                self._current = None
+            finished = self._finish_line()
+            self._current = (direction, line_number)
+            self._last_line = line_number
+
+        if finished:
+            self._publish(*finished)
+
+    def on_scan_off(self, data: dict = None):
+        """Scan off 事件：結束最後一行"""
+        with self._lock:
+            finished = self._finish_line()
+            self._current = None
+            self._last_line = None
+
+        if finished:
+            self._publish(*finished)
+
+    # ========== 資料輸入 ========== #
+    def feed(self, chunks: Dict[int, np.ndarray]):
+        """
+        加入 Collect 樣本，供 CollectReader 的 callback 使用
+
+        Parameters
+        ----------
+        chunks : Dict[int, np.ndarray]
+            通道編號對應的樣本
+        """
+        samples = chunks.get(self.channel)
+        if samples is None or not len(samples):
+            return
+        with self._lock:
+            if self._current is not None:
+                self._samples.append(samples)
+
+    def _finish_line(self):
+        """將累積的樣本重新取樣為一列，需在鎖內呼叫"""
+        if self._current is None:
+            return None
+
+        direction, line_number = self._current
+        samples = np.concatenate(self._samples) if self._samples else np.empty(0)
+        self._samples = []
+
+        if direction is not None and direction not in self.trace_directions:
+            return None
+
+        row_index = self.lines - line_number if direction == 'down' else line_number - 1
+        if not 0 <= row_index < self.lines:
+            return None
+        if len(samples) < 2:
+            self.missed_lines += 1
+            return None
+
+        row = self._resample(samples)
+        self.frame[row_index] = row
+        self.filled[row_index] = True
+        return row_index, row, direction
+
+    def _resample(self, samples: np.ndarray) -> np.ndarray:
+        """將一行的樣本線性內插為影像像素數"""
+        positions = np.linspace(0, len(samples) - 1, self.pixels)
+        return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+    def set_row(self, row_index: int, values: np.ndarray, direction: Optional[str] = None):
+        """
+        直接填入一列
+
+        Parameters
+        ----------
+        row_index : int
+            列索引
+        values : np.ndarray
+            該列數值，長度不同時重新取樣
+        direction : str, optional
+            掃描方向
+        """
+        values = np.asarray(values, dtype=np.float32)
+        if len(values) != self.pixels:
+            values = self._resample(values)
+        with self._lock:
+            self.frame[row_index] = values
+            self.filled[row_index] = True
+        self._publish(row_index, values, direction)
+
+    def load_rows(self, data: np.ndarray, start_row: int = 0):
+        """
+        由已存檔的影像填入多列
+
+        Parameters
+        ----------
+        data : np.ndarray
+            shape (rows, pixels) 的影像資料
+        start_row : int
+            起始列索引
+        """
+        data = np.atleast_2d(data)
+        for offset, row in enumerate(data[:self.lines - start_row]):
+            self.set_row(start_row + offset, row)
+
+    def fill_from_file(self, path: str, **loadtxt_kwargs):
+        """
+        由文字格式匯出的影像檔填入
+
+        Parameters
+        ----------
+        path : str
+            影像檔路徑
+        **loadtxt_kwargs
+            傳給 np.loadtxt 的參數，如 skiprows
+        """
+        self.load_rows(np.loadtxt(path, **loadtxt_kwargs))
+
+    # ========== 狀態 ========== #
+    @property
+    def progress(self) -> float:
+        """已完成列數的比例"""
+        return float(self.filled.sum()) / self.lines if self.lines else 0.0
+
+    def snapshot(self) -> np.ndarray:
+        """取得目前影像的複本"""
+        with self._lock:
+            return self.frame.copy()
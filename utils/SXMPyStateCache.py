@@ -0,0 +1,142 @@
+"""
+SXMPyStateCache Module
+跨工作階段保存最後已知的儀器狀態，讓程式啟動與重新連線時可以立即顯示
+
+保存內容：
+1. 掃描幾何 (ScanGeometry)
+2. 光譜參數 (SpectPara 寫入紀錄)
+3. 回饋狀態
+4. SMU compliance
+5. STS 腳本索引
+
+快取值只作為顯示與預設值使用，真實狀態由控制器以一次批次讀取重新驗證。
+"""
+
+import os
+import json
+import time
+import threading
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from utils.SXMPyCalc import ScanGeometry
+
+
+class StateCache:
+    """
+    最後已知狀態的本地儲存
+    以JSON檔保存，寫入時先寫暫存檔再取代，避免中途中斷造成檔案損毀
+    """
+
+    def __init__(self, path: str = "cache/sxm_state.json"):
+        """
+        Parameters
+        ----------
+        path : str
+            快取檔案路徑
+        """
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._data: Dict[str, Any] = {}
+        self.load()
+
+    def load(self) -> Dict[str, Any]:
+        """
+        從檔案載入快取，檔案不存在或損毀時回傳空快取
+
+        Returns
+        -------
+        Dict[str, Any]
+            快取內容
+        """
+        with self._lock:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._data = json.load(f)
+            except (OSError, ValueError):
+                self._data = {}
+            return dict(self._data)
+
+    def save(self) -> bool:
+        """
+        將快取寫入檔案
+
+        Returns
+        -------
+        bool
+            是否寫入成功
+        """
+        with self._lock:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = self.path.with_suffix(self.path.suffix + '.tmp')
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self._data, f, indent=4)
+                os.replace(tmp_path, self.path)
+                return True
+            except OSError as e:
+                print(f"State cache save error: {str(e)}")
+                return False
+
+    def _set(self, key: str, value: Any):
+        """更新單一區段並記錄時間"""
+        with self._lock:
+            self._data[key] = value
+            self._data['timestamp'] = time.time()
+
+    @property
+    def timestamp(self) -> Optional[float]:
+        """最後更新時間"""
+        return self._data.get('timestamp')
+
+    # ========== 掃描幾何 ========== #
+    def set_geometry(self, geometry: ScanGeometry):
+        """記錄掃描幾何"""
+        self._set('geometry', asdict(geometry))
+
+    def get_geometry(self) -> Optional[ScanGeometry]:
+        """取得快取的掃描幾何，沒有或格式不符時回傳None"""
+        data = self._data.get('geometry')
+        if not data:
+            return None
+        try:
+            return ScanGeometry(**data)
+        except TypeError:
+            return None
+
+    # ========== 光譜參數 ========== #
+    def set_spect_state(self, spect_state: Dict[Any, Any]):
+        """記錄光譜參數，以[鍵, 值]列表保存以保留整數編號"""
+        self._set('spect', [[key, value] for key, value in spect_state.items()])
+
+    def get_spect_state(self) -> Dict[Any, Any]:
+        """取得快取的光譜參數"""
+        return {key: value for key, value in self._data.get('spect', [])}
+
+    # ========== 回饋狀態 ========== #
+    def set_feedback_state(self, state):
+        """記錄回饋開關狀態"""
+        self._set('feedback_enable', state)
+
+    def get_feedback_state(self):
+        """取得快取的回饋開關狀態"""
+        return self._data.get('feedback_enable')
+
+    # ========== SMU compliance ========== #
+    def set_compliance(self, compliance: Dict[int, float]):
+        """記錄各通道的compliance值"""
+        self._set('compliance', {str(ch): value for ch, value in compliance.items()})
+
+    def get_compliance(self) -> Dict[int, float]:
+        """取得快取的compliance值"""
+        return {int(ch): value for ch, value in self._data.get('compliance', {}).items()}
+
+    # ========== STS 腳本索引 ========== #
+    def set_script_index(self, names: List[str]):
+        """記錄STS腳本名稱列表"""
+        self._set('script_index', sorted(names))
+
+    def get_script_index(self) -> List[str]:
+        """取得快取的STS腳本名稱列表"""
+        return list(self._data.get('script_index', []))
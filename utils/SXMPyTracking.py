@@ -0,0 +1,136 @@
+"""
+SXMPyTracking Module
+長時間定點光譜量測的原子追蹤（atom tracking）
+
+在目標周圍以小範圍的探針移動量測形貌高度，沿每個軸取中心與正負兩點：
+1. 曲率符合特徵（凸起的原子或凹陷的缺陷）時，以拋物線頂點一步移到極值位置
+2. 否則往較高（或較低）的一側移動一個探測半徑
+每次修正限制在探測半徑內，單次追蹤的偏移超過 max_offset 時視為失去目標而捨棄結果。
+
+高度讀值由呼叫端提供 probe(x, y)，與儀器無關，可用合成表面測試。
+"""
+
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+
+
+class AtomTracker:
+    """
+    以局部梯度搜尋將量測位置重新對準特徵中心
+    """
+
+    def __init__(self, radius: float = 0.1, iterations: int = 3, feature: str = 'max',
+                 max_offset: float = 1.0, tolerance: float = 0.005, dwell: float = 0.02):
+        """
+        Parameters
+        ----------
+        radius : float
+            探測點與中心的距離 (nm)，也是每次修正的上限
+        iterations : int
+            每次追蹤的最大搜尋次數
+        feature : str
+            'max' 追蹤高點（原子、吸附物），'min' 追蹤低點（缺陷、空位）
+        max_offset : float
+            單次追蹤相對起始位置的最大偏移 (nm)
+        tolerance : float
+            修正量小於此值即停止搜尋 (nm)
+        dwell : float
+            每次移動探針後讀取高度前的等待時間（秒）
+        """
+        if radius <= 0:
+            raise ValueError(f"Tracking radius must be positive: {radius}")
+        if feature not in ('max', 'min'):
+            raise ValueError(f"Unknown tracking feature: {feature}")
+        if iterations < 1:
+            raise ValueError(f"iterations must be at least 1: {iterations}")
+
+        self.radius = radius
+        self.iterations = iterations
+        self.feature = feature
+        self.max_offset = max_offset
+        self.tolerance = tolerance
+        self.dwell = dwell
+
+    def _axis_step(self, minus: float, center: float, plus: float) -> float:
+        """
+        由單一軸上的三點高度計算修正量（以探測半徑為單位）
+
+        Returns
+        -------
+        float
+            -1 到 1 之間的修正量
+        """
+        sign = 1.0 if self.feature == 'max' else -1.0
+        slope = sign * (plus - minus) / 2
+        curvature = sign * (plus - 2 * center + minus)
+        if curvature < 0:
+            # 拋物線頂點
+            return float(np.clip(-slope / curvature, -1.0, 1.0))
+        if slope == 0:
+            return 0.0
+        return float(np.sign(slope))
+
+    def step(self, probe: Callable[[float, float], float],
+             x: float, y: float) -> Tuple[float, float]:
+        """
+        以五點量測計算一次修正
+
+        Parameters
+        ----------
+        probe : callable
+            probe(x, y) 回傳該位置的高度
+        x, y : float
+            目前位置 (nm)
+
+        Returns
+        -------
+        Tuple[float, float]
+            修正量 (dx, dy) (nm)
+        """
+        r = self.radius
+        center = probe(x, y)
+        dx = self._axis_step(probe(x - r, y), center, probe(x + r, y))
+        dy = self._axis_step(probe(x, y - r), center, probe(x, y + r))
+        return dx * r, dy * r
+
+    def locate(self, probe: Callable[[float, float], float], x: float, y: float,
+               origin: Optional[Tuple[float, float]] = None) -> Optional[Tuple[float, float]]:
+        """
+        從 (x, y) 開始搜尋特徵中心
+
+        Parameters
+        ----------
+        probe : callable
+            probe(x, y) 回傳該位置的高度，讀取失敗時回傳None
+        x, y : float
+            起始位置 (nm)
+        origin : Tuple[float, float], optional
+            計算偏移上限的基準位置，預設為起始位置
+
+        Returns
+        -------
+        Tuple[float, float] or None
+            特徵中心 (nm)；讀取失敗或偏移超過 max_offset 時為None
+        """
+        origin = np.array(origin if origin is not None else (x, y), dtype=float)
+        position = np.array([x, y], dtype=float)
+
+        def checked_probe(px, py):
+            value = probe(px, py)
+            if value is None or not np.isfinite(value):
+                raise ValueError(f"Invalid height reading at ({px:.3f}, {py:.3f})")
+            return value
+
+        try:
+            for _ in range(self.iterations):
+                correction = np.array(self.step(checked_probe, *position))
+                position += correction
+                if np.linalg.norm(position - origin) > self.max_offset:
+                    return None
+                if np.linalg.norm(correction) < self.tolerance:
+                    break
+        except ValueError:
+            return None
+
+        return float(position[0]), float(position[1])
@@ -0,0 +1,445 @@
+"""
+SXMPyTransform Module
+掃描座標轉換的共用 NumPy 核心
+
+座標慣例：
+1. 樣品座標 (x, y)：SXM 的 X/Y 掃描參數所用的座標 (nm)
+2. 掃描座標 (fast, slow)：以掃描中心為原點，快軸與 x 軸夾角為掃描角度（逆時針為正）
+3. 所有函數都處理 (N, 2) 陣列，點以列向量表示，旋轉寫成 points @ rotation_matrix(angle)
+
+移動方向 R/L/U/D 分別為掃描座標的 +fast、-fast、+slow、-slow。
+
+移動序列可使用 MoveScript 的簡易語法（見 MoveScript.compile），
+如 "(9R U 9L U)x5" 或 "S10x10"；只含 RLUD 的舊序列意義不變。
+"""
+
+import re
+from functools import lru_cache
+from typing import Iterable, Sequence, Tuple
+
+import numpy as np
+
+
+# 移動方向在掃描座標中的單位向量
+MOVE_DIRECTIONS = {
+    'R': (1.0, 0.0),
+    'L': (-1.0, 0.0),
+    'U': (0.0, 1.0),
+    'D': (0.0, -1.0),
+}
+
+# 以字元編碼查表，一次轉換整個移動序列；未定義的字元為 NaN
+_MOVE_TABLE = np.full((256, 2), np.nan)
+for _direction, _vector in MOVE_DIRECTIONS.items():
+    _MOVE_TABLE[ord(_direction)] = _vector
+
+
+# 反方向
+_OPPOSITE = {'R': 'L', 'L': 'R', 'U': 'D', 'D': 'U'}
+
+# 只含方向字元的序列
+_PLAIN = re.compile(r"[RLUDrlud]*")
+
+# 移動語法的記號：蛇形、數字、方向、括號與重複、空白與逗號
+_TOKEN = re.compile(
+    r"\s*(?:(?P<serpentine>[Ss](?P<columns>\d+)[xX](?P<rows>\d+)(?::(?P<axes>[RLUDrlud]{2}))?)"
+    r"|(?P<count>\d+)|(?P<direction>[RLUDrlud])|(?P<open>\()|(?P<close>\))"
+    r"|(?P<repeat>[xX]\s*(?P<times>\d+))|(?P<separator>,))")
+
+
+class MoveScript:
+    """
+    移動序列的簡易語法，編譯為方向字元編碼的陣列
+
+    語法：
+    1. 方向 R/L/U/D，前面可加次數，如 "10R"
+    2. 群組 "(...)"，後面以 "xN" 重複或前面加次數，如 "(10R U 10L U)x10"、"3(RU)"
+    3. 蛇形 "S<點數>x<行數>"，如 "S10x5" 走訪 10x5 個位置：
+       先沿 R 走 9 步、U 一步、沿 L 走 9 步……；可用 ":LD" 指定行方向與換行方向
+    空白與逗號只用於分隔，大小寫不拘。
+    """
+
+    max_steps = 10_000_000  # 展開後的最大步數
+
+    @staticmethod
+    def _check_length(length: int):
+        """展開前檢查步數，避免配置過大的陣列"""
+        if length > MoveScript.max_steps:
+            raise ValueError(f"Movement script expands beyond {MoveScript.max_steps} steps")
+
+    @staticmethod
+    def _codes(direction: str, count: int = 1) -> np.ndarray:
+        MoveScript._check_length(count)
+        return np.full(count, ord(direction.upper()), dtype=np.uint8)
+
+    @staticmethod
+    def serpentine(columns: int, rows: int, axes: str = 'RU') -> np.ndarray:
+        """
+        蛇形走訪 columns x rows 個位置的移動編碼
+
+        Parameters
+        ----------
+        columns : int
+            每行的位置數
+        rows : int
+            行數
+        axes : str
+            行方向與換行方向，如 'RU'
+
+        Returns
+        -------
+        np.ndarray
+            方向字元編碼 (uint8)
+        """
+        line, turn = axes.upper()
+        if columns < 1 or rows < 1:
+            raise ValueError(f"Invalid serpentine size: {columns}x{rows}")
+        if line in 'RL' and turn in 'RL' or line in 'UD' and turn in 'UD':
+            raise ValueError(f"Serpentine axes must be perpendicular: {axes}")
+
+        MoveScript._check_length(columns * rows)
+        forward = MoveScript._codes(line, columns - 1)
+        backward = MoveScript._codes(_OPPOSITE[line], columns - 1)
+        step = MoveScript._codes(turn)
+        pair = np.concatenate((forward, step, backward, step))
+        codes = np.tile(pair, (rows + 1) // 2)
+        # 去掉最後多出的一行與換行
+        length = rows * (columns - 1) + (rows - 1)
+        return codes[:length]
+
+    @staticmethod
+    @lru_cache(maxsize=16)
+    def _compile(script: str) -> np.ndarray:
+        # 只含方向字元的舊序列直接查表
+        if _PLAIN.fullmatch(script):
+            codes = np.frombuffer(script.upper().encode('ascii'), dtype=np.uint8).copy()
+            codes.setflags(write=False)
+            return codes
+
+        tokens = []
+        position = 0
+        while position < len(script):
+            match = _TOKEN.match(script, position)
+            if match is None or match.end() == position:
+                if script[position:].strip() == '':
+                    break
+                unknown = script[position:].lstrip()[0]
+                raise ValueError(f"Unknown direction: {unknown}")
+            position = match.end()
+            if match.group('separator') is None:
+                tokens.append(match)
+
+        stack = [[]]      # 每層群組已編譯的片段
+        lengths = [0]     # 每層群組目前的步數
+        counts = [None]   # 每層群組前的次數
+        pending = None    # 尚未使用的次數
+        for token in tokens:
+            if token.group('count') is not None:
+                if pending is not None:
+                    raise ValueError(f"Unexpected count: {token.group('count')}")
+                pending = int(token.group('count'))
+            elif token.group('direction') is not None:
+                part = MoveScript._codes(token.group('direction'), 1 if pending is None else pending)
+                stack[-1].append(part)
+                lengths[-1] += len(part)
+                pending = None
+            elif token.group('serpentine') is not None:
+                if pending is not None:
+                    raise ValueError("A count cannot precede a serpentine")
+                part = MoveScript.serpentine(
+                    int(token.group('columns')), int(token.group('rows')),
+                    token.group('axes') or 'RU')
+                stack[-1].append(part)
+                lengths[-1] += len(part)
+            elif token.group('open') is not None:
+                stack.append([])
+                lengths.append(0)
+                counts.append(pending)
+                pending = None
+            elif token.group('close') is not None:
+                if len(stack) == 1:
+                    raise ValueError("Unbalanced ')' in movement script")
+                if pending is not None:
+                    raise ValueError("A count must precede a direction or group")
+                group = stack.pop()
+                times = counts.pop()
+                times = 1 if times is None else times
+                MoveScript._check_length(lengths.pop() * times)
+                body = np.concatenate(group) if group else np.empty(0, dtype=np.uint8)
+                stack[-1].append(np.tile(body, times))
+                lengths[-1] += len(body) * times
+            else:
+                # 重複前一個片段
+                if pending is not None or not stack[-1]:
+                    raise ValueError("'x' must follow a direction or group")
+                times = int(token.group('times'))
+                last = len(stack[-1][-1])
+                MoveScript._check_length(last * times)
+                stack[-1][-1] = np.tile(stack[-1][-1], times)
+                lengths[-1] += last * (times - 1)
+
+            MoveScript._check_length(lengths[-1])
+
+        if len(stack) > 1:
+            raise ValueError("Unbalanced '(' in movement script")
+        if pending is not None:
+            raise ValueError("A count must precede a direction or group")
+
+        codes = np.concatenate(stack[0]) if stack[0] else np.empty(0, dtype=np.uint8)
+        codes.setflags(write=False)
+        return codes
+
+    @staticmethod
+    def compile(script: Iterable[str]) -> np.ndarray:
+        """
+        將移動序列編譯為方向字元編碼
+
+        Parameters
+        ----------
+        script : Iterable[str]
+            移動序列，如 "RULD"、"(10R U 10L U)x10" 或方向字元列表
+
+        Returns
+        -------
+        np.ndarray
+            方向字元編碼 (uint8，唯讀)，每個元素為一步
+        """
+        if not isinstance(script, str):
+            script = ''.join(script)
+        return MoveScript._compile(script)
+
+    @staticmethod
+    def expand(script: Iterable[str]) -> str:
+        """展開為每步一個字元的序列"""
+        return MoveScript.compile(script).tobytes().decode('ascii')
+
+
+class FrameTransform:
+    """樣品座標與掃描座標之間的向量化轉換"""
+
+    @staticmethod
+    def as_points(points) -> np.ndarray:
+        """
+        轉換為 (N, 2) 浮點陣列
+
+        Parameters
+        ----------
+        points : array_like
+            單一點 (x, y) 或點列表
+
+        Returns
+        -------
+        np.ndarray
+            (N, 2) 陣列
+        """
+        return np.asarray(points, dtype=float).reshape(-1, 2)
+
+    @staticmethod
+    def rotation_matrix(angle: float) -> np.ndarray:
+        """
+        逆時針旋轉 angle 度的列向量旋轉矩陣
+
+        第一列為快軸 (cos, sin)，第二列為慢軸 (-sin, cos)
+
+        Parameters
+        ----------
+        angle : float
+            旋轉角度（度）
+
+        Returns
+        -------
+        np.ndarray
+            2x2 矩陣，以 points @ matrix 旋轉
+        """
+        angle_rad = np.radians(angle)
+        cos_angle, sin_angle = np.cos(angle_rad), np.sin(angle_rad)
+        return np.array([[cos_angle, sin_angle],
+                         [-sin_angle, cos_angle]])
+
+    @staticmethod
+    def rotate(points, angle: float, center: Sequence[float] = (0.0, 0.0)) -> np.ndarray:
+        """
+        繞 center 逆時針旋轉
+
+        Parameters
+        ----------
+        points : array_like
+            (N, 2) 座標
+        angle : float
+            旋轉角度（度）
+        center : Sequence[float]
+            旋轉中心 (x, y)
+
+        Returns
+        -------
+        np.ndarray
+            (N, 2) 旋轉後的座標
+        """
+        center = np.asarray(center, dtype=float)
+        return (FrameTransform.as_points(points) - center) @ \
+            FrameTransform.rotation_matrix(angle) + center
+
+    @staticmethod
+    def translate(points, offset: Sequence[float]) -> np.ndarray:
+        """
+        平移座標
+
+        Parameters
+        ----------
+        points : array_like
+            (N, 2) 座標
+        offset : Sequence[float]
+            平移量 (dx, dy)，或與 points 同形狀的陣列
+
+        Returns
+        -------
+        np.ndarray
+            (N, 2) 平移後的座標
+        """
+        return FrameTransform.as_points(points) + np.asarray(offset, dtype=float)
+
+    @staticmethod
+    def to_scan_frame(points, center_x: float, center_y: float, angle: float) -> np.ndarray:
+        """
+        樣品座標轉換為掃描座標
+
+        Parameters
+        ----------
+        points : array_like
+            (N, 2) 樣品座標 (nm)
+        center_x, center_y : float
+            掃描中心 (nm)
+        angle : float
+            掃描角度（度）
+
+        Returns
+        -------
+        np.ndarray
+            (N, 2) 以掃描中心為原點的 (快軸, 慢軸) 座標
+        """
+        shifted = FrameTransform.as_points(points) - np.array([center_x, center_y])
+        return shifted @ FrameTransform.rotation_matrix(angle).T
+
+    @staticmethod
+    def to_sample_frame(window, center_x: float, center_y: float, angle: float) -> np.ndarray:
+        """
+        掃描座標轉換為樣品座標，為 to_scan_frame 的反轉換
+
+        Parameters
+        ----------
+        window : array_like
+            (N, 2) 以掃描中心為原點的 (快軸, 慢軸) 座標
+        center_x, center_y : float
+            掃描中心 (nm)
+        angle : float
+            掃描角度（度）
+
+        Returns
+        -------
+        np.ndarray
+            (N, 2) 樣品座標 (nm)
+        """
+        return FrameTransform.as_points(window) @ FrameTransform.rotation_matrix(angle) + \
+            np.array([center_x, center_y])
+
+    @staticmethod
+    def clamp_box(points, half_x: float, half_y: float,
+                  center: Sequence[float] = (0.0, 0.0)) -> np.ndarray:
+        """
+        將座標限制在與座標軸平行的矩形內
+
+        Parameters
+        ----------
+        points : array_like
+            (N, 2) 座標
+        half_x, half_y : float
+            矩形的半寬與半高
+        center : Sequence[float]
+            矩形中心
+
+        Returns
+        -------
+        np.ndarray
+            (N, 2) 限制後的座標
+        """
+        center = np.asarray(center, dtype=float)
+        half = np.array([half_x, half_y])
+        return np.clip(FrameTransform.as_points(points), center - half, center + half)
+
+    @staticmethod
+    def clamp_to_window(points, center_x: float, center_y: float, scan_range: float,
+                        angle: float = 0.0, aspect_ratio: float = 1.0) -> np.ndarray:
+        """
+        將樣品座標限制在旋轉後的掃描視窗內
+
+        Parameters
+        ----------
+        points : array_like
+            (N, 2) 樣品座標 (nm)
+        center_x, center_y : float
+            掃描中心 (nm)
+        scan_range : float
+            快軸掃描範圍 (nm)
+        angle : float
+            掃描角度（度）
+        aspect_ratio : float
+            影像長寬比
+
+        Returns
+        -------
+        np.ndarray
+            (N, 2) 限制後的樣品座標
+        """
+        window = FrameTransform.to_scan_frame(points, center_x, center_y, angle)
+        window = FrameTransform.clamp_box(window, scan_range / 2, scan_range / aspect_ratio / 2)
+        return FrameTransform.to_sample_frame(window, center_x, center_y, angle)
+
+    @staticmethod
+    def movement_vectors(directions: Iterable[str], distance, angle: float) -> np.ndarray:
+        """
+        將移動方向序列轉換為樣品座標的位移
+
+        Parameters
+        ----------
+        directions : Iterable[str]
+            移動序列，如 "RULD" 或 "(10R U 10L U)x10"，語法見 MoveScript
+        distance : float or Tuple[float, float]
+            每次移動的距離 (nm)；(快軸, 慢軸) 時 R/L 與 U/D 使用各自的距離
+        angle : float
+            掃描角度（度）
+
+        Returns
+        -------
+        np.ndarray
+            (N, 2) 每一步的 (dx, dy)
+        """
+        distance = np.asarray(distance, dtype=float)
+        if distance.shape not in ((), (2,)):
+            raise ValueError(f"distance must be a number or a (fast, slow) pair: {distance.tolist()}")
+        steps = _MOVE_TABLE[MoveScript.compile(directions)]
+        return steps * distance @ FrameTransform.rotation_matrix(angle)
+
+    @staticmethod
+    def path_from_moves(directions: Iterable[str], distance,
+                        start: Tuple[float, float], angle: float) -> np.ndarray:
+        """
+        由移動方向序列計算所有位置（包含起始位置）
+
+        Parameters
+        ----------
+        directions : Iterable[str]
+            移動序列，如 "RULD" 或 "S20x20"，語法見 MoveScript
+        distance : float or Tuple[float, float]
+            每次移動的距離 (nm)；(快軸, 慢軸) 時 R/L 與 U/D 使用各自的距離
+        start : Tuple[float, float]
+            起始位置 (nm)
+        angle : float
+            掃描角度（度）
+
+        Returns
+        -------
+        np.ndarray
+            (N+1, 2) 位置
+        """
+        steps = FrameTransform.movement_vectors(directions, distance, angle)
+        return np.vstack((np.zeros((1, 2)), np.cumsum(steps, axis=0))) + np.asarray(start, dtype=float)